@@ -6,16 +6,33 @@ Solar Suitability Dashboard Main Application.
 This is the main entry point for the Solar Suitability Dashboard application.
 It sets up the page, loads data, and orchestrates the different components
 of the application.
+
+The map panel is a Streamlit fragment: it owns the layer selection, so
+changing the layer reruns only the map and the layer metric. Changing the
+state, district or category reruns the whole script, since both panels
+depend on them.
 """
 
 import streamlit as st
 from modules.ui.styles import apply_css
-from modules.ui.layout import create_header, create_footer, create_controls
-from modules.data.loader import load_shapefile_data
+from modules.ui.layout import (create_header, create_footer, create_district_search, create_controls,
+                               create_weight_controls, create_sensitivity_controls, create_layer_controls,
+                               create_hotspot_toggle, create_comparison_controls, create_version_controls,
+                               create_warmup_status, create_performance_panel)
+from modules.data.versions import CHANGE_COLUMN, load_version_data, apply_changes
+from modules.data.aggregates import get_aggregates
+from modules.data.classes import get_class_matrix, get_layer_options
+from modules.data.mcda import MCDA_COLUMN, apply_weights
+from modules.data.sensitivity import STABILITY_COLUMN, get_sensitivity, apply_stability
+from modules.data.spatial import HOTSPOT_COLUMN, apply_hotspots
 from modules.data.processor import filter_data_with_shapefile
-from modules.visualization.maps import create_simple_map
-from modules.visualization.charts import display_statistics
-from modules.utils.constants import layer_column_mapping
+from modules.visualization.maps import render_simple_map, create_comparison_map
+from modules.visualization.encoding import encode_figure, get_output_profile, show_map_image
+from modules.visualization.raster import create_raster_map, create_raster_comparison
+from modules.visualization.charts import display_statistics, display_layer_metric, display_sensitivity_table, display_change_summary
+from modules.utils.constants import layer_column_mapping, MAP_RENDERER
+from modules.utils import profiling, prefetch, warmup
+from modules.utils.profiling import stage
 
 # Set page configuration
 st.set_page_config(
@@ -27,55 +44,205 @@ st.set_page_config(
 # Apply CSS styles
 apply_css()
 
+@st.fragment
+def map_panel(df, filtered_df, aggregates, selected_state, selected_district, selected_category, base_df=None):
+    """
+    Draw the map panel: layer controls, layer metric and map.
+    
+    As a fragment, this function reruns on its own when its layer widgets
+    change, reusing the arguments of the last full run. Its only inputs
+    are these arguments and the selected layer.
+    
+    Args:
+        df (GeoDataFrame): The district table
+        filtered_df (DataFrame): The filtered data based on selection
+        aggregates (DataFrame): The per-state statistics of every layer
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        selected_category (str): The selected category (Adaptation, Mitigation, etc.)
+        base_df (GeoDataFrame, optional): District table of an earlier dataset version; when given,
+            the map shows how each district's class of the layer changed
+    """
+    with profiling.rerun("map fragment"):
+        # Create the map panel
+        st.markdown('<div class="panel">', unsafe_allow_html=True)
+        
+        # Layers that are empty or constant in this dataset are not offered
+        layers = get_layer_options(df)
+        layer_controls = create_layer_controls(layers)
+        with layer_controls[2]:
+            display_layer_metric(filtered_df, aggregates, selected_state, selected_district)
+        
+        # Get the column to visualize; the Custom category always shows
+        # the re-weighted suitability, or its stability when requested
+        vis_column = selected_category
+        if selected_category == MCDA_COLUMN and STABILITY_COLUMN in df.columns and st.session_state.get("stability_map"):
+            vis_column = STABILITY_COLUMN
+        elif (selected_category != MCDA_COLUMN and st.session_state.selected_layer
+                and layer_column_mapping[st.session_state.selected_layer] in filtered_df.columns):
+            vis_column = layer_column_mapping[st.session_state.selected_layer]
+        
+        # Count the view so that future warm-ups render it first
+        warmup.record_view(selected_state, selected_district, vis_column, selected_category)
+        
+        # Optionally replace the layer by its spatial clusters
+        if create_hotspot_toggle() and vis_column in df.columns:
+            df = apply_hotspots(df, vis_column)
+            vis_column = HOTSPOT_COLUMN
+        
+        # Replace the layer by its class transitions since the base version
+        changes = None
+        if base_df is not None and vis_column in df.columns:
+            df, changes = apply_changes(df, base_df, vis_column, selected_category)
+            vis_column = CHANGE_COLUMN
+        
+        # The raster engine repaints cached label grids; the matplotlib
+        # engine is kept for views that show district names
+        use_raster = MAP_RENDERER == "raster" or (MAP_RENDERER == "auto" and selected_state == "National Average")
+        
+        # Comparison mode draws several layers or categories from one geometry pass
+        panels = create_comparison_controls(vis_column, selected_category, layers)
+        
+        # Plain views are prefetched; wait for this one if a worker is rendering it
+        plain = not panels and changes is None and vis_column != HOTSPOT_COLUMN
+        if plain:
+            with stage("wait_for_prefetch"):
+                prefetch.wait_for(df, selected_state, selected_district, vis_column, selected_category)
+        
+        with prefetch.foreground(), st.spinner("Creating map..."):
+            if panels and use_raster:
+                with stage("create_raster_comparison") as span:
+                    image = create_raster_comparison(df, selected_state, selected_district, panels)
+                    span.add_bytes(len(image))
+            elif panels:
+                with stage("create_comparison_map") as span:
+                    fig = create_comparison_map(df, selected_state, selected_district, panels)
+                    image = encode_figure(fig, get_output_profile("thumbnail"))
+                    span.add_bytes(len(image))
+            elif use_raster:
+                with stage("create_raster_map", cached=True) as span:
+                    image = create_raster_map(df, selected_state, selected_district, vis_column, selected_category)
+                    span.add_bytes(len(image))
+            else:
+                with stage("render_simple_map", cached=True) as span:
+                    image = render_simple_map(df, selected_state, selected_district, vis_column, selected_category)
+                    span.add_bytes(len(image))
+            
+            # Encoded once above; sent to the browser without re-encoding
+            with stage("show_map_image"):
+                show_map_image(image)
+        
+        # Render the likely next views in the background, replacing the
+        # ones scheduled for the previous view
+        if plain:
+            prefetch.schedule(df, selected_state, selected_district, vis_column, selected_category)
+        else:
+            prefetch.cancel()
+        
+        if changes is not None:
+            display_change_summary(changes, selected_state, selected_district)
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment(run_every=1)
+def warmup_panel():
+    """
+    Show the warm-up progress until the data is ready, then rerun the app.
+    
+    The fragment polls once per second, so a session that arrives during
+    the warm-up sees its progress instead of a blocked page.
+    """
+    if warmup.is_ready():
+        st.rerun()
+    create_warmup_status(warmup.get_status())
+
 def main():
     """
     Main application function to run the dashboard.
     
     This function orchestrates the different components of the application,
     loading data, creating the user interface, and handling user interactions.
+    Each stage is timed when profiling is enabled from the performance panel.
     """
-    # Create the header
-    create_header()
-    
-    # Load the data directly from shapefile - with caching, this is only done once
-    df = load_shapefile_data()
-    
-    # Initialize session state for storing selected layer
-    if 'selected_layer' not in st.session_state:
-        st.session_state.selected_layer = "GW Development Stage"  # Default selection
-    
-    # Create the control panel (state, district, category, layer selection)
-    selected_state, selected_district, selected_category = create_controls(df)
+    # Load the data and warm the caches in the background, once per process
+    warmup.start_warmup()
     
-    # Create 2-column layout for map and statistics
-    map_stats_cols = st.columns([2, 1])
-    
-    # Middle column - Map
-    with map_stats_cols[0]:
+    with profiling.rerun():
+        # Create the header
+        create_header()
+        
+        # Show the warm-up progress instead of blocking on the first load
+        if not warmup.is_ready():
+            warmup_panel()
+            return
+        
+        # Choose the dataset version, and optionally an earlier one to compare with
+        version, base_version = create_version_controls()
+        
+        # Load the data directly from shapefile - with caching, this is only done once per version
+        with stage("load_version_data", cached=True):
+            data = load_version_data(version)
+            base_df = load_version_data(base_version).districts if base_version else None
+        
+        # Classes of every layer under every category, built once per dataset
+        with stage("get_class_matrix", cached=True):
+            get_class_matrix(data.districts)
+            if base_df is not None:
+                get_class_matrix(base_df)
+        
+        # Per-state statistics of every layer, computed once per dataset
+        with stage("get_aggregates", cached=True):
+            aggregates = get_aggregates(data.districts, data.fingerprint)
+        
+        # Initialize session state for storing selected layer
+        if 'selected_layer' not in st.session_state:
+            st.session_state.selected_layer = "GW Development Stage"  # Default selection
+        
+        # Type-ahead search, which sets the state and district below
+        create_district_search(data.districts)
+        
+        # Create the control panel (state, district, category selection)
+        selected_state, selected_district, selected_category = create_controls(data.districts)
+        
+        # The Custom category is recomputed from the weight sliders
+        sensitivity = None
+        if selected_category == MCDA_COLUMN:
+            weights = create_weight_controls()
+            data = apply_weights(data, weights)
+            
+            # Optional Monte Carlo analysis of the weights, cached per settings
+            settings = create_sensitivity_controls()
+            if settings:
+                with stage("sensitivity_analysis", cached=True):
+                    sensitivity = get_sensitivity(data.districts, data.fingerprint, tuple(weights.items()),
+                                                  settings["n_samples"], settings["spread"], settings["seed"])
+                    data = apply_stability(data, sensitivity)
+        
         # Filter data based on selection
-        filtered_df = filter_data_with_shapefile(df, selected_state, selected_district)
+        filtered_df = filter_data_with_shapefile(data, selected_state, selected_district)
         
-        # Create the map panel
-        st.markdown('<div class="panel">', unsafe_allow_html=True)
+        # Create 2-column layout for map and statistics
+        map_stats_cols = st.columns([2, 1])
         
-        # Get the column to visualize
-        vis_column = selected_category
-        if st.session_state.selected_layer and layer_column_mapping[st.session_state.selected_layer] in filtered_df.columns:
-            vis_column = layer_column_mapping[st.session_state.selected_layer]
+        # Middle column - Map (reruns on its own when the layer changes)
+        with map_stats_cols[0]:
+            map_panel(data.districts, filtered_df, aggregates, selected_state, selected_district, selected_category, base_df)
         
-        # Use the simple matplotlib approach for map rendering
-        with st.spinner("Creating map..."):
-            fig = create_simple_map(df, selected_state, selected_district, vis_column, selected_category)
-            st.pyplot(fig)
+        # Right column - Statistics
+        with map_stats_cols[1]:
+            display_statistics(data, filtered_df, selected_state, selected_district, selected_category)
+            if sensitivity is not None:
+                display_sensitivity_table(sensitivity, selected_state, selected_district)
         
-        st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Right column - Statistics
-    with map_stats_cols[1]:
-        display_statistics(df, filtered_df, selected_state, selected_district, selected_category)
+        # Create footer
+        create_footer()
+        
+        status = warmup.get_status()
+        if status["ready"] and not status["finished"]:
+            create_warmup_status(status)
     
-    # Create footer
-    create_footer()
+    # Drawn last so it includes the rerun that just finished
+    create_performance_panel()
 
 # Run the app
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+# modules/data/aggregates.py
+
+"""
+Aggregation module for the Solar Suitability Dashboard.
+
+calculate_averages only computes the unweighted mean of each state, which lets
+a small district count as much as a large one. This module computes a
+configurable set of statistics for every numeric layer and every state
+(and the whole country) with grouped reductions over one frame of district
+values, instead of a Python loop per state and statistic.
+
+The result is a single table indexed by (NAME_1, statistic) with one
+column per layer, so the dashboard can switch between statistics with a
+lookup.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.utils.constants import layer_column_mapping
+from modules.utils.disk_cache import get_or_compute, make_key
+
+# Area columns used as weights, in order of preference
+AREA_COLUMNS = ["F_AREA_M", "Shape_Area"]
+
+# Display names of the available statistics
+STATISTIC_LABELS = {
+    "mean": "Mean",
+    "area_weighted_mean": "Area-weighted mean",
+    "median": "Median",
+    "p10": "10th percentile",
+    "p90": "90th percentile",
+    "min": "Minimum",
+    "max": "Maximum"
+}
+
+DEFAULT_STATISTICS = list(STATISTIC_LABELS)
+
+def get_area_weights(districts):
+    """
+    Get the area of every district for weighting.
+
+    Args:
+        districts (DataFrame): The district rows
+
+    Returns:
+        Series: Area per district (0 where unknown), or None if the data
+        has no area column
+    """
+    for column in AREA_COLUMNS:
+        if column in districts.columns:
+            area = pd.to_numeric(districts[column], errors="coerce")
+            if area.notna().any():
+                return area.fillna(0).clip(lower=0)
+    return None
+
+def aggregate_group(values, keys, weights, statistics):
+    """
+    Compute the statistics of every column for every group.
+
+    Args:
+        values (DataFrame): Numeric values, one row per district
+        keys (array-like): Group of every district
+        weights (Series): Area weight of every district, or None
+        statistics (list): Names of the statistics (keys of STATISTIC_LABELS)
+
+    Returns:
+        DataFrame: Indexed by (group, statistic), one column per value column
+    """
+    grouped = values.groupby(keys, sort=True)
+    quantiles = [q for stat, q in [("median", 0.5), ("p10", 0.1), ("p90", 0.9)] if stat in statistics]
+    quantile_table = grouped.quantile(quantiles) if quantiles else None
+
+    parts = {}
+    for stat in statistics:
+        if stat == "mean":
+            parts[stat] = grouped.mean()
+        elif stat == "area_weighted_mean":
+            if weights is None:
+                continue
+            # Weights only count where the value is known
+            weighted = values.mul(weights, axis=0).groupby(keys, sort=True).sum()
+            known = values.notna().mul(weights, axis=0).groupby(keys, sort=True).sum()
+            parts[stat] = weighted / known.replace(0, np.nan)
+        elif stat in ("median", "p10", "p90"):
+            q = {"median": 0.5, "p10": 0.1, "p90": 0.9}[stat]
+            parts[stat] = quantile_table.xs(q, level=-1)
+        elif stat == "min":
+            parts[stat] = grouped.min()
+        elif stat == "max":
+            parts[stat] = grouped.max()
+        else:
+            raise ValueError(f"Unknown statistic: {stat}")
+
+    table = pd.concat(parts, names=["statistic", "NAME_1"])
+    return table.swaplevel().sort_index()
+
+def compute_aggregates(_gdf, statistics=None, columns=None):
+    """
+    Compute the aggregate table of the dataset.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        statistics (list, optional): Statistics to compute (default: all)
+        columns (list, optional): Columns to aggregate (default: every
+            numeric layer of layer_column_mapping)
+
+    Returns:
+        DataFrame: Indexed by (NAME_1, statistic), with "National Average"
+        as the NAME_1 of the country-wide statistics
+    """
+    statistics = statistics or DEFAULT_STATISTICS
+    districts = _gdf
+
+    if columns is None:
+        columns = [col for col in dict.fromkeys(layer_column_mapping.values()) if col in districts.columns]
+    values = districts[columns].astype(np.float64)
+    weights = get_area_weights(districts)
+
+    states = districts["NAME_1"].map(str).to_numpy()
+    national = np.full(len(districts), "National Average", dtype=object)
+
+    return pd.concat([
+        aggregate_group(values, states, weights, statistics),
+        aggregate_group(values, national, weights, statistics)
+    ])
+
+@st.cache_data(max_entries=4)
+def get_aggregates(_gdf, fingerprint):
+    """
+    Cached compute_aggregates for the dashboard.
+
+    Below the in-memory cache, the table is kept in the disk cache, so a
+    restarted server reads it back instead of recomputing it.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        fingerprint (str): Fingerprint of the dataset, identifying the result
+
+    Returns:
+        DataFrame: The aggregate table
+    """
+    # This body only runs when the memory cache misses; get_or_compute
+    # reports a miss only if the disk cache misses as well
+    key = make_key("aggregates", fingerprint, DEFAULT_STATISTICS)
+    return get_or_compute("aggregates", key, lambda: compute_aggregates(_gdf))
+
+def get_aggregate_value(aggregates, selected_state, statistic, column):
+    """
+    Look up one statistic of one layer for a state or the country.
+
+    Args:
+        aggregates (DataFrame): The aggregate table
+        selected_state (str): The selected state or "National Average"
+        statistic (str): Name of the statistic
+        column (str): The layer column
+
+    Returns:
+        float: The value, or None if it is not in the table
+    """
+    try:
+        return aggregates.at[(selected_state, statistic), column]
+    except KeyError:
+        return None
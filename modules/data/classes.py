@@ -0,0 +1,270 @@
+# modules/data/classes.py
+
+"""
+Class matrix module for the Solar Suitability Dashboard.
+
+Every numeric layer is shown in four suitability classes, with breaks
+declared per layer (and optionally per category) in the layer registry
+of modules.utils.constants. Instead of classifying a column on every
+render, this module classifies every row of the dataset once, for every
+layer under every category, into one int8 array:
+
+    classes[row, layer, category]   0 = no value, 1-4 = Less ... Very Highly Suitable
+
+plus the codes of the category labels themselves (labels[row, category],
+-1 where the label is missing). The matrix is built once per dataset
+fingerprint, when the dataset is loaded; maps, charts and the report
+export then look classes up by row position (the dataset index, see
+modules.data.loader.prepare_dataset) in every view of the dataset.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules.data.loader import get_dataset_fingerprint
+from modules.utils.constants import layer_registry, inverted_categories
+from modules.utils.memory_cache import BoundedCache
+
+# Categories of the matrix, in order
+CATEGORIES = ["Adaptation", "Mitigation", "Replacment", "General_SI"]
+
+# Layers of the matrix, in registry order
+LAYERS = list(layer_registry.keys())
+
+# Column of every layer and the position of every layer column
+LAYER_COLUMNS = [layer_registry[layer]["column"] for layer in LAYERS]
+COLUMN_POSITIONS = {column: j for j, column in enumerate(LAYER_COLUMNS)}
+
+# Class names by code; code 0 is shown as "Mixed" for category labels
+CLASS_LABELS = ["Mixed", "Less Suitable", "Moderately Suitable", "Highly Suitable", "Very Highly Suitable"]
+
+# Codes of the category labels (labels outside these are 0)
+LABEL_CODES = {name: code for code, name in enumerate(CLASS_LABELS) if code > 0}
+
+MISSING_LABEL = -1
+
+# Breaks of numeric columns that are not in the registry
+DEFAULT_BREAKS = (50, 70, 100)
+
+def get_layer_spec(column):
+    """
+    Get the registry entry of a layer column.
+
+    Args:
+        column (str): The layer column
+
+    Returns:
+        dict: The entry, or None if the column is not a registered layer
+    """
+    return layer_registry[LAYERS[COLUMN_POSITIONS[column]]] if column in COLUMN_POSITIONS else None
+
+def get_breaks(column, category=None):
+    """
+    Get the class breaks of a layer column under a category.
+
+    Args:
+        column (str): The layer column
+        category (str, optional): The category; layers whose registry
+            breaks are a dict may override the "default" breaks per category
+
+    Returns:
+        tuple: Three ascending break values
+    """
+    spec = get_layer_spec(column)
+    if spec is None:
+        return DEFAULT_BREAKS
+    breaks = spec["breaks"]
+    if isinstance(breaks, dict):
+        breaks = breaks.get(category, breaks["default"])
+    return tuple(breaks)
+
+def format_units(text, units):
+    """
+    Append bare units to a formatted value ("40%", "5 mbgl").
+
+    Args:
+        text (str): The formatted value
+        units (str): Units from the layer registry, or None
+
+    Returns:
+        str: The value with its units
+    """
+    if not units:
+        return text
+    return f"{text}{units}" if units == "%" else f"{text} {units}"
+
+def classify_values(values, breaks, inverted=False):
+    """
+    Classify values into class codes 1-4 (0 where the value is missing).
+
+    With the standard scale a value on the first or second break belongs
+    to the upper class and a value on the third to the lower one
+    (<b1, b1-b2, b2-b3, >b3); the inverted scale mirrors this (<=b1,
+    b1-b2, b2-b3, >b3 from Very Highly to Less Suitable). These are the
+    boundaries the dashboard has always used for the 50/70/100% breaks.
+
+    Args:
+        values (array-like): Numeric values
+        breaks (tuple): Three ascending break values
+        inverted (bool): True if lower values are more suitable
+
+    Returns:
+        numpy.ndarray: int8 class codes
+    """
+    values = np.asarray(values, dtype=np.float64)
+    low, mid, high = breaks
+    if inverted:
+        codes = 4 - (values > low).astype(np.int8) - (values > mid) - (values > high)
+    else:
+        codes = 1 + (values >= low).astype(np.int8) + (values >= mid) + (values > high)
+    return np.where(np.isnan(values), 0, codes).astype(np.int8)
+
+def get_legend_labels(column, category):
+    """
+    Get the legend label of every class of a layer column under a category.
+
+    Args:
+        column (str): The layer column
+        category (str): The category
+
+    Returns:
+        list: Labels from Very Highly Suitable (code 4) to Less Suitable (code 1)
+    """
+    spec = get_layer_spec(column)
+    units = spec["units"] if spec else None
+    low, mid, high = (f"{b:g}" for b in get_breaks(column, category))
+    if category in inverted_categories:
+        ranges = [f"<{low}", f"{low}-{mid}", f"{mid}-{high}", f">{high}"]
+    else:
+        ranges = [f">{high}", f"{mid}-{high}", f"{low}-{mid}", f"<{low}"]
+    return [f"{CLASS_LABELS[code]} ({format_units(text, units)})" for code, text in zip([4, 3, 2, 1], ranges)]
+
+def build_class_matrix(_gdf):
+    """
+    Classify every row of a dataset for every layer and category.
+
+    Args:
+        _gdf (GeoDataFrame): The processed geodataframe
+
+    Returns:
+        dict: "classes" (int8 rows x layers x categories), "labels" (int8
+        rows x categories), "varying" (bool per layer: the column has at
+        least two distinct values) and "rows" (number of rows)
+    """
+    rows = len(_gdf)
+    classes = np.zeros((rows, len(LAYERS), len(CATEGORIES)), dtype=np.int8)
+    varying = np.zeros(len(LAYERS), dtype=bool)
+    for j, layer in enumerate(LAYERS):
+        column = LAYER_COLUMNS[j]
+        if column not in _gdf.columns:
+            continue
+        values = _gdf[column].to_numpy(dtype=layer_registry[layer]["dtype"])
+        varying[j] = len(np.unique(values[~np.isnan(values)])) > 1
+        for k, category in enumerate(CATEGORIES):
+            classes[:, j, k] = classify_values(values, get_breaks(column, category), category in inverted_categories)
+
+    labels = np.full((rows, len(CATEGORIES)), MISSING_LABEL, dtype=np.int8)
+    for k, category in enumerate(CATEGORIES):
+        if category in _gdf.columns:
+            values = _gdf[category]
+            labels[:, k] = np.where(values.isna(), MISSING_LABEL, values.map(LABEL_CODES).fillna(0))
+
+    return {"classes": classes, "labels": labels, "varying": varying, "rows": rows}
+
+# Class matrix per dataset fingerprint, oldest first
+CLASS_MATRIX_CACHE_SIZE = 4
+_matrices = BoundedCache(CLASS_MATRIX_CACHE_SIZE)
+
+def get_class_matrix(_gdf):
+    """
+    Get the class matrix of a dataset, building it on first use.
+
+    Frames derived from the dataset (filtered views, or copies with added
+    columns) share its fingerprint and index, and therefore its matrix.
+
+    Args:
+        _gdf (GeoDataFrame): The processed geodataframe
+
+    Returns:
+        dict: The matrix from build_class_matrix
+    """
+    key = get_dataset_fingerprint(_gdf)
+    return _matrices.get_or_build(key, lambda: build_class_matrix(_gdf))
+
+def get_layer_options(_gdf):
+    """
+    Get the layers worth mapping in a dataset, in registry order.
+
+    A layer whose column is empty, or holds a single value, would put
+    every district in the same class; such layers are left out.
+
+    Args:
+        _gdf (GeoDataFrame): The dataset or a frame derived from it
+
+    Returns:
+        list: Layer names
+    """
+    varying = get_class_matrix(_gdf)["varying"]
+    return [layer for layer, keep in zip(LAYERS, varying) if keep]
+
+def _lookup(frame):
+    """
+    Find the matrix of the dataset a frame was taken from.
+
+    Only a matrix already built from the whole dataset (get_class_matrix)
+    is used: a view holds a subset of the rows and must not build one.
+
+    Returns:
+        tuple: (matrix, row positions of the frame), or (None, None)
+    """
+    matrix = _matrices.get(frame.attrs.get("fingerprint"))
+    if matrix is None:
+        return None, None
+    positions = frame.index.to_numpy()
+    if positions.dtype.kind not in "iu" or (len(positions) and positions.max() >= matrix["rows"]):
+        return None, None
+    return matrix, positions
+
+def get_layer_classes(frame, column, category):
+    """
+    Look up the classes of a layer column for the rows of a frame.
+
+    Args:
+        frame (DataFrame): The dataset or a view of it, with the dataset's
+            fingerprint in its attrs
+        column (str): The layer column
+        category (str): The category whose breaks apply
+
+    Returns:
+        Series: Class codes (0-4) indexed like the frame, or None if the
+        column or category is not in the matrix or the matrix of the
+        frame's dataset has not been built
+    """
+    if column not in COLUMN_POSITIONS or category not in CATEGORIES:
+        return None
+    matrix, positions = _lookup(frame)
+    if matrix is None:
+        return None
+    codes = matrix["classes"][positions, COLUMN_POSITIONS[column], CATEGORIES.index(category)]
+    return pd.Series(codes, index=frame.index)
+
+def get_label_classes(frame, category):
+    """
+    Look up the class codes of a category's labels for the rows of a frame.
+
+    Args:
+        frame (DataFrame): The dataset or a view of it, with the dataset's
+            fingerprint in its attrs
+        category (str): The category column
+
+    Returns:
+        Series: Codes (-1 missing, 0 other labels such as Mixed, 1-4) indexed
+        like the frame, or None if the category is not in the matrix or
+        the matrix of the frame's dataset has not been built
+    """
+    if category not in CATEGORIES:
+        return None
+    matrix, positions = _lookup(frame)
+    if matrix is None:
+        return None
+    return pd.Series(matrix["labels"][positions, CATEGORIES.index(category)], index=frame.index)
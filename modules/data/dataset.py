@@ -0,0 +1,185 @@
+# modules/data/dataset.py
+
+"""
+Dataset module for the Solar Suitability Dashboard.
+
+The dashboard data is two tables behind one object:
+
+    districts   GeoDataFrame with one row per district, numbered 0..n-1
+    averages    DataFrame of the national and state averages, indexed by
+                (level, name) with level "national" or "state"
+
+The averages used to be appended to the district frame as sentinel rows
+(NAME_2 "All Districts", "State Average" in every text column), which made
+every consumer mask them out again. Keeping them apart means the map,
+charts, search and analysis modules work on the district table as is, and
+the statistics panel reads one row of the small averages table.
+
+Views are selected by row position: the positions of every state and
+district are grouped once per dataset fingerprint (get_row_index), so
+selecting a view is a take instead of string comparisons over all rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from modules.utils.memory_cache import BoundedCache
+
+# Levels of the averages table
+NATIONAL_LEVEL = "national"
+STATE_LEVEL = "state"
+
+# Row positions per dataset fingerprint, oldest first
+ROW_INDEX_CACHE_SIZE = 8
+_row_indexes = BoundedCache(ROW_INDEX_CACHE_SIZE)
+
+def build_row_index(_gdf):
+    """
+    Group the row positions of a district table by state and district.
+
+    Names are compared as text, like the state and district selectboxes.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        dict: "states" ({state: positions}) and "districts"
+        ({(state, district): positions})
+    """
+    names = pd.DataFrame({
+        "state": _gdf["NAME_1"].map(str).to_numpy(),
+        "district": _gdf["NAME_2"].map(str).to_numpy()
+    })
+    return {
+        "states": names.groupby("state", sort=False).indices,
+        "districts": names.groupby(["state", "district"], sort=False).indices
+    }
+
+def get_row_index(_gdf):
+    """
+    Get the row positions of a district table, grouping them on first use.
+
+    Frames derived from the district table (copies with added columns)
+    share its fingerprint and rows, and therefore its index. Frames
+    without a fingerprint are grouped every time.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        dict: The index from build_row_index
+    """
+    key = _gdf.attrs.get("fingerprint")
+    if key is None:
+        return build_row_index(_gdf)
+    return _row_indexes.get_or_build(key, lambda: build_row_index(_gdf))
+
+def select_districts(_gdf, selected_state, selected_district):
+    """
+    Select the district rows of a view.
+
+    Args:
+        _gdf (GeoDataFrame): The district table, or a frame derived from it
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+
+    Returns:
+        GeoDataFrame: The whole table for the national view, otherwise the
+        rows of the state or district (keeping their row positions)
+    """
+    if selected_state == "National Average":
+        return _gdf
+    index = get_row_index(_gdf)
+    if selected_district == "All Districts":
+        positions = index["states"].get(selected_state)
+    else:
+        positions = index["districts"].get((selected_state, selected_district))
+    return _gdf.take(positions if positions is not None else [])
+
+class Dataset:
+    """
+    District table and averages table of the dashboard data.
+
+    Both tables are treated as read-only: derived datasets (such as the
+    ones with the Custom suitability) are built with assign, which shares
+    the unchanged columns with this one.
+
+    Attributes:
+        districts (GeoDataFrame): One row per district, numbered 0..n-1,
+            with the geometry and dataset fingerprints in its attrs
+        averages (DataFrame): National and state averages, indexed by
+            (level, name), with NAME_1 and NAME_2 ("All Districts") columns
+    """
+
+    def __init__(self, districts, averages):
+        self.districts = districts
+        self.averages = averages
+
+    @property
+    def fingerprint(self):
+        """str: Fingerprint of the district table."""
+        return self.districts.attrs.get("fingerprint")
+
+    @property
+    def state_averages(self):
+        """DataFrame: The state rows of the averages table, indexed by state."""
+        return self.averages.xs(STATE_LEVEL, level="level")
+
+    def select(self, selected_state, selected_district):
+        """
+        Select the district rows of a view (see select_districts).
+
+        Args:
+            selected_state (str): The selected state or "National Average"
+            selected_district (str): The selected district or "All Districts"
+
+        Returns:
+            GeoDataFrame: The district rows of the view
+        """
+        return select_districts(self.districts, selected_state, selected_district)
+
+    def summary(self, selected_state, selected_district):
+        """
+        Get the rows summarizing a view.
+
+        Args:
+            selected_state (str): The selected state or "National Average"
+            selected_district (str): The selected district or "All Districts"
+
+        Returns:
+            DataFrame: The national or state average row, or the rows of the
+            district (empty if the selection is not in the data)
+        """
+        if selected_state == "National Average":
+            key = (NATIONAL_LEVEL, selected_state)
+        elif selected_district == "All Districts":
+            key = (STATE_LEVEL, selected_state)
+        else:
+            return self.select(selected_state, selected_district)
+        return self.averages.loc[[key]] if key in self.averages.index else self.averages.iloc[:0]
+
+    def assign(self, column, district_values, state_values=None, national_value=None):
+        """
+        Derive a dataset with a column set in both tables.
+
+        Args:
+            column (str): The column to set
+            district_values (array-like): Value per district row
+            state_values (dict or Series, optional): Value per state name;
+                states without a value get NaN
+            national_value (optional): Value of the national row
+
+        Returns:
+            Dataset: A dataset sharing every other column with this one
+        """
+        districts = self.districts.copy(deep=False)
+        districts[column] = district_values
+
+        levels = self.averages.index.get_level_values("level")
+        values = pd.Series(state_values if state_values is not None else {}, dtype=object)
+        values = values.reindex(self.averages.index.get_level_values("name")).to_numpy(copy=True)
+        values[np.flatnonzero(levels == NATIONAL_LEVEL)] = national_value
+        averages = self.averages.copy(deep=False)
+        averages[column] = pd.Series(values, index=averages.index).infer_objects()
+
+        return Dataset(districts, averages)
@@ -0,0 +1,334 @@
+# modules/data/geometry.py
+
+"""
+Compact geometry module for the Solar Suitability Dashboard.
+
+The district boundaries are held as float64 shapely polygons, but no map
+of the dashboard needs more than about 1e-4 degree (roughly 10 m) of
+precision. This module snaps coordinates to a fixed grid and stores them
+as integers:
+
+- quantize_geometries snaps polygons to the grid with GEOS precision
+  reduction, which keeps the result valid (shared borders stay shared and
+  slivers collapse instead of crossing);
+- EncodedGeometry keeps the snapped coordinates as one int32 array of
+  deltas from the previous vertex, plus offset arrays delimiting rings,
+  parts and geometries. Shapely objects are only created when a geometry
+  is asked for, one at a time or all at once in a vectorized call.
+
+The encoding is a few numpy arrays, so it pickles and saves (.npz) without
+per-object overhead. The preprocessing pipeline writes it next to the
+optimized shapefile when run with --precision, and the report export uses
+it to send the geometry to its worker processes.
+"""
+
+import os
+
+import numpy as np
+import shapely
+from shapely import GeometryType
+
+DEFAULT_PRECISION = 1e-4
+
+# Kind of each encoded geometry
+MISSING = 0
+POLYGONAL = 1
+POINT = 2
+
+def quantize_geometries(geometries, precision=DEFAULT_PRECISION):
+    """
+    Snap geometries to a grid of the given cell size.
+
+    Args:
+        geometries (array-like): Shapely geometries
+        precision (float): Grid cell size in coordinate units (degrees)
+
+    Returns:
+        numpy.ndarray: The snapped geometries, valid where the input was
+    """
+    geometries = shapely.set_precision(np.asarray(geometries, dtype=object), precision, mode="valid_output")
+    invalid = ~shapely.is_valid(geometries) & ~shapely.is_missing(geometries)
+    if invalid.any():
+        geometries[invalid] = shapely.make_valid(geometries[invalid])
+    return geometries
+
+class EncodedGeometry:
+    """
+    Geometries stored as delta-encoded int32 grid coordinates.
+
+    Polygons and multipolygons share one ragged coordinate array: vertex i
+    is origin + precision * cumsum(deltas)[i], and ring_offsets,
+    part_offsets and geometry_offsets are the ragged offsets of
+    shapely.to_ragged_array. Points (e.g. the label points of average rows)
+    are kept as absolute grid coordinates.
+    """
+
+    def __init__(self, kinds, is_multi, deltas, ring_offsets, part_offsets, geometry_offsets,
+                 points, origin, precision, crs=None):
+        self.kinds = kinds
+        self.is_multi = is_multi
+        self.deltas = deltas
+        self.ring_offsets = ring_offsets
+        self.part_offsets = part_offsets
+        self.geometry_offsets = geometry_offsets
+        self.points = points
+        self.origin = origin
+        self.precision = precision
+        self.crs = crs
+
+        # Position of every geometry within the polygonal or point arrays
+        self._index = np.zeros(len(kinds), dtype=np.int64)
+        for kind in (POLYGONAL, POINT):
+            mask = kinds == kind
+            self._index[mask] = np.arange(mask.sum())
+        self._coords = None
+        self._shapely = None
+
+    @classmethod
+    def from_geometries(cls, geometries, precision=DEFAULT_PRECISION, crs=None):
+        """
+        Encode geometries, snapping them to the grid.
+
+        Args:
+            geometries (array-like): Polygons, multipolygons, points or None
+            precision (float): Grid cell size in coordinate units
+            crs (object, optional): CRS to attach when decoding
+
+        Returns:
+            EncodedGeometry: The encoded geometries
+
+        Raises:
+            ValueError: If a geometry is of another type (e.g. a line)
+        """
+        geometries = quantize_geometries(geometries, precision)
+        types = shapely.get_type_id(geometries)
+        polygonal = np.isin(types, [GeometryType.POLYGON, GeometryType.MULTIPOLYGON])
+        point = types == GeometryType.POINT
+        # make_valid can turn a broken polygon into a collection; keep its polygons
+        collection = types == GeometryType.GEOMETRYCOLLECTION
+        if collection.any():
+            geometries[collection] = [shapely.union_all([part for part in shapely.get_parts(g)
+                                                         if part.geom_type in ("Polygon", "MultiPolygon")])
+                                      for g in geometries[collection]]
+            types = shapely.get_type_id(geometries)
+            polygonal = np.isin(types, [GeometryType.POLYGON, GeometryType.MULTIPOLYGON])
+        missing = shapely.is_missing(geometries) | shapely.is_empty(geometries)
+        polygonal &= ~missing
+        point &= ~missing
+
+        unsupported = ~(polygonal | point | missing)
+        if unsupported.any():
+            raise ValueError(f"Cannot encode geometry type {shapely.get_type_id(geometries[unsupported][0])}")
+
+        kinds = np.full(len(geometries), MISSING, dtype=np.int8)
+        kinds[polygonal] = POLYGONAL
+        kinds[point] = POINT
+
+        if polygonal.any():
+            polygons = geometries[polygonal]
+            is_multi = shapely.get_type_id(polygons) == GeometryType.MULTIPOLYGON
+            multi = polygons.copy()
+            # Wrap single polygons so all rows share the multipolygon layout
+            multi[~is_multi] = shapely.multipolygons(polygons[~is_multi], indices=np.arange((~is_multi).sum()))
+            _, coords, (ring_offsets, part_offsets, geometry_offsets) = shapely.to_ragged_array(multi)
+        else:
+            is_multi = np.zeros(0, dtype=bool)
+            coords = np.zeros((0, 2))
+            ring_offsets = part_offsets = geometry_offsets = np.zeros(1, dtype=np.int64)
+
+        point_coords = shapely.get_coordinates(geometries[point])
+        all_coords = np.vstack([coords, point_coords])
+        origin = all_coords.min(axis=0) if len(all_coords) else np.zeros(2)
+
+        grid = np.rint((coords - origin) / precision).astype(np.int64)
+        deltas = np.diff(grid, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+        points = np.rint((point_coords - origin) / precision).astype(np.int32)
+
+        return cls(kinds, is_multi, deltas.astype(np.int32), ring_offsets.astype(np.int32),
+                   part_offsets.astype(np.int32), geometry_offsets.astype(np.int32), points,
+                   origin, precision, crs)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def nbytes(self):
+        """
+        Size of the encoded arrays in bytes.
+        """
+        return sum(a.nbytes for a in (self.kinds, self.is_multi, self.deltas, self.ring_offsets,
+                                      self.part_offsets, self.geometry_offsets, self.points))
+
+    def coordinates(self):
+        """
+        Decode the polygon vertices (one cumulative sum, kept for reuse).
+
+        Returns:
+            numpy.ndarray: Vertex coordinates of shape (vertices, 2), float64
+        """
+        if self._coords is None:
+            self._coords = self.origin + np.cumsum(self.deltas, axis=0, dtype=np.int64) * self.precision
+        return self._coords
+
+    def __getitem__(self, i):
+        """
+        Materialize a single geometry.
+
+        Args:
+            i (int): Position of the geometry
+
+        Returns:
+            shapely.Geometry: The geometry, or None if it is missing
+        """
+        if self._shapely is not None:
+            return self._shapely[i]
+
+        kind = self.kinds[i]
+        if kind == POINT:
+            return shapely.points(self.origin + self.points[self._index[i]] * self.precision)
+        if kind == MISSING:
+            return None
+
+        coords = self.coordinates()
+        j = self._index[i]
+        parts = []
+        for part in range(self.geometry_offsets[j], self.geometry_offsets[j + 1]):
+            rings = [coords[self.ring_offsets[r]:self.ring_offsets[r + 1]]
+                     for r in range(self.part_offsets[part], self.part_offsets[part + 1])]
+            parts.append(shapely.Polygon(rings[0], rings[1:]))
+        return shapely.MultiPolygon(parts) if self.is_multi[j] else parts[0]
+
+    def to_shapely(self):
+        """
+        Materialize all geometries in one vectorized call (kept for reuse).
+
+        Returns:
+            numpy.ndarray: Shapely geometries (None where missing)
+        """
+        if self._shapely is None:
+            result = np.full(len(self), None, dtype=object)
+            polygonal = self.kinds == POLYGONAL
+            if polygonal.any():
+                multi = shapely.from_ragged_array(
+                    GeometryType.MULTIPOLYGON, self.coordinates(),
+                    (self.ring_offsets, self.part_offsets, self.geometry_offsets))
+                single = ~self.is_multi
+                multi[single] = shapely.get_geometry(multi[single], 0)
+                result[polygonal] = multi
+            point = self.kinds == POINT
+            if point.any():
+                result[point] = shapely.points(self.origin + self.points * self.precision)
+            self._shapely = result
+        return self._shapely
+
+    def to_geoseries(self, index=None):
+        """
+        Materialize all geometries as a GeoSeries.
+
+        Args:
+            index (array-like, optional): Index of the series
+
+        Returns:
+            GeoSeries: The geometries with the CRS of the encoding
+        """
+        import geopandas as gpd
+
+        return gpd.GeoSeries(self.to_shapely(), index=index, crs=self.crs)
+
+    def __getstate__(self):
+        # Decoded caches are rebuilt on demand, so they never travel
+        state = self.__dict__.copy()
+        state["_coords"] = None
+        state["_shapely"] = None
+        return state
+
+    def save(self, path, **metadata):
+        """
+        Write the encoding to a compressed .npz file.
+
+        Deltas are small numbers, so they compress much better than raw
+        coordinates. The file is written under a temporary name and renamed.
+
+        Args:
+            path (str): Path of the .npz file
+            **metadata: Extra scalar values to store (e.g. a source stamp)
+
+        Returns:
+            None
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp_path, kinds=self.kinds, is_multi=self.is_multi, deltas=self.deltas,
+            ring_offsets=self.ring_offsets, part_offsets=self.part_offsets,
+            geometry_offsets=self.geometry_offsets, points=self.points, origin=self.origin,
+            precision=np.float64(self.precision), crs=np.str_(self.crs.to_wkt() if self.crs else ""),
+            **{f"meta_{key}": np.asarray(value) for key, value in metadata.items()})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an encoding written by save.
+
+        Args:
+            path (str): Path of the .npz file
+
+        Returns:
+            tuple: (EncodedGeometry, dict of the stored metadata)
+        """
+        with np.load(path) as data:
+            crs = str(data["crs"]) or None
+            encoded = cls(data["kinds"], data["is_multi"], data["deltas"], data["ring_offsets"],
+                          data["part_offsets"], data["geometry_offsets"], data["points"],
+                          data["origin"], float(data["precision"]), crs)
+            metadata = {key[5:]: data[key].item() for key in data.files if key.startswith("meta_")}
+        return encoded, metadata
+
+def get_geometry_path(shapefile_path):
+    """
+    Get the path of the encoded geometry written next to a shapefile.
+
+    Args:
+        shapefile_path (str): Path of the shapefile
+
+    Returns:
+        str: Path of the .npz file
+    """
+    return os.path.splitext(shapefile_path)[0] + ".geometry.npz"
+
+def encode_dataset(gdf, precision=DEFAULT_PRECISION):
+    """
+    Split a geodataframe into its attribute table and encoded geometry.
+
+    The result pickles to a fraction of the size of the geodataframe, so
+    it is the cheaper way to send the dataset to worker processes.
+
+    Args:
+        gdf (GeoDataFrame): The geodataframe
+        precision (float): Grid cell size of the encoding
+
+    Returns:
+        tuple: (DataFrame of the attributes, EncodedGeometry, dict of attrs)
+    """
+    import pandas as pd
+
+    attributes = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    encoded = EncodedGeometry.from_geometries(gdf.geometry.values, precision, gdf.crs)
+    return attributes, encoded, dict(gdf.attrs)
+
+def decode_dataset(payload):
+    """
+    Rebuild a geodataframe from the result of encode_dataset.
+
+    Args:
+        payload (tuple): (attributes, EncodedGeometry, attrs)
+
+    Returns:
+        GeoDataFrame: The geodataframe, with its attrs restored
+    """
+    import geopandas as gpd
+
+    attributes, encoded, attrs = payload
+    gdf = gpd.GeoDataFrame(attributes, geometry=encoded.to_geoseries(attributes.index))
+    gdf.attrs.update(attrs)
+    return gdf
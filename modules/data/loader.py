@@ -12,53 +12,232 @@ import streamlit as st
 import pandas as pd
 import geopandas as gpd
 import os
+import hashlib
+import shapely
 from shapely.geometry import Point
 from modules.data.calculator import calculate_averages
+from modules.data.dataset import Dataset
+from modules.data.pipeline import run_pipeline
+from modules.data.geometry import EncodedGeometry, get_geometry_path
+from modules.data.validation import read_profile, validate_dataset
+from modules.utils.constants import SHAPEFILE_PATH, ORIGINAL_SHAPEFILE_PATH
+from modules.utils.profiling import record_cache_miss
 
-# Define the path to your shapefile using relative paths
-# These paths are relative to where the application is run from (project root)
-SHAPEFILE_PATH = os.path.join("data", "shapefiles", "Solar_Suitability_layer_optimized.shp")
-ORIGINAL_SHAPEFILE_PATH = os.path.join("data", "shapefiles", "Solar_Suitability_layer.shp")
+def get_shapefile_path():
+    """
+    Get the path of the shapefile to load.
+    
+    Returns:
+        str: The optimized shapefile if it exists, otherwise the original
+        
+    Raises:
+        FileNotFoundError: If neither shapefile exists
+    """
+    if os.path.exists(SHAPEFILE_PATH):
+        return SHAPEFILE_PATH
+    if os.path.exists(ORIGINAL_SHAPEFILE_PATH):
+        return ORIGINAL_SHAPEFILE_PATH
+    raise FileNotFoundError(f"Could not find shapefile at {os.path.abspath(SHAPEFILE_PATH)} or "
+                            f"{os.path.abspath(ORIGINAL_SHAPEFILE_PATH)} (working directory: {os.getcwd()})")
+
+def read_dataset(path=None):
+    """
+    Read and prepare the dataset without Streamlit.
+    
+    This is the uncached loading path shared by the dashboard and by
+    command-line tools such as the report export: it reads the shapefile,
+    computes the state and national averages and fingerprints the result.
+    
+    A shapefile built by the pipeline (or normalized with `python -m
+    modules.data.validation`) has a matching profile report and is used
+    as it is; any other file is validated and normalized in memory first,
+    with the same rules (see modules.data.validation).
+    
+    When the pipeline wrote an encoded geometry for the shapefile (see
+    modules.data.geometry) and it still matches the file, only the
+    attribute table is read from the shapefile and the geometry is
+    decoded from the encoding.
+    
+    Args:
+        path (str, optional): Shapefile to read (default: get_shapefile_path())
+        
+    Returns:
+        Dataset: The district table and the averages table
+    """
+    path = path or get_shapefile_path()
+    encoded = read_encoded_geometry(path)
+    if encoded is not None:
+        attributes = gpd.read_file(path, ignore_geometry=True)
+        gdf = gpd.GeoDataFrame(attributes, geometry=encoded.to_geoseries(attributes.index))
+    else:
+        gdf = gpd.read_file(path)
+    
+    if read_profile(path) is None:
+        gdf, _ = validate_dataset(gdf)
+    return prepare_dataset(gdf)
+
+def prepare_dataset(gdf):
+    """
+    Prepare a validated district table for the dashboard.
+    
+    Computes the state and national averages and stores the geometry and
+    dataset fingerprints in the attrs of the district table. The table is
+    used as it is: its layers must be numeric and its labels normalized
+    (modules.data.validation). The rows are numbered 0..n-1, so every view of
+    the dataset carries the row positions (modules.data.classes looks
+    classes up by them). Shared by read_dataset and the versioned store of
+    modules.data.versions.
+    
+    Args:
+        gdf (GeoDataFrame): District rows as read from the source
+        
+    Returns:
+        Dataset: The district table and the averages table
+    """
+    districts = gdf.reset_index(drop=True)
+    
+    # Fingerprint the data once so disk caches can be keyed on it
+    districts.attrs["geometry_fingerprint"] = get_geometry_fingerprint(districts)
+    districts.attrs["fingerprint"] = get_dataset_fingerprint(districts)
+    
+    return Dataset(districts, calculate_averages(districts))
+
+def get_source_stamp(path):
+    """
+    Get the modification stamp of a shapefile and its sidecar files.
+    
+    Args:
+        path (str): Path of the .shp file
+        
+    Returns:
+        tuple: (extension, modification time in ns, size) of every file of
+        the shapefile that exists
+    """
+    stem = os.path.splitext(path)[0]
+    stamp = []
+    for ext in (".shp", ".shx", ".dbf", ".prj", ".cpg", ".geometry.npz"):
+        try:
+            stat = os.stat(stem + ext)
+        except OSError:
+            continue
+        stamp.append((ext, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
+
+def read_encoded_geometry(path):
+    """
+    Read the encoded geometry written next to a shapefile, if it matches.
+    
+    Args:
+        path (str): Path of the shapefile
+        
+    Returns:
+        EncodedGeometry: The encoding, or None if there is none or it was
+        written for another version of the shapefile
+    """
+    geometry_path = get_geometry_path(path)
+    if not os.path.exists(geometry_path):
+        return None
+    
+    encoded, metadata = EncodedGeometry.load(geometry_path)
+    stat = os.stat(path)
+    if metadata.get("shp_size") != stat.st_size or metadata.get("shp_mtime_ns") != stat.st_mtime_ns:
+        return None
+    return encoded
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
 def load_shapefile_data():
     """
     Load the shapefile data with caching to improve performance.
     
-    This function attempts to load either an optimized version of the shapefile
-    (if available) or the original shapefile. It handles data type conversion,
-    calculates aggregated statistics, and provides a fallback to dummy data
-    if loading fails.
+    This function loads either an optimized version of the shapefile (if
+    available) or the original shapefile and calculates aggregated
+    statistics. Dummy data is shown only when there is no shapefile at
+    all; a shapefile that fails to load raises instead of being replaced.
+    
+    The cached dataset is keyed on the path and the modification stamp of
+    the shapefile rather than expiring after a fixed time, so it is reloaded
+    exactly when the file changes (e.g. after optimize_shapefile).
     
     Returns:
-        GeoDataFrame: The processed geodataframe with calculated averages
+        Dataset: The district table and the averages table
     """
     try:
-        # Try to load the optimized version if it exists
-        if os.path.exists(SHAPEFILE_PATH):
-            st.info(f"Loading optimized shapefile from: {SHAPEFILE_PATH}")
-            gdf = gpd.read_file(SHAPEFILE_PATH)
-        elif os.path.exists(ORIGINAL_SHAPEFILE_PATH):
-            st.info(f"Loading original shapefile from: {ORIGINAL_SHAPEFILE_PATH}")
-            gdf = gpd.read_file(ORIGINAL_SHAPEFILE_PATH)
-        else:
-            st.warning(f"Neither optimized nor original shapefile found at the specified paths.")
-            st.warning(f"Looking for files at: {os.path.abspath(SHAPEFILE_PATH)} or {os.path.abspath(ORIGINAL_SHAPEFILE_PATH)}")
-            st.warning(f"Current working directory: {os.getcwd()}")
-            raise FileNotFoundError(f"Could not find shapefile at {SHAPEFILE_PATH} or {ORIGINAL_SHAPEFILE_PATH}")
+        path = get_shapefile_path()
+    except FileNotFoundError:
+        path = None
+    return _load_dataset(path, get_source_stamp(path) if path else None)
+
+@st.cache_data(max_entries=2)
+def _load_dataset(path, stamp):
+    """
+    Cached read_dataset, keyed on the path and its modification stamp.
+    
+    Args:
+        path (str): Shapefile to read, or None if there is none
+        stamp (tuple): Result of get_source_stamp, identifying the file version
         
-        # Make sure GW_dev_sta is numeric
-        if "GW_dev_sta" in gdf.columns:
-            gdf["GW_dev_sta"] = pd.to_numeric(gdf["GW_dev_sta"], errors='coerce')
+    Returns:
+        Dataset: The processed dataset, or dummy data without a shapefile
+    """
+    # This body only runs when the cache misses
+    record_cache_miss()
+    
+    if path is None:
+        st.error("No shapefile found; showing dummy data")
+        return prepare_dataset(get_dummy_data())
+    st.info(f"Loading shapefile from: {path}")
+    return read_dataset(path)
+
+def get_geometry_fingerprint(_gdf):
+    """
+    Get a content fingerprint of the dataset geometry alone.
+    
+    The fingerprint is a hash of the geometries (as WKB) and the district
+    names. Caches derived from the boundaries only (label grids, view
+    paths, the adjacency graph) are keyed on it, so dataset versions that
+    share their geometry also share those caches. It is stored in the
+    frame's attrs by prepare_dataset and reused from there when available.
+    
+    Args:
+        _gdf (GeoDataFrame): The geodataframe to fingerprint
         
-        # Add district and state averages
-        calculated_data = calculate_averages(gdf)
+    Returns:
+        str: Hex digest identifying the geometry
+    """
+    if "geometry_fingerprint" in _gdf.attrs:
+        return _gdf.attrs["geometry_fingerprint"]
+    
+    digest = hashlib.sha1()
+    for wkb in shapely.to_wkb(_gdf.geometry.values):
+        digest.update(wkb or b"")
+    digest.update("|".join(map(str, zip(_gdf["NAME_1"], _gdf["NAME_2"]))).encode("utf-8"))
+    return digest.hexdigest()
+
+def get_dataset_fingerprint(_gdf):
+    """
+    Get a content fingerprint of the dataset.
+    
+    The fingerprint is a hash of the geometry fingerprint and the attribute
+    table, so it changes whenever the boundaries are regenerated or any
+    value is updated. Disk caches are keyed on it, which lets them keep
+    entries without expiry. It is stored in the frame's attrs by
+    prepare_dataset and reused from there when available.
+    
+    Args:
+        _gdf (GeoDataFrame): The geodataframe to fingerprint
         
-        return calculated_data
-    except Exception as e:
-        st.error(f"Error loading shapefile: {e}")
-        # Return a simplified dummy dataset
-        return get_dummy_data()
+    Returns:
+        str: Hex digest identifying the dataset
+    """
+    if "fingerprint" in _gdf.attrs:
+        return _gdf.attrs["fingerprint"]
+    
+    digest = hashlib.sha1(get_geometry_fingerprint(_gdf).encode("ascii"))
+    
+    # Values are hashed as text so mixed-type columns hash consistently
+    attributes = pd.DataFrame(_gdf.drop(columns=_gdf.geometry.name)).astype(str)
+    digest.update(",".join(attributes.columns).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(attributes, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
 
 def get_dummy_data():
     """
@@ -91,51 +270,31 @@ def get_dummy_data():
     
     return gdf
 
-def optimize_shapefile(input_path=ORIGINAL_SHAPEFILE_PATH, output_path=SHAPEFILE_PATH, simplify_tolerance=0.01):
+def optimize_shapefile(input_path=ORIGINAL_SHAPEFILE_PATH, output_path=SHAPEFILE_PATH, simplify_tolerance=0.01,
+                       precision=None):
     """
     Create a simplified version of the shapefile with optimized geometries.
     
     This function should be run once before deploying the app to create
     an optimized version of the shapefile with simplified geometries,
-    which improves loading time and performance.
+    which improves loading time and performance. It is a thin wrapper
+    around the chunked pipeline in modules.data.pipeline, which can also
+    be run outside Streamlit with `python -m modules.data.pipeline`.
     
     Args:
         input_path (str): Path to the original shapefile
         output_path (str): Path to save the optimized shapefile
         simplify_tolerance (float): Tolerance for simplification (higher = more simplification)
+        precision (float, optional): Grid cell size to snap coordinates to
+            (e.g. 1e-4); also writes the compact encoded geometry
         
     Returns:
         str: Success message or error message
     """
     try:
-        # Load the shapefile
-        gdf = gpd.read_file(input_path)
-        
-        st.info(f"Original shapefile loaded: {len(gdf)} features")
-        
-        # Simplify geometries to reduce file size and improve performance
-        gdf['geometry'] = gdf['geometry'].simplify(tolerance=simplify_tolerance, preserve_topology=True)
-        
-        st.info("Geometries simplified")
-        
-        # Ensure numeric columns are properly typed
-        for col in gdf.columns:
-            if col not in ['geometry', 'NAME_1', 'NAME_2']:
-                try:
-                    gdf[col] = pd.to_numeric(gdf[col], errors='coerce')
-                except:
-                    pass  # Skip columns that can't be converted
-        
-        st.info("Column types optimized")
-        
-        # Create the directory if it doesn't exist
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # Save optimized shapefile
-        gdf.to_file(output_path)
-        
-        st.success(f"Optimized shapefile saved to {output_path}")
-        return f"Successfully created optimized shapefile at {output_path}"
+        summary = run_pipeline(input_path, output_path, simplify_tolerance=simplify_tolerance,
+                               precision=precision)
+        return (f"Successfully created optimized shapefile at {output_path} "
+                f"({summary['written']} features, {summary['features_per_second']} features/s)")
     except Exception as e:
-        st.error(f"Error: {str(e)}")
-        return f"Error: {str(e)}"
\ No newline at end of file
+        return f"Error: {str(e)}"
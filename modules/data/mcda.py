@@ -0,0 +1,196 @@
+# modules/data/mcda.py
+
+"""
+Multi-criteria re-weighting module for the Solar Suitability Dashboard.
+
+The suitability classes shipped in the shapefile (Adaptation, Mitigation,
+Replacment, General_SI) are fixed. This module computes a "Custom"
+suitability from user weights on the indicator layers instead.
+
+When a dataset is first used, its indicators are min-max normalized into
+a districts x indicators float32 matrix. Scoring a set of weights is then
+one matrix-vector product followed by vectorized binning, so it can run
+on every slider move. Classes are relative: the score quartiles of the
+districts split them into the four suitability classes, since weighted
+means of many indicators bunch up too much for fixed score boundaries. The result is written to a "Custom" column that
+the map and chart code treat like any other suitability category.
+"""
+
+import numpy as np
+
+from modules.data.loader import get_dataset_fingerprint
+from modules.utils.constants import layer_explanations, layer_column_mapping
+from modules.utils.memory_cache import BoundedCache
+from modules.utils.profiling import timed
+
+# Name of the category holding the re-weighted suitability
+MCDA_COLUMN = "Custom"
+
+# Indicators that can be weighted, in the order of the matrix columns
+INDICATORS = list(layer_explanations.keys())
+
+# Score quantiles separating the classes
+SCORE_QUANTILES = [0.25, 0.5, 0.75]
+
+# Class labels from lowest to highest score; "Mixed" is used for no score
+SCORE_LABELS = np.array(["Less Suitable", "Moderately Suitable", "Highly Suitable",
+                         "Very Highly Suitable", "Mixed"], dtype=object)
+
+def build_indicator_matrix(_gdf):
+    """
+    Build the normalized districts x indicators matrix.
+
+    Every indicator is scaled to 0-1 over the districts (min-max). Missing
+    values get the mean of their indicator so they neither help nor hurt
+    a district, and indicators that are missing from the data or constant
+    are all zero.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        numpy.ndarray: Matrix of shape (districts, indicators), float32
+    """
+    districts = _gdf
+    matrix = np.zeros((len(districts), len(INDICATORS)), dtype=np.float32)
+
+    for j, layer in enumerate(INDICATORS):
+        column = layer_column_mapping[layer]
+        if column not in districts.columns:
+            continue
+        values = districts[column].to_numpy(dtype=np.float64)
+        if np.isnan(values).all():
+            continue
+        low, high = np.nanmin(values), np.nanmax(values)
+        if high > low:
+            scaled = (values - low) / (high - low)
+            matrix[:, j] = np.where(np.isnan(scaled), np.nanmean(scaled), scaled)
+
+    return matrix
+
+def build_matrix_entry(_gdf):
+    """
+    Build the indicator matrix of a dataset along with the state of every district.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        dict: "matrix", "states" and "district_states"
+    """
+    state_names, district_states = np.unique(_gdf["NAME_1"].map(str).to_numpy(), return_inverse=True)
+    return {
+        "matrix": build_indicator_matrix(_gdf),
+        "states": state_names,
+        "district_states": district_states
+    }
+
+# Indicator matrix and state index per dataset fingerprint, oldest first
+MATRIX_CACHE_SIZE = 4
+_matrices = BoundedCache(MATRIX_CACHE_SIZE)
+
+def get_indicator_matrix(_gdf):
+    """
+    Get the indicator matrix of a dataset, building it on first use.
+
+    Along with the matrix, this keeps the state of every district (as an
+    index into the sorted list of states), which is needed to write the
+    most common class of every state.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        dict: "matrix", "states" and "district_states"
+    """
+    key = get_dataset_fingerprint(_gdf)
+    return _matrices.get_or_build(key, lambda: build_matrix_entry(_gdf))
+
+def get_weight_vector(weights):
+    """
+    Turn a {layer: weight} dictionary into a vector in matrix column order.
+
+    Layers missing from the dictionary get weight zero.
+
+    Args:
+        weights (dict): Weight per layer name, between -1 and 1
+
+    Returns:
+        numpy.ndarray: Weight vector, float32
+    """
+    return np.array([weights.get(layer, 0.0) for layer in INDICATORS], dtype=np.float32)
+
+def compute_scores(matrix, weight_vector):
+    """
+    Score every district for a weight vector.
+
+    A positive weight rewards high values of an indicator and a negative
+    weight rewards low values. Negative weights are folded in as
+    |w| * (1 - x) = |w| - |w| * x, so the whole score is still one
+    matrix-vector product, normalized by the sum of absolute weights.
+
+    Args:
+        matrix (numpy.ndarray): Normalized indicator matrix
+        weight_vector (numpy.ndarray): Weight per indicator
+
+    Returns:
+        numpy.ndarray: Score per district between 0 and 1, NaN if all weights are zero
+    """
+    total = np.abs(weight_vector).sum()
+    if total == 0:
+        return np.full(matrix.shape[0], np.nan, dtype=np.float32)
+
+    offset = -weight_vector[weight_vector < 0].sum()
+    return (matrix @ weight_vector + offset) / total
+
+def classify_scores(scores):
+    """
+    Bin scores into class codes at their quartiles.
+
+    Args:
+        scores (numpy.ndarray): Score per district
+
+    Returns:
+        numpy.ndarray: Index into SCORE_LABELS per district (4 means no score)
+    """
+    missing = np.isnan(scores)
+    if missing.all():
+        return np.full(len(scores), len(SCORE_LABELS) - 1)
+
+    codes = np.digitize(scores, np.quantile(scores[~missing], SCORE_QUANTILES))
+    codes[missing] = len(SCORE_LABELS) - 1
+    return codes
+
+@timed()
+def apply_weights(data, weights):
+    """
+    Recompute the Custom suitability of the dataset for new weights.
+
+    Districts get the class of their score. Like calculate_averages does
+    for the shipped categories, the state and national averages get the
+    most common class of their districts (ties go to the lower class).
+
+    The returned dataset shares its data with the input; only the Custom
+    and Custom_score columns are new.
+
+    Args:
+        data (Dataset): The processed dataset
+        weights (dict): Weight per layer name, between -1 and 1
+
+    Returns:
+        Dataset: The dataset with the Custom columns set
+    """
+    engine = get_indicator_matrix(data.districts)
+    scores = compute_scores(engine["matrix"], get_weight_vector(weights))
+    codes = classify_scores(scores)
+
+    # Most common class per state from one bincount over (state, class) pairs
+    n_labels = len(SCORE_LABELS)
+    n_states = len(engine["states"])
+    counts = np.bincount(engine["district_states"] * n_labels + codes,
+                         minlength=n_states * n_labels).reshape(n_states, n_labels)
+
+    result = data.assign(MCDA_COLUMN, SCORE_LABELS[codes],
+                         dict(zip(engine["states"], SCORE_LABELS[counts.argmax(axis=1)])),
+                         SCORE_LABELS[counts.sum(axis=0).argmax()])
+    return result.assign(MCDA_COLUMN + "_score", scores)
@@ -0,0 +1,386 @@
+# modules/data/pipeline.py
+
+"""
+Preprocessing pipeline module for the Solar Suitability Dashboard.
+
+This module turns a raw boundary shapefile into the optimized shapefile
+the dashboard loads. Unlike the original in-memory approach, features are
+read in fixed-size chunks, simplified and validated in a process pool and
+written to disk as each chunk finishes. A checkpoint file records the
+finished chunks, so an interrupted run picks up where it stopped.
+
+The attribute table is validated and normalized on the way (see
+modules.data.validation): numbers stored as text are converted, category
+labels are mapped onto the class vocabulary, and a profile report is
+written next to the output as <name>.profile.json.
+
+With --precision, coordinates are also snapped to a grid of that cell
+size, and the geometry is written a second time in the compact integer
+encoding of modules.data.geometry, which the loader then reads instead
+of parsing the shapefile geometry.
+
+The pipeline does not depend on Streamlit and can be run from the
+project root with:
+
+    python -m modules.data.pipeline --input <source.shp> --output <optimized.shp>
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+
+from modules.data.geometry import EncodedGeometry, quantize_geometries, get_geometry_path
+from modules.data.validation import VALIDATION_VERSION, validate_attributes, normalize_attributes, write_profile
+from modules.utils.constants import SHAPEFILE_PATH, ORIGINAL_SHAPEFILE_PATH
+
+DEFAULT_CHUNK_SIZE = 250
+DEFAULT_TOLERANCE = 0.01
+CHECKPOINT_NAME = "checkpoint.json"
+
+def scan_attributes(input_path):
+    """
+    Read the attribute table once (without geometry) to plan the run.
+
+    The scan validates the whole table in one pass (validate_attributes):
+    it decides which columns are converted to numbers, so the decision is
+    the same for every chunk, and profiles the table for the report.
+
+    Args:
+        input_path (str): Path to the source shapefile
+
+    Returns:
+        tuple: (feature_count, validation report; its "numeric_columns"
+        are the columns to convert)
+    """
+    attributes = gpd.read_file(input_path, ignore_geometry=True)
+    _, report = validate_attributes(attributes)
+    return len(attributes), report
+
+def process_chunk(input_path, parts_dir, chunk_index, start, stop, simplify_tolerance, numeric_columns,
+                  precision=None):
+    """
+    Simplify, validate, normalize and write one chunk of features.
+
+    This function runs inside a worker process. It reads its own slice of
+    the source file so that geometries never travel between processes, and
+    writes the result to a part file using a temporary name followed by an
+    atomic rename, so a part on disk is always complete.
+
+    Args:
+        input_path (str): Path to the source shapefile
+        parts_dir (str): Directory holding the finished part files
+        chunk_index (int): Position of the chunk in the source file
+        start (int): First feature of the chunk
+        stop (int): One past the last feature of the chunk
+        simplify_tolerance (float): Tolerance for simplification
+        numeric_columns (list): Columns to convert to numeric (from the scan)
+        precision (float, optional): Grid cell size to snap coordinates to
+
+    Returns:
+        dict: Counts of features read, repaired and dropped for the chunk
+    """
+    gdf = gpd.read_file(input_path, rows=slice(start, stop))
+
+    # Simplify all geometries of the chunk in one vectorized call
+    geometries = shapely.simplify(gdf.geometry.values, simplify_tolerance, preserve_topology=True)
+
+    # Repair whatever simplification (or the source) left invalid
+    invalid = ~shapely.is_valid(geometries)
+    if invalid.any():
+        geometries[invalid] = shapely.make_valid(geometries[invalid])
+
+    # Snapping keeps the geometries valid, so it comes after the repair
+    if precision:
+        geometries = quantize_geometries(geometries, precision)
+    gdf["geometry"] = geometries
+
+    # Drop features that no longer have any area to draw
+    empty = shapely.is_empty(geometries) | shapely.is_missing(geometries)
+    if empty.any():
+        gdf = gdf[~empty].copy()
+
+    # Same conversions and labels as the scan validated
+    gdf, _ = normalize_attributes(gdf, numeric_columns)
+
+    part_path = os.path.join(parts_dir, f"part_{chunk_index:05d}.parquet")
+    gdf.to_parquet(part_path + ".tmp")
+    os.replace(part_path + ".tmp", part_path)
+
+    return {
+        "chunk": chunk_index,
+        "features": stop - start,
+        "repaired": int(invalid.sum()),
+        "dropped": int(empty.sum())
+    }
+
+def peak_memory_mb():
+    """
+    Get the peak resident memory of this process and its workers.
+
+    Returns:
+        tuple: (parent peak MB, largest worker peak MB), or (None, None)
+        on platforms without the resource module (Windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None, None
+
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    parent = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return parent, children
+
+def load_checkpoint(checkpoint_path, settings):
+    """
+    Load the set of finished chunks from an earlier run.
+
+    The checkpoint is only reused when it was written with the same
+    settings; otherwise the part files cannot be trusted and the run
+    starts over.
+
+    Args:
+        checkpoint_path (str): Path of the checkpoint file
+        settings (dict): Settings of the current run
+
+    Returns:
+        set: Indexes of chunks that are already finished
+    """
+    if not os.path.exists(checkpoint_path):
+        return set()
+
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("settings") != settings:
+        return set()
+
+    return set(checkpoint.get("completed", []))
+
+def save_checkpoint(checkpoint_path, settings, completed):
+    """
+    Atomically record which chunks are finished.
+
+    Args:
+        checkpoint_path (str): Path of the checkpoint file
+        settings (dict): Settings of the current run
+        completed (set): Indexes of finished chunks
+
+    Returns:
+        None
+    """
+    with open(checkpoint_path + ".tmp", "w") as f:
+        json.dump({"settings": settings, "completed": sorted(completed)}, f)
+    os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+def write_output(parts_dir, chunk_count, output_path):
+    """
+    Stream the finished part files into the output shapefile in order.
+
+    Only one part is held in memory at a time. The first part creates the
+    shapefile and the remaining parts are appended to it.
+
+    Args:
+        parts_dir (str): Directory holding the finished part files
+        chunk_count (int): Number of chunks in the run
+        output_path (str): Path of the optimized shapefile
+
+    Returns:
+        int: Number of features written
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    written = 0
+    for chunk_index in range(chunk_count):
+        part = gpd.read_parquet(os.path.join(parts_dir, f"part_{chunk_index:05d}.parquet"))
+        part.to_file(output_path, mode="w" if chunk_index == 0 else "a")
+        written += len(part)
+
+    return written
+
+def write_encoded_geometry(parts_dir, chunk_count, output_path, precision):
+    """
+    Write the geometry of the finished parts in the compact encoding.
+
+    The file records the size and modification time of the shapefile it
+    belongs to, so the loader can tell when it no longer matches.
+
+    Args:
+        parts_dir (str): Directory holding the finished part files
+        chunk_count (int): Number of chunks in the run
+        output_path (str): Path of the optimized shapefile (already written)
+        precision (float): Grid cell size the coordinates were snapped to
+
+    Returns:
+        EncodedGeometry: The encoded geometry
+    """
+    parts = [gpd.read_parquet(os.path.join(parts_dir, f"part_{chunk_index:05d}.parquet"), columns=["geometry"])
+             for chunk_index in range(chunk_count)]
+    geometry = pd.concat([part.geometry for part in parts], ignore_index=True)
+
+    encoded = EncodedGeometry.from_geometries(geometry.values, precision, geometry.crs)
+    stat = os.stat(output_path)
+    encoded.save(get_geometry_path(output_path), shp_size=stat.st_size, shp_mtime_ns=stat.st_mtime_ns)
+    return encoded
+
+def run_pipeline(input_path, output_path, simplify_tolerance=DEFAULT_TOLERANCE,
+                 chunk_size=DEFAULT_CHUNK_SIZE, workers=None, resume=True, precision=None, progress=print):
+    """
+    Run the chunked preprocessing pipeline.
+
+    Chunks are submitted to a process pool with a bounded number in flight,
+    so memory stays proportional to the chunk size rather than the source
+    size. Each finished chunk is checkpointed immediately. When every chunk
+    is done the parts are merged into the output shapefile and the working
+    directory is removed.
+
+    Args:
+        input_path (str): Path to the source shapefile
+        output_path (str): Path to save the optimized shapefile
+        simplify_tolerance (float): Tolerance for simplification (higher = more simplification)
+        chunk_size (int): Number of features per chunk
+        workers (int, optional): Number of worker processes (default: CPU count)
+        resume (bool): Reuse finished chunks from an interrupted run
+        precision (float, optional): Grid cell size to snap coordinates to;
+            also writes the encoded geometry next to the output
+        progress (callable): Function receiving progress messages
+
+    Returns:
+        dict: Run summary with feature counts, throughput and peak memory
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+
+    feature_count, report = scan_attributes(input_path)
+    numeric_columns = report["numeric_columns"]
+    chunks = [(i, start, min(start + chunk_size, feature_count))
+              for i, start in enumerate(range(0, feature_count, chunk_size))]
+    progress(f"Source has {feature_count} features in {len(chunks)} chunks of {chunk_size}")
+
+    # Part files and the checkpoint live next to the output
+    work_dir = output_path + ".work"
+    parts_dir = os.path.join(work_dir, "parts")
+    checkpoint_path = os.path.join(work_dir, CHECKPOINT_NAME)
+    settings = {
+        "input": os.path.abspath(input_path),
+        "input_mtime": os.path.getmtime(input_path),
+        "chunk_size": chunk_size,
+        "simplify_tolerance": simplify_tolerance,
+        "precision": precision,
+        "validation_version": VALIDATION_VERSION
+    }
+
+    if not resume and os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(parts_dir, exist_ok=True)
+
+    completed = load_checkpoint(checkpoint_path, settings)
+    if completed:
+        progress(f"Resuming: {len(completed)} of {len(chunks)} chunks already done")
+    pending = [chunk for chunk in chunks if chunk[0] not in completed]
+
+    totals = {"processed": 0, "repaired": 0, "dropped": 0}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        queue = iter(pending)
+
+        # Keep at most two chunks per worker in flight
+        while True:
+            while len(in_flight) < workers * 2:
+                chunk = next(queue, None)
+                if chunk is None:
+                    break
+                in_flight.add(executor.submit(process_chunk, input_path, parts_dir, *chunk,
+                                              simplify_tolerance, numeric_columns, precision))
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                completed.add(result["chunk"])
+                save_checkpoint(checkpoint_path, settings, completed)
+
+                totals["processed"] += result["features"]
+                totals["repaired"] += result["repaired"]
+                totals["dropped"] += result["dropped"]
+                elapsed = time.perf_counter() - started
+                progress(f"Chunk {result['chunk'] + 1}/{len(chunks)} done "
+                         f"({len(completed)}/{len(chunks)}, {totals['processed'] / elapsed:.0f} features/s)")
+
+    written = write_output(parts_dir, len(chunks), output_path)
+    geometry_path = get_geometry_path(output_path)
+    if precision:
+        encoded = write_encoded_geometry(parts_dir, len(chunks), output_path, precision)
+        progress(f"Wrote encoded geometry ({encoded.nbytes / 1024:.0f} KB) to {geometry_path}")
+    elif os.path.exists(geometry_path):
+        # An encoding of an earlier run would no longer match the output
+        os.remove(geometry_path)
+    shutil.rmtree(work_dir)
+
+    # Geometry counts cover the chunks processed by this run
+    report["rows_kept"] = written
+    report["geometry"] = {"repaired": totals["repaired"], "dropped": totals["dropped"]}
+    profile_path = write_profile(report, output_path)
+    progress(f"Wrote the profile report to {profile_path}")
+
+    elapsed = time.perf_counter() - started
+    parent_mb, worker_mb = peak_memory_mb()
+    summary = {
+        "features": feature_count,
+        "written": written,
+        "processed_this_run": totals["processed"],
+        "repaired": totals["repaired"],
+        "dropped": totals["dropped"],
+        "numeric_columns": numeric_columns,
+        "profile": profile_path,
+        "seconds": round(elapsed, 2),
+        "features_per_second": round(totals["processed"] / elapsed, 1) if elapsed > 0 else None,
+        "peak_memory_mb": parent_mb,
+        "peak_worker_memory_mb": worker_mb
+    }
+
+    progress(f"Wrote {written} features to {output_path} in {elapsed:.1f}s "
+             f"({summary['features_per_second']} features/s)")
+    if parent_mb is not None:
+        progress(f"Peak memory: {parent_mb:.0f} MB (main), {worker_mb:.0f} MB (largest worker)")
+
+    return summary
+
+def main(argv=None):
+    """
+    Command-line entry point for the preprocessing pipeline.
+
+    Args:
+        argv (list, optional): Command-line arguments (default: sys.argv)
+
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Build the optimized shapefile for the dashboard.")
+    parser.add_argument("--input", default=ORIGINAL_SHAPEFILE_PATH, help="Source shapefile")
+    parser.add_argument("--output", default=SHAPEFILE_PATH, help="Optimized shapefile to write")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Simplification tolerance")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Features per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore any checkpoint and start over")
+    parser.add_argument("--precision", type=float, default=None,
+                        help="Snap coordinates to this grid (e.g. 1e-4) and write the encoded geometry")
+    args = parser.parse_args(argv)
+
+    run_pipeline(args.input, args.output, simplify_tolerance=args.tolerance,
+                 chunk_size=args.chunk_size, workers=args.workers, resume=not args.no_resume,
+                 precision=args.precision)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,40 +11,27 @@ analysis capabilities.
 import streamlit as st
 import pandas as pd
 import geopandas as gpd
+from modules.utils.profiling import timed
 
-def filter_data_with_shapefile(_gdf, selected_state, selected_district):
+@timed()
+def filter_data_with_shapefile(data, selected_state, selected_district):
     """
-    Filter the GeoDataFrame based on selected state and district.
+    Get the rows summarizing the selected state and district.
     
-    This function filters the input GeoDataFrame to return only the rows
-    that match the selected state and district. It handles special cases
-    like "National Average" and "All Districts" selections.
+    The national and state selections ("National Average" and "All
+    Districts") are rows of the averages table; a district selection
+    returns the district's rows. See Dataset.summary.
     
     Args:
-        _gdf (GeoDataFrame): Input GeoDataFrame with all data
+        data (Dataset): The processed dataset
         selected_state (str): Selected state or "National Average"
         selected_district (str): Selected district or "All Districts"
         
     Returns:
-        GeoDataFrame: Filtered data based on selection
+        DataFrame: Filtered data based on selection
     """
-    filtered_gdf = _gdf.copy()
-    
-    if selected_state == "National Average":
-        # For national average, get only the national average row
-        filtered_gdf = filtered_gdf[filtered_gdf["NAME_1"] == "National Average"]
-    else:
-        # For state selection
-        if selected_district == "All Districts":
-            # Get the state average row
-            filtered_gdf = filtered_gdf[(filtered_gdf["NAME_1"].astype(str) == selected_state) & 
-                                     (filtered_gdf["NAME_2"] == "All Districts")]
-        else:
-            # Get the specific district
-            filtered_gdf = filtered_gdf[(filtered_gdf["NAME_1"].astype(str) == selected_state) & 
-                                     (filtered_gdf["NAME_2"].astype(str) == selected_district)]
-    
-    return filtered_gdf
+    return data.summary(selected_state, selected_district)
+
 
 def get_color_for_value(value):
     """
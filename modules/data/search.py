@@ -0,0 +1,182 @@
+# modules/data/search.py
+
+"""
+District search module for the Solar Suitability Dashboard.
+
+This module builds a type-ahead index over every state (NAME_1) and
+district (NAME_2) of the dataset, including the alternate spellings in
+VARNAME_2, once per dataset. A query is answered from the index alone:
+
+1. names equal to the query;
+2. names (or any word of a name) starting with the query, found by
+   binary search in a sorted array of keys;
+3. if nothing matched yet, names sharing the most character trigrams
+   with the query, which tolerates typos and transliteration variants
+   ("Ahmedabad" finds "Ahmadabad").
+
+The index also holds the sorted district list of every state, so the
+district dropdown no longer filters and sorts the frame on every rerun.
+"""
+
+import bisect
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+from modules.data.loader import get_dataset_fingerprint
+from modules.utils.memory_cache import BoundedCache
+
+# Separator of alternate names in VARNAME_2 (GADM convention)
+VARNAME_SEPARATOR = "|"
+
+DEFAULT_LIMIT = 8
+
+# Minimum share of the query's trigrams a fuzzy match must contain
+MIN_TRIGRAM_SCORE = 0.4
+
+def normalize_name(text):
+    """
+    Normalize a name for matching: no accents, lower case, letters and digits only.
+
+    Args:
+        text (str): The name or query
+
+    Returns:
+        str: The normalized key, words separated by single spaces
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+def get_trigrams(key):
+    """
+    Get the character trigrams of a normalized key.
+
+    Args:
+        key (str): Normalized name
+
+    Returns:
+        set: Trigrams of the key padded with spaces
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_search_index(_gdf):
+    """
+    Build the search index of a dataset.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        dict: "entries" (list of (state, district, label) targets; a state
+        target has the district "All Districts"), "keys" and "key_entries"
+        (sorted prefix keys and the entry of each), "trigrams" (trigram ->
+        entry array), "exact" (normalized name -> entries), "names"
+        (normalized names per entry) and
+        "districts_by_state" (sorted district list per state)
+    """
+    districts = _gdf
+    states = districts["NAME_1"].map(str).to_numpy()
+    names = districts["NAME_2"].map(str).to_numpy()
+    varnames = (districts["VARNAME_2"].to_numpy() if "VARNAME_2" in districts.columns
+                else np.full(len(districts), None, dtype=object))
+
+    districts_by_state = defaultdict(set)
+    for state, name in zip(states, names):
+        districts_by_state[state].add(name)
+    districts_by_state = {state: sorted(values) for state, values in sorted(districts_by_state.items())}
+
+    entries = [(state, "All Districts", state) for state in districts_by_state]
+    entry_names = [[normalize_name(state)] for state in districts_by_state]
+    seen = set()
+    for state, name, varname in zip(states, names, varnames):
+        if (state, name) in seen:
+            continue
+        seen.add((state, name))
+        aliases = [name]
+        if isinstance(varname, str) and varname.strip():
+            aliases += [alias.strip() for alias in varname.split(VARNAME_SEPARATOR) if alias.strip()]
+        entries.append((state, name, f"{name}, {state}"))
+        entry_names.append(list(dict.fromkeys(normalize_name(alias) for alias in aliases)))
+
+    # Every word start of every name is a prefix key, so "goa" finds "North Goa"
+    prefix_keys = []
+    exact = defaultdict(list)
+    trigrams = defaultdict(set)
+    for i, keys in enumerate(entry_names):
+        for key in keys:
+            exact[key].append(i)
+            words = key.split(" ")
+            for w in range(len(words)):
+                prefix_keys.append((" ".join(words[w:]), i))
+            for trigram in get_trigrams(key):
+                trigrams[trigram].add(i)
+    prefix_keys.sort()
+
+    return {
+        "entries": entries,
+        "keys": [key for key, _ in prefix_keys],
+        "key_entries": np.array([i for _, i in prefix_keys], dtype=np.int32),
+        "exact": dict(exact),
+        "trigrams": {t: np.fromiter(ids, dtype=np.int32) for t, ids in trigrams.items()},
+        "names": entry_names,
+        "districts_by_state": districts_by_state
+    }
+
+# Search index per dataset fingerprint, oldest first
+SEARCH_INDEX_CACHE_SIZE = 4
+_indexes = BoundedCache(SEARCH_INDEX_CACHE_SIZE)
+
+def get_search_index(_gdf):
+    """
+    Get the search index of a dataset, building it on first use.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        dict: The index from build_search_index
+    """
+    key = get_dataset_fingerprint(_gdf)
+    return _indexes.get_or_build(key, lambda: build_search_index(_gdf))
+
+def search_districts(index, query, limit=DEFAULT_LIMIT):
+    """
+    Find the states and districts matching a query.
+
+    Args:
+        index (dict): The index from build_search_index
+        query (str): Name or beginning of a name, in any case or spelling
+        limit (int): Maximum number of results
+
+    Returns:
+        list: (state, district, label) targets, best match first; states
+        come before districts of the same rank
+    """
+    query = normalize_name(query)
+    if not query:
+        return []
+
+    exact = index["exact"].get(query, [])
+
+    # All keys starting with the query are one contiguous run of the sorted keys
+    start = bisect.bisect_left(index["keys"], query)
+    stop = bisect.bisect_left(index["keys"], query + "\uffff", lo=start)
+    prefix = sorted(set(index["key_entries"][start:stop].tolist()) - set(exact),
+                    key=lambda i: (index["entries"][i][1] != "All Districts", index["entries"][i][2]))
+
+    results = exact + prefix
+    if not results and len(query) > 2:
+        # Rank by the share of the query's trigrams each entry contains
+        query_trigrams = get_trigrams(query)
+        hits = [index["trigrams"][t] for t in query_trigrams if t in index["trigrams"]]
+        if hits:
+            counts = np.bincount(np.concatenate(hits), minlength=len(index["entries"]))
+            scores = counts / len(query_trigrams)
+            candidates = np.nonzero(scores >= MIN_TRIGRAM_SCORE)[0]
+            results = candidates[np.argsort(-scores[candidates], kind="stable")].tolist()
+
+    return [index["entries"][i] for i in results[:limit]]
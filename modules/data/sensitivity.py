@@ -0,0 +1,294 @@
+# modules/data/sensitivity.py
+
+"""
+Weight sensitivity analysis module for the Solar Suitability Dashboard.
+
+This module measures how stable the Custom suitability class of each
+district (see modules.data.mcda) is when the indicator weights are
+uncertain. It draws many weight vectors around the chosen weights, scores
+every district for all of them at once and counts how often each
+district lands in each suitability class. The stability of a district is
+the share of samples that keep the class it gets with the chosen weights,
+which is the class the map shows.
+
+Samples are processed in fixed-size batches: each batch is one
+(samples x indicators) @ (indicators x districts) product followed by
+per-sample quartile binning. Every batch draws from its own random
+stream spawned from the seed, so a run is reproducible from the seed
+whether the batches run in this process or, for runs with more work than
+the pool threshold, in a process pool. The pool is shared by all sessions
+and bounded (SOLAR_DASHBOARD_SENSITIVITY_WORKERS, default 4), and its
+workers are spawned rather than forked, since the server process runs
+threads of its own.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.data.mcda import (
+    SCORE_QUANTILES, SCORE_LABELS, get_indicator_matrix, get_weight_vector, compute_scores, classify_scores
+)
+from modules.utils.constants import suitability_category_mapping
+from modules.utils.profiling import record_cache_miss
+
+# Name of the map layer holding the stability of the Custom class
+STABILITY_COLUMN = "Stability"
+
+# Column of the result holding the Custom class of the chosen weights
+CURRENT_COLUMN = "Current Class"
+
+# Classes reported per district, from suitability_category_mapping
+CLASS_NAMES = [name for name, value in sorted(suitability_category_mapping.items(), key=lambda item: item[1])
+               if value > 0]
+
+DEFAULT_SAMPLES = 2000
+DEFAULT_SPREAD = 0.5
+BATCH_SIZE = 500
+
+# Runs with more sample x district x indicator terms than this are split
+# across a process pool (about 0.4 s of scoring in one process, well above
+# the cost of starting the pool); the UI's 50000 samples are ~470 million
+POOL_THRESHOLD = 100_000_000
+POOL_THRESHOLD_ENV = "SOLAR_DASHBOARD_SENSITIVITY_POOL"
+
+# Largest number of worker processes of the shared pool
+DEFAULT_POOL_WORKERS = 4
+POOL_WORKERS_ENV = "SOLAR_DASHBOARD_SENSITIVITY_WORKERS"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool_threshold():
+    """
+    Get the amount of work above which a run uses a process pool.
+
+    Returns:
+        int: SOLAR_DASHBOARD_SENSITIVITY_POOL (sample x district x
+        indicator terms), or POOL_THRESHOLD
+    """
+    try:
+        return max(0, int(os.environ.get(POOL_THRESHOLD_ENV, POOL_THRESHOLD)))
+    except ValueError:
+        return POOL_THRESHOLD
+
+def get_pool_workers():
+    """
+    Get the number of worker processes of the shared pool.
+
+    Returns:
+        int: SOLAR_DASHBOARD_SENSITIVITY_WORKERS, or DEFAULT_POOL_WORKERS,
+        at most the number of CPUs
+    """
+    try:
+        workers = max(1, int(os.environ.get(POOL_WORKERS_ENV, DEFAULT_POOL_WORKERS)))
+    except ValueError:
+        workers = DEFAULT_POOL_WORKERS
+    return min(workers, os.cpu_count() or 1)
+
+def _create_pool(workers):
+    # Forking a process that runs threads can deadlock the child
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def get_pool():
+    """
+    Get the process pool shared by all runs, starting it on first use.
+
+    Returns:
+        ProcessPoolExecutor: The pool, with get_pool_workers() processes
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _create_pool(get_pool_workers())
+        return _pool
+
+def sample_weights(weight_vector, n_samples, spread, rng):
+    """
+    Draw weight vectors around the given weights.
+
+    Every weight is scaled by an independent factor drawn uniformly from
+    [1 - spread, 1 + spread]; signs are kept, so an indicator never
+    switches between favoring high and low values.
+
+    Args:
+        weight_vector (numpy.ndarray): Chosen weight per indicator
+        n_samples (int): Number of vectors to draw
+        spread (float): Relative uncertainty of each weight (0-1)
+        rng (numpy.random.Generator): Random stream to draw from
+
+    Returns:
+        numpy.ndarray: Weight vectors of shape (samples, indicators), float32
+    """
+    factors = rng.uniform(1 - spread, 1 + spread, size=(n_samples, len(weight_vector)))
+    return (factors * weight_vector).astype(np.float32)
+
+def score_batch(matrix, samples):
+    """
+    Score every district for every weight vector of a batch.
+
+    This is the batched form of mcda.compute_scores: negative weights
+    contribute |w| - |w| * x, and each score is normalized by the sum of
+    absolute weights of its sample.
+
+    Args:
+        matrix (numpy.ndarray): Normalized indicator matrix (districts, indicators)
+        samples (numpy.ndarray): Weight vectors (samples, indicators)
+
+    Returns:
+        numpy.ndarray: Scores of shape (samples, districts)
+    """
+    totals = np.abs(samples).sum(axis=1, keepdims=True)
+    offsets = -np.where(samples < 0, samples, 0).sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (samples @ matrix.T + offsets) / totals
+
+def classify_batch(scores):
+    """
+    Bin each sample's scores at that sample's quartiles.
+
+    Args:
+        scores (numpy.ndarray): Scores of shape (samples, districts)
+
+    Returns:
+        numpy.ndarray: Class index (0 = lowest) of shape (samples, districts)
+    """
+    breaks = np.quantile(scores, SCORE_QUANTILES, axis=1)  # (quantiles, samples)
+    return (scores[:, :, np.newaxis] >= breaks.T[:, np.newaxis, :]).sum(axis=2)
+
+def count_batch(matrix, weight_vector, n_samples, spread, seed_sequence):
+    """
+    Count how often each district lands in each class for one batch.
+
+    Runs in this process or in a worker of the pool.
+
+    Args:
+        matrix (numpy.ndarray): Normalized indicator matrix
+        weight_vector (numpy.ndarray): Chosen weight per indicator
+        n_samples (int): Number of samples in the batch
+        spread (float): Relative uncertainty of each weight
+        seed_sequence (numpy.random.SeedSequence): Seed of the batch
+
+    Returns:
+        numpy.ndarray: Counts of shape (districts, classes)
+    """
+    rng = np.random.default_rng(seed_sequence)
+    codes = classify_batch(score_batch(matrix, sample_weights(weight_vector, n_samples, spread, rng)))
+    return np.stack([(codes == c).sum(axis=0) for c in range(len(CLASS_NAMES))], axis=1)
+
+def run_sensitivity(_gdf, weights, n_samples=DEFAULT_SAMPLES, spread=DEFAULT_SPREAD, seed=0, workers=None):
+    """
+    Estimate the class probabilities of every district under weight uncertainty.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        weights (dict): Chosen weight per layer name, between -1 and 1
+        n_samples (int): Number of weight vectors to draw
+        spread (float): Relative uncertainty of each weight (0-1)
+        seed (int): Seed of the run
+        workers (int, optional): Worker processes of a pool for this run
+            alone; by default the shared pool (get_pool) is used when
+            samples x districts x indicators exceeds get_pool_threshold()
+
+    Returns:
+        DataFrame: One row per district, in the order of the indicator
+        matrix, with the probability of each class, the class of the
+        chosen weights, the most likely class and, as the stability, the
+        probability of the class of the chosen weights
+    """
+    engine = get_indicator_matrix(_gdf)
+    matrix = engine["matrix"]
+    weight_vector = get_weight_vector(weights)
+
+    # Fixed batch boundaries and one spawned seed per batch keep the
+    # result independent of where the batches run
+    sizes = [min(BATCH_SIZE, n_samples - start) for start in range(0, n_samples, BATCH_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    executor = None
+    if workers is None:
+        if n_samples * matrix.shape[0] * matrix.shape[1] > get_pool_threshold() and get_pool_workers() > 1:
+            executor = get_pool()
+    elif workers > 1:
+        executor = _create_pool(workers)
+
+    if executor is not None:
+        try:
+            counts = sum(executor.map(count_batch, [matrix] * len(sizes), [weight_vector] * len(sizes),
+                                      sizes, [spread] * len(sizes), seeds))
+        finally:
+            if executor is not _pool:
+                executor.shutdown()
+    else:
+        counts = sum(count_batch(matrix, weight_vector, size, spread, seq) for size, seq in zip(sizes, seeds))
+
+    if np.abs(weight_vector).sum() == 0:
+        # Without weights there are no scores, hence no classes
+        counts = np.zeros_like(counts)
+
+    probabilities = counts / max(n_samples, 1)
+    result = pd.DataFrame(probabilities, columns=CLASS_NAMES)
+    result.insert(0, "NAME_2", _gdf["NAME_2"].to_numpy())
+    result.insert(0, "NAME_1", _gdf["NAME_1"].to_numpy())
+    # The class the map shows, as apply_weights assigns it
+    current = classify_scores(compute_scores(matrix, weight_vector))
+    scored = current < len(CLASS_NAMES)
+    result[CURRENT_COLUMN] = SCORE_LABELS[current]
+    result["Most Likely"] = np.where(probabilities.sum(axis=1) > 0,
+                                     np.array(CLASS_NAMES, dtype=object)[probabilities.argmax(axis=1)],
+                                     SCORE_LABELS[-1])
+    result[STABILITY_COLUMN] = np.where(
+        scored, probabilities[np.arange(len(current)), np.minimum(current, len(CLASS_NAMES) - 1)], 0.0)
+    return result
+
+def apply_stability(data, sensitivity):
+    """
+    Add the stability layer to the dataset.
+
+    Districts get the probability (in %) of keeping their Custom class;
+    the state and national averages get the mean over their districts.
+
+    Args:
+        data (Dataset): The dataset with the Custom columns set
+        sensitivity (DataFrame): Result of run_sensitivity
+
+    Returns:
+        Dataset: The dataset with the Stability column set
+    """
+    engine = get_indicator_matrix(data.districts)
+    stability = sensitivity[STABILITY_COLUMN].to_numpy() * 100
+
+    # Per-state means from one bincount over the state index
+    n_states = len(engine["states"])
+    sums = np.bincount(engine["district_states"], weights=stability, minlength=n_states)
+    sizes = np.bincount(engine["district_states"], minlength=n_states)
+    return data.assign(STABILITY_COLUMN, stability, dict(zip(engine["states"], sums / np.maximum(sizes, 1))),
+                       stability.mean() if len(stability) else np.nan)
+
+@st.cache_data(max_entries=16, show_spinner="Running sensitivity analysis...")
+def get_sensitivity(_gdf, fingerprint, weights, n_samples, spread, seed):
+    """
+    Cached run_sensitivity for the dashboard.
+
+    The geodataframe is not hashed; the dataset fingerprint and the run
+    settings identify the result instead.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        fingerprint (str): Fingerprint of the dataset
+        weights (tuple): Tuple of (layer, weight) pairs
+        n_samples (int): Number of weight vectors to draw
+        spread (float): Relative uncertainty of each weight
+        seed (int): Seed of the run
+
+    Returns:
+        DataFrame: Result of run_sensitivity
+    """
+    # This body only runs when the cache misses
+    record_cache_miss()
+    return run_sensitivity(_gdf, dict(weights), n_samples, spread, seed)
@@ -0,0 +1,252 @@
+# modules/data/spatial.py
+
+"""
+Spatial statistics module for the Solar Suitability Dashboard.
+
+This module knows which districts touch. The adjacency graph is built
+once per dataset with a spatial index (districts whose boundaries
+intersect are neighbors), stored as a sparse matrix in the disk
+cache (modules.utils.disk_cache) and reused from there.
+
+On top of the graph it computes local spatial statistics for any layer
+as sparse matrix-vector products:
+
+- Getis-Ord Gi* z-scores, which find clusters of high (hot spots) or
+  low (cold spots) values;
+- local Moran's I with its z-score under randomization, which finds
+  districts that stand out from their neighbors (spatial outliers).
+
+Both are summarized in a "Hotspots" column that the map draws like a
+suitability category.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import shapely
+
+from modules.data.loader import get_geometry_fingerprint
+from modules.utils.constants import suitability_category_mapping
+from modules.utils.disk_cache import get_or_compute, make_key
+from modules.utils.memory_cache import BoundedCache
+from modules.utils.profiling import timed
+
+# Name of the map layer holding the cluster classes
+HOTSPOT_COLUMN = "Hotspots"
+
+# Critical z-values for 90% and 95% confidence (two-sided)
+Z_90 = 1.645
+Z_95 = 1.96
+
+# Class labels of the hotspot layer and their map codes (0-4)
+HOTSPOT_CODES = {
+    "Hot spot (95%)": 4,
+    "Hot spot (90%)": 3,
+    "Spatial outlier": 2,
+    "Cold spot": 1,
+    "Not significant": 0
+}
+
+def build_adjacency(geometries):
+    """
+    Build the adjacency matrix of a set of polygons.
+
+    One bulk spatial-index query finds every pair of intersecting
+    polygons, so shared borders and corners make neighbors (queen
+    contiguity). Districts without neighbors (islands) keep an empty row.
+
+    Args:
+        geometries (array-like): Shapely polygons, one per district
+
+    Returns:
+        scipy.sparse.csr_matrix: Symmetric binary adjacency matrix without self-loops
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    tree = shapely.STRtree(geometries)
+    left, right = tree.query(geometries, predicate="intersects")
+    keep = left != right
+    n = len(geometries)
+    adjacency = sp.coo_matrix((np.ones(keep.sum(), dtype=np.float32), (left[keep], right[keep])), shape=(n, n))
+    adjacency = adjacency.tocsr()
+    # Make it symmetric in case the predicate missed a direction
+    return ((adjacency + adjacency.T) > 0).astype(np.float32)
+
+# Adjacency matrix per geometry fingerprint, oldest first
+ADJACENCY_CACHE_SIZE = 4
+_adjacency = BoundedCache(ADJACENCY_CACHE_SIZE)
+
+def get_adjacency(_gdf):
+    """
+    Get the district adjacency matrix of a dataset.
+
+    The matrix is built on first use and stored in the disk cache, so
+    later server processes load it instead of querying the geometry again.
+    Rows follow the order of the rows of the district table.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+
+    Returns:
+        scipy.sparse.csr_matrix: Binary adjacency matrix of the districts
+    """
+    key = get_geometry_fingerprint(_gdf)
+    disk_key = make_key("adjacency", key)
+    return _adjacency.get_or_build(
+        key, lambda: get_or_compute("adjacency", disk_key, lambda: build_adjacency(_gdf.geometry.values)))
+
+def getis_ord_g_star(values, adjacency):
+    """
+    Compute the Getis-Ord Gi* z-score of every district.
+
+    Gi* compares the sum over a district and its neighbors (binary
+    weights, self included) with what the global mean and variance would
+    give for that many districts.
+
+    Args:
+        values (numpy.ndarray): Value per district, without missing values
+        adjacency (scipy.sparse.csr_matrix): Binary adjacency matrix
+
+    Returns:
+        numpy.ndarray: Gi* z-score per district
+    """
+    n = len(values)
+    weights = adjacency + sp.identity(n, dtype=np.float32, format="csr")
+    mean = values.mean()
+    s = np.sqrt((values ** 2).mean() - mean ** 2)
+
+    w_sum = np.asarray(weights.sum(axis=1)).ravel()  # binary: sum of w equals sum of w^2
+    numerator = weights @ values - mean * w_sum
+    denominator = s * np.sqrt((n * w_sum - w_sum ** 2) / (n - 1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, numerator / denominator, 0.0)
+
+def local_morans_i(values, adjacency):
+    """
+    Compute local Moran's I and its z-score under randomization.
+
+    Weights are row-standardized. The expectation and variance follow
+    Anselin (1995), so the z-scores need no permutation runs.
+
+    Args:
+        values (numpy.ndarray): Value per district, without missing values
+        adjacency (scipy.sparse.csr_matrix): Binary adjacency matrix
+
+    Returns:
+        tuple: (local I per district, z-score per district)
+    """
+    n = len(values)
+    degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    with np.errstate(divide="ignore"):
+        weights = sp.diags(np.where(degree > 0, 1.0 / degree, 0.0)) @ adjacency
+
+    z = values - values.mean()
+    m2 = (z ** 2).mean()
+    if m2 == 0:
+        return np.zeros(n), np.zeros(n)
+    b2 = (z ** 4).mean() / m2 ** 2
+
+    local_i = z / m2 * (weights @ z)
+
+    w_i = np.asarray(weights.sum(axis=1)).ravel()
+    w_i2 = np.asarray(weights.multiply(weights).sum(axis=1)).ravel()
+    w_ikh = w_i ** 2 - w_i2
+    expected = -w_i / (n - 1)
+    variance = (w_i2 * (n - b2) / (n - 1)
+                + w_ikh * (2 * b2 - n) / ((n - 1) * (n - 2))
+                - expected ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z_scores = np.where(variance > 0, (local_i - expected) / np.sqrt(variance), 0.0)
+    return local_i, z_scores
+
+def get_layer_values(districts, column):
+    """
+    Get a layer as numbers, with suitability labels mapped to their codes.
+
+    Args:
+        districts (DataFrame): The district rows
+        column (str): The layer column
+
+    Returns:
+        numpy.ndarray: Value per district (NaN where unknown)
+    """
+    values = districts[column]
+    if not pd.api.types.is_numeric_dtype(values):
+        return values.map(suitability_category_mapping).replace(0, np.nan).to_numpy(dtype=np.float64)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+def classify_hotspots(g_star, moran_z, local_i):
+    """
+    Turn the local statistics into hotspot classes.
+
+    Significant Gi* clusters take precedence; among the remaining
+    districts, a significantly negative local Moran's I marks a spatial
+    outlier (a high value among low neighbors or the other way round).
+
+    Args:
+        g_star (numpy.ndarray): Gi* z-scores
+        moran_z (numpy.ndarray): z-scores of local Moran's I
+        local_i (numpy.ndarray): Local Moran's I
+
+    Returns:
+        numpy.ndarray: Class label per district
+    """
+    labels = np.full(len(g_star), "Not significant", dtype=object)
+    labels[(local_i < 0) & (moran_z <= -Z_95)] = "Spatial outlier"
+    labels[g_star <= -Z_90] = "Cold spot"
+    labels[g_star >= Z_90] = "Hot spot (90%)"
+    labels[g_star >= Z_95] = "Hot spot (95%)"
+    return labels
+
+def compute_hotspots(_gdf, column):
+    """
+    Compute the local statistics of a layer for every district.
+
+    Districts with a missing value are left out of the statistics (their
+    row and column are dropped from the graph) and classed as not
+    significant.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        column (str): The layer column to analyze
+
+    Returns:
+        DataFrame: One row per district with NAME_1, NAME_2, Gi*, local
+        Moran's I, its z-score and the hotspot class
+    """
+    districts = _gdf
+    values = get_layer_values(districts, column)
+
+    known = ~np.isnan(values)
+    g_star = np.zeros(len(values))
+    local_i = np.zeros(len(values))
+    moran_z = np.zeros(len(values))
+    if known.sum() > 2:
+        adjacency = get_adjacency(_gdf)[known][:, known]
+        g_star[known] = getis_ord_g_star(values[known], adjacency)
+        local_i[known], moran_z[known] = local_morans_i(values[known], adjacency)
+
+    return pd.DataFrame({
+        "NAME_1": districts["NAME_1"].to_numpy(),
+        "NAME_2": districts["NAME_2"].to_numpy(),
+        "Gi*": g_star,
+        "Local Moran's I": local_i,
+        "Moran z": moran_z,
+        HOTSPOT_COLUMN: classify_hotspots(g_star, moran_z, local_i)
+    })
+
+@timed()
+def apply_hotspots(_gdf, column):
+    """
+    Add the hotspot layer of a column to the district table.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        column (str): The layer column to analyze
+
+    Returns:
+        GeoDataFrame: The district table with the Hotspots column set
+    """
+    hotspots = compute_hotspots(_gdf, column)
+    result = _gdf.copy(deep=False)
+    result[HOTSPOT_COLUMN] = hotspots[HOTSPOT_COLUMN].to_numpy()
+    return result
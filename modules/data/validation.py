@@ -0,0 +1,408 @@
+# modules/data/validation.py
+
+"""
+Dataset validation module for the Solar Suitability Dashboard.
+
+The source data has problems the dashboard used to patch over at load
+time: numbers stored as text, suitability labels with spelling variants
+("Moderatly Suitable") or qualifiers ("Highly Suitable (On Grid)") that
+match none of the class colors, rows without a name or a geometry, and
+invalid polygons. This module checks and normalizes a dataset in one
+vectorized pass over the whole table:
+
+- schema: the name columns exist and every layer of the registry is
+  numeric (text is converted, and values that do not parse are counted);
+- labels: category labels are mapped onto the class vocabulary, fixing
+  spelling variants (LABEL_ALIASES) and moving qualifiers to a note
+  column (NOTE_COLUMNS); only the distinct labels are parsed;
+- geometry: invalid polygons are repaired and rows without a geometry
+  dropped;
+- profile: the dtype and NaN rate of every column, missing and duplicate
+  district names.
+
+The result is a normalized dataset and a profile report. The pipeline
+(modules.data.pipeline) validates while it builds the optimized shapefile
+and writes the report next to it as <name>.profile.json; the command line
+of this module does the same for an existing shapefile:
+
+    python -m modules.data.validation --input <source.shp> --output <normalized.shp>
+
+The loader reads a shapefile with a matching report as it is, and
+validates any other file in memory when it loads it.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from modules.data.geometry import get_geometry_path
+from modules.utils.constants import SHAPEFILE_PATH, layer_registry, suitability_category_mapping
+
+# Reports of other versions of these rules are not trusted by the loader
+VALIDATION_VERSION = 2
+
+PROFILE_SUFFIX = ".profile.json"
+
+NAME_COLUMNS = ["NAME_1", "NAME_2"]
+
+# Suitability category columns and the columns receiving their qualifiers
+# (shapefile column names have at most 10 characters)
+LABEL_COLUMNS = ["Adaptation", "Mitigation", "Replacment", "General_SI"]
+NOTE_COLUMNS = {
+    "Adaptation": "Adapt_note",
+    "Mitigation": "Mitig_note",
+    "Replacment": "Repl_note",
+    "General_SI": "GenSI_note"
+}
+
+# Columns that hold names or labels and must never be coerced to numbers
+TEXT_COLUMNS = [
+    "NAME_0", "NAME_1", "NAME_2", "VARNAME_2", "NL_NAME_2", "TYPE_2", "ENGTYPE_2"
+] + LABEL_COLUMNS + list(NOTE_COLUMNS.values())
+
+# Numeric layer columns and their dtypes
+LAYER_DTYPES = {spec["column"]: spec["dtype"] for spec in layer_registry.values()}
+
+# Class labels by their lowercase spelling, and the known misspellings
+LABEL_VOCABULARY = {label.lower(): label for label in suitability_category_mapping if label != "Mixed"}
+LABEL_ALIASES = {
+    "moderatly suitable": "Moderately Suitable"
+}
+
+# A class label with an optional qualifier in parentheses; the closing
+# parenthesis is missing where the 50-character DBF limit cut the text
+LABEL_PATTERN = re.compile(r"^(?P<label>[^(]*?)\s*(?:\((?P<note>[^)]*)\)?)?$")
+
+def parse_label(text):
+    """
+    Split a suitability label into its class and qualifier.
+
+    Args:
+        text (str): Label as found in the data
+
+    Returns:
+        tuple: (class label from the vocabulary, qualifier or None), or
+        (None, None) if the label is not a class
+    """
+    match = LABEL_PATTERN.match(" ".join(str(text).split()))
+    if match is None:
+        return None, None
+    base = match.group("label").lower()
+    label = LABEL_VOCABULARY.get(base) or LABEL_ALIASES.get(base)
+    if label is None:
+        return None, None
+    return label, (match.group("note") or "").strip() or None
+
+def normalize_labels(values):
+    """
+    Map the labels of a category column onto the class vocabulary.
+
+    Labels are factorized first, so each distinct label is parsed once
+    and the result is spread to the rows with one take.
+
+    Args:
+        values (Series): Labels of a category column
+
+    Returns:
+        tuple: (Series of class labels, Series of qualifiers, dict report
+        with the rows per class and the relabeled and unknown labels);
+        unknown labels are kept as they are
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = [parse_label(text) for text in uniques]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    # Code -1 (missing) takes the last entry
+    labels = np.array([label or text for text, (label, _) in zip(uniques, parsed)] + [None], dtype=object)
+    notes = np.array([note for _, note in parsed] + [None], dtype=object)
+
+    report = {"counts": {}, "relabeled": {}, "unknown": {}, "missing": int((codes < 0).sum())}
+    for text, (label, _), count in zip(uniques, parsed, counts):
+        if label is None:
+            report["unknown"][str(text)] = int(count)
+            continue
+        report["counts"][label] = report["counts"].get(label, 0) + int(count)
+        if label != text:
+            report["relabeled"][str(text)] = label
+
+    return (pd.Series(labels[codes], index=values.index),
+            pd.Series(notes[codes], index=values.index), report)
+
+def find_numeric_columns(attributes):
+    """
+    Decide which columns are converted to numbers.
+
+    Registry layers always are. Other text columns are converted only when
+    every non-empty value parses as a number, so label columns keep their
+    strings.
+
+    Args:
+        attributes (DataFrame): The attribute table
+
+    Returns:
+        tuple: (list of columns to convert, {layer column: number of
+        non-empty values that do not parse})
+    """
+    numeric_columns, unparsed = [], {}
+    for column in attributes.select_dtypes(exclude=["number"]).columns:
+        if column in TEXT_COLUMNS:
+            continue
+        values = attributes[column]
+        lost = int(values.where(values != "").notna().sum() - pd.to_numeric(values, errors="coerce").notna().sum())
+        if column in LAYER_DTYPES or lost == 0:
+            numeric_columns.append(column)
+            if lost:
+                unparsed[column] = lost
+    return numeric_columns, unparsed
+
+def normalize_attributes(attributes, numeric_columns):
+    """
+    Apply the conversions of the validation to (a chunk of) an attribute table.
+
+    Args:
+        attributes (DataFrame): The attribute table (not modified)
+        numeric_columns (list): Columns to convert, from find_numeric_columns
+
+    Returns:
+        tuple: (normalized copy of the table, {label column: report of
+        normalize_labels})
+    """
+    attributes = attributes.copy()
+    if numeric_columns:
+        attributes[numeric_columns] = attributes[numeric_columns].apply(pd.to_numeric, errors="coerce")
+    for column, dtype in LAYER_DTYPES.items():
+        if column in attributes.columns:
+            attributes[column] = attributes[column].astype(dtype)
+
+    reports = {}
+    for column in LABEL_COLUMNS:
+        if column in attributes.columns:
+            attributes[column], attributes[NOTE_COLUMNS[column]], reports[column] = normalize_labels(attributes[column])
+    return attributes, reports
+
+def validate_attributes(attributes):
+    """
+    Validate and normalize an attribute table, and profile it.
+
+    Args:
+        attributes (DataFrame): The attribute table (not modified)
+
+    Returns:
+        tuple: (normalized table, report dict; see validate_dataset)
+    """
+    missing_columns = [column for column in NAME_COLUMNS + LABEL_COLUMNS + list(LAYER_DTYPES)
+                       if column not in attributes.columns]
+    numeric_columns, unparsed = find_numeric_columns(attributes)
+    normalized, labels = normalize_attributes(attributes, numeric_columns)
+
+    nan_rates = normalized.isna().mean()
+    layers = [column for column in LAYER_DTYPES if column in normalized.columns]
+    distinct = normalized[layers].nunique()
+    names = normalized[[column for column in NAME_COLUMNS if column in normalized.columns]]
+    report = {
+        "validation_version": VALIDATION_VERSION,
+        "rows": len(attributes),
+        "missing_columns": missing_columns,
+        "numeric_columns": numeric_columns,
+        "unparsed_values": unparsed,
+        "labels": labels,
+        "names": {
+            "missing": int(names.isna().any(axis=1).sum()),
+            "duplicates": int(names.dropna().duplicated().sum())
+        },
+        "empty_columns": [str(column) for column in nan_rates.index[nan_rates == 1]],
+        "constant_layers": [str(column) for column in distinct.index[distinct == 1]],
+        "columns": {str(column): {"dtype": str(normalized[column].dtype), "nan_rate": round(float(rate), 4)}
+                    for column, rate in nan_rates.items()}
+    }
+    return normalized, report
+
+def validate_geometry(geometries):
+    """
+    Repair invalid geometries and find the rows without a geometry.
+
+    Args:
+        geometries (array-like): Shapely geometries
+
+    Returns:
+        tuple: (repaired geometries, boolean mask of the rows to keep,
+        report dict with "repaired" and "dropped" counts)
+    """
+    geometries = np.array(geometries, dtype=object)
+    invalid = ~shapely.is_valid(geometries) & ~shapely.is_missing(geometries)
+    if invalid.any():
+        geometries[invalid] = shapely.make_valid(geometries[invalid])
+    keep = ~(shapely.is_missing(geometries) | shapely.is_empty(geometries))
+    return geometries, keep, {"repaired": int(invalid.sum()), "dropped": int((~keep).sum())}
+
+def get_problems(report):
+    """
+    Summarize what a report found, one line per problem.
+
+    Args:
+        report (dict): Report of validate_dataset
+
+    Returns:
+        list: Problem descriptions, empty if the data is clean
+    """
+    problems = [f"Missing column {column}" for column in report["missing_columns"]]
+    problems += [f"{count} values of {column} are not numbers" for column, count in report["unparsed_values"].items()]
+    for column, labels in report["labels"].items():
+        problems += [f"{column}: relabeled {text!r} as {label!r}" for text, label in labels["relabeled"].items()
+                     if parse_label(text)[1] is None]
+        problems += [f"{column}: unknown label {text!r} ({count} rows)" for text, count in labels["unknown"].items()]
+    if report["names"]["missing"]:
+        problems.append(f"{report['names']['missing']} rows without a state or district name")
+    if report["names"]["duplicates"]:
+        problems.append(f"{report['names']['duplicates']} duplicate state and district names")
+    geometry = report.get("geometry", {})
+    if geometry.get("repaired"):
+        problems.append(f"Repaired {geometry['repaired']} invalid geometries")
+    if geometry.get("dropped"):
+        problems.append(f"Dropped {geometry['dropped']} rows without a geometry")
+    problems += [f"Column {column} is empty" for column in report["empty_columns"] if column in LAYER_DTYPES]
+    problems += [f"Layer column {column} has a single value" for column in report["constant_layers"]]
+    return problems
+
+def validate_dataset(gdf):
+    """
+    Validate and normalize a district table in one pass.
+
+    Args:
+        gdf (GeoDataFrame): District rows as read from the source
+
+    Returns:
+        tuple: (normalized GeoDataFrame numbered 0..n-1, report dict with
+        the rows read and kept, missing and empty columns, layer columns
+        with a single value, converted
+        columns and unparsed values, label counts, relabeled and unknown
+        labels, missing and duplicate names, geometry repairs and the
+        dtype and NaN rate of every column)
+    """
+    started = time.perf_counter()
+    geometries, keep, geometry_report = validate_geometry(gdf.geometry.values)
+    attributes, report = validate_attributes(pd.DataFrame(gdf.drop(columns=gdf.geometry.name)))
+
+    normalized = gpd.GeoDataFrame(attributes[keep].reset_index(drop=True),
+                                  geometry=gpd.GeoSeries(geometries[keep], crs=gdf.crs))
+    report["rows_kept"] = len(normalized)
+    report["geometry"] = geometry_report
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return normalized, report
+
+def get_profile_path(shapefile_path):
+    """
+    Get the path of the profile report written next to a shapefile.
+
+    Args:
+        shapefile_path (str): Path of the shapefile
+
+    Returns:
+        str: Path of the .profile.json file
+    """
+    return os.path.splitext(shapefile_path)[0] + PROFILE_SUFFIX
+
+def write_profile(report, shapefile_path):
+    """
+    Write the profile report of a normalized shapefile next to it.
+
+    The report records the size and modification time of the shapefile,
+    so the loader can tell when it no longer matches.
+
+    Args:
+        report (dict): Report of validate_dataset
+        shapefile_path (str): Path of the normalized shapefile (already written)
+
+    Returns:
+        str: Path of the report
+    """
+    stat = os.stat(shapefile_path)
+    report = dict(report, shp_size=stat.st_size, shp_mtime_ns=stat.st_mtime_ns, problems=get_problems(report))
+
+    path = get_profile_path(shapefile_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+def read_profile(shapefile_path):
+    """
+    Read the profile report of a shapefile, if it matches.
+
+    Args:
+        shapefile_path (str): Path of the shapefile
+
+    Returns:
+        dict: The report, or None if there is none, it was written for
+        another version of the shapefile or under other validation rules
+    """
+    try:
+        with open(get_profile_path(shapefile_path)) as f:
+            report = json.load(f)
+        stat = os.stat(shapefile_path)
+    except (OSError, ValueError):
+        return None
+    if (report.get("validation_version") != VALIDATION_VERSION or report.get("shp_size") != stat.st_size
+            or report.get("shp_mtime_ns") != stat.st_mtime_ns):
+        return None
+    return report
+
+def write_normalized(gdf, report, output_path):
+    """
+    Write a normalized dataset as a shapefile with its profile report.
+
+    An encoded geometry of an earlier build (modules.data.geometry) no
+    longer matches the rows and is removed.
+
+    Args:
+        gdf (GeoDataFrame): Output of validate_dataset
+        report (dict): Report of validate_dataset
+        output_path (str): Path of the shapefile to write
+
+    Returns:
+        str: Path of the report
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    gdf.to_file(output_path)
+    geometry_path = get_geometry_path(output_path)
+    if os.path.exists(geometry_path):
+        os.remove(geometry_path)
+    return write_profile(report, output_path)
+
+def main(argv=None):
+    """
+    Command line entry point: validate a shapefile and write the result.
+
+    Args:
+        argv (list, optional): Arguments (default: sys.argv[1:])
+
+    Returns:
+        int: Process exit code (1 if columns the dashboard needs are missing)
+    """
+    parser = argparse.ArgumentParser(description="Validate, normalize and profile the district dataset.")
+    parser.add_argument("--input", default=SHAPEFILE_PATH, help="Shapefile to validate")
+    parser.add_argument("--output", default=None, help="Normalized shapefile to write (default: the input)")
+    parser.add_argument("--check", action="store_true", help="Only print the problems, write nothing")
+    args = parser.parse_args(argv)
+
+    gdf, report = validate_dataset(gpd.read_file(args.input))
+    for problem in get_problems(report):
+        print(problem)
+    print(f"{report['rows_kept']} of {report['rows']} rows kept, validated in {report['seconds']}s")
+
+    if not args.check:
+        path = write_normalized(gdf, report, args.output or args.input)
+        print(f"Wrote {args.output or args.input} and {path}")
+    return 1 if any(column in NAME_COLUMNS for column in report["missing_columns"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,447 @@
+# modules/data/versions.py
+
+"""
+Dataset version store for the Solar Suitability Dashboard.
+
+The suitability layer is reissued periodically with new values on the
+same district boundaries. Instead of keeping a full GeoDataFrame per
+issue, the store keeps:
+
+- one shared geometry set (in the compact encoding of
+  modules.data.geometry) with the (NAME_1, NAME_2, occurrence) key of
+  every row;
+- one columnar attribute table per version (Parquet), aligned to the
+  shared rows by that key.
+
+A version is materialized by joining its attributes onto the decoded
+geometry, which is decoded once per process and shared by all versions.
+Every version loaded from the store therefore has the same geometry
+fingerprint, so label grids, view paths and rendered maps are shared.
+
+Comparing two versions is vectorized: both are classified with the same
+rules as the map, and the difference of the class codes gives every
+district's transition in one array operation. The result can be drawn
+as a "Change" map layer like any other.
+
+The store lives in data/versions (SOLAR_DASHBOARD_VERSIONS_DIR). Add a
+vintage with:
+
+    python -m modules.data.versions add <shapefile> --version 2024
+    python -m modules.data.versions list
+    python -m modules.data.versions diff 2023 2024 --column GW_dev_sta
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from modules.data.classes import get_class_matrix
+from modules.data.geometry import EncodedGeometry
+from modules.data.loader import load_shapefile_data, prepare_dataset, get_dataset_fingerprint
+from modules.data.validation import validate_dataset
+from modules.utils.memory_cache import BoundedCache
+from modules.utils.profiling import record_cache_miss, timed
+
+VERSIONS_DIR_ENV = "SOLAR_DASHBOARD_VERSIONS_DIR"
+DEFAULT_VERSIONS_DIR = os.path.join("data", "versions")
+
+MANIFEST_FILE = "manifest.json"
+GEOMETRY_FILE = "geometry.npz"
+KEYS_FILE = "keys.parquet"
+ATTRIBUTES_DIR = "attributes"
+
+KEY_COLUMNS = ["NAME_1", "NAME_2"]
+
+# Name of the dataset the dashboard loads from SHAPEFILE_PATH
+CURRENT_VERSION = "Current"
+
+# Name of the map layer holding the class transitions
+CHANGE_COLUMN = "Change"
+
+# Transition classes and their map codes (0-4)
+CHANGE_CODES = {
+    "Improved (2+ classes)": 4,
+    "Improved": 3,
+    "Unchanged": 2,
+    "Declined": 1,
+    "No data": 0
+}
+
+def get_store_dir():
+    """
+    Get the directory of the version store.
+
+    Returns:
+        str: The store directory
+    """
+    return os.environ.get(VERSIONS_DIR_ENV, DEFAULT_VERSIONS_DIR)
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def read_manifest(store_dir=None):
+    """
+    Read the list of stored versions.
+
+    Args:
+        store_dir (str, optional): Store directory (default: get_store_dir())
+
+    Returns:
+        dict: {"versions": [{"version", "source", "districts"}, ...]} in the
+        order they were added
+    """
+    path = os.path.join(store_dir or get_store_dir(), MANIFEST_FILE)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"versions": []}
+
+def list_versions(store_dir=None):
+    """
+    Get the versions the dashboard can show.
+
+    Returns:
+        list: CURRENT_VERSION followed by the stored versions
+    """
+    return [CURRENT_VERSION] + [entry["version"] for entry in read_manifest(store_dir)["versions"]]
+
+def _key_index(frame):
+    """
+    Get the district key of every row of a table.
+
+    Names are not unique in the source data (a few districts are split
+    into several rows, and some rows have no names), so the key also
+    holds the occurrence number of the name pair.
+
+    Args:
+        frame (DataFrame): Table with the KEY_COLUMNS
+
+    Returns:
+        MultiIndex: (NAME_1, NAME_2, occurrence) per row
+    """
+    names = [frame[col].map(str).to_numpy() for col in KEY_COLUMNS]
+    occurrence = pd.DataFrame(dict(zip(KEY_COLUMNS, names))).groupby(KEY_COLUMNS, sort=False).cumcount()
+    return pd.MultiIndex.from_arrays(names + [occurrence.to_numpy()], names=KEY_COLUMNS + ["occurrence"])
+
+def add_version(path, version, store_dir=None):
+    """
+    Add a vintage of the suitability layer to the store.
+
+    The first version defines the shared geometry. Later versions only
+    add their attribute table; districts that are new in a version append
+    their geometry to the shared set. The shapefile is validated and
+    normalized (modules.data.validation) before it is stored, so stored
+    versions load without any conversion.
+
+    Args:
+        path (str): Shapefile of the vintage
+        version (str): Name of the version (e.g. "2024")
+        store_dir (str, optional): Store directory (default: get_store_dir())
+
+    Returns:
+        dict: The manifest entry of the version
+
+    Raises:
+        ValueError: If the version name is taken
+    """
+    store_dir = store_dir or get_store_dir()
+    manifest = read_manifest(store_dir)
+    if version == CURRENT_VERSION or any(entry["version"] == version for entry in manifest["versions"]):
+        raise ValueError(f"Version {version!r} already exists")
+
+    gdf, _ = validate_dataset(gpd.read_file(path))
+    keys = _key_index(gdf)
+
+    os.makedirs(os.path.join(store_dir, ATTRIBUTES_DIR), exist_ok=True)
+    keys_path = os.path.join(store_dir, KEYS_FILE)
+    geometry_path = os.path.join(store_dir, GEOMETRY_FILE)
+
+    if os.path.exists(keys_path):
+        stored_keys = _key_index(pd.read_parquet(keys_path))
+        new = ~keys.isin(stored_keys)
+        if new.any():
+            encoded, _ = EncodedGeometry.load(geometry_path)
+            geometry = np.concatenate([encoded.to_shapely(), gdf.geometry.values[new]])
+            all_keys = stored_keys.append(keys[new])
+        else:
+            geometry, all_keys = None, stored_keys
+    else:
+        geometry, all_keys = gdf.geometry.values, keys
+
+    if geometry is not None:
+        EncodedGeometry.from_geometries(geometry, crs=gdf.crs).save(geometry_path)
+        _write_atomic(keys_path, lambda p: all_keys.to_frame(index=False).to_parquet(p, index=False))
+
+    attributes = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
+    _write_atomic(os.path.join(store_dir, ATTRIBUTES_DIR, f"{version}.parquet"),
+                  lambda p: attributes.to_parquet(p, index=False))
+
+    entry = {"version": version, "source": os.path.abspath(path), "districts": len(gdf)}
+    manifest["versions"].append(entry)
+
+    def write_manifest(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    _write_atomic(os.path.join(store_dir, MANIFEST_FILE), write_manifest)
+    return entry
+
+def load_shared_geometry(store_dir):
+    """
+    Decode the shared geometry of a store and read its keys.
+
+    Args:
+        store_dir (str): Store directory
+
+    Returns:
+        tuple: (numpy array of shapely geometries, MultiIndex of keys, CRS)
+    """
+    encoded, _ = EncodedGeometry.load(os.path.join(store_dir, GEOMETRY_FILE))
+    keys = _key_index(pd.read_parquet(os.path.join(store_dir, KEYS_FILE)))
+    return encoded.to_shapely(), keys, encoded.crs
+
+# Decoded shared geometry per (geometry file, stamp), newest only
+_geometry = BoundedCache(1)
+
+def get_shared_geometry(store_dir=None):
+    """
+    Get the decoded shared geometry and its keys, once per process.
+
+    Args:
+        store_dir (str, optional): Store directory (default: get_store_dir())
+
+    Returns:
+        tuple: (numpy array of shapely geometries, MultiIndex of keys, CRS)
+    """
+    store_dir = store_dir or get_store_dir()
+    geometry_path = os.path.join(store_dir, GEOMETRY_FILE)
+    stat = os.stat(geometry_path)
+    key = (os.path.abspath(geometry_path), stat.st_mtime_ns, stat.st_size)
+    return _geometry.get_or_build(key, lambda: load_shared_geometry(store_dir))
+
+def read_version(version, store_dir=None):
+    """
+    Materialize a stored version as a dashboard dataset.
+
+    Args:
+        version (str): Name of the version
+        store_dir (str, optional): Store directory (default: get_store_dir())
+
+    Returns:
+        Dataset: The district table and the averages table (as from read_dataset)
+    """
+    store_dir = store_dir or get_store_dir()
+    geometry, keys, crs = get_shared_geometry(store_dir)
+    attributes = pd.read_parquet(os.path.join(store_dir, ATTRIBUTES_DIR, f"{version}.parquet"))
+
+    # Position of every row of the version within the shared geometry
+    rows = keys.get_indexer(_key_index(attributes))
+    gdf = gpd.GeoDataFrame(attributes, geometry=gpd.GeoSeries(geometry[rows], index=attributes.index, crs=crs))
+    return prepare_dataset(gdf)
+
+@st.cache_data(max_entries=4, show_spinner="Loading dataset version...")
+def _load_version(version, store_dir, stamp):
+    """
+    Cached read_version, keyed on the attribute file's modification stamp.
+    """
+    # This body only runs when the cache misses
+    record_cache_miss()
+    return read_version(version, store_dir)
+
+def load_version_data(version=CURRENT_VERSION):
+    """
+    Load a dataset version for the dashboard.
+
+    Args:
+        version (str): Name of the version; CURRENT_VERSION loads the
+            dashboard's shapefile through load_shapefile_data
+
+    Returns:
+        Dataset: The district table and the averages table
+    """
+    if version == CURRENT_VERSION:
+        return load_shapefile_data()
+    store_dir = get_store_dir()
+    stat = os.stat(os.path.join(store_dir, ATTRIBUTES_DIR, f"{version}.parquet"))
+    return _load_version(version, store_dir, (stat.st_mtime_ns, stat.st_size))
+
+def get_class_codes(_gdf, column, category):
+    """
+    Classify the districts of a dataset the way the map does.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        column (str): The layer column
+        category (str): The selected category
+
+    Returns:
+        Series: Class code (0-4, 0 = no class) indexed by district key
+    """
+    # Imported here: the map module imports this one for the change layer
+    from modules.visualization.maps import classify_map_values
+
+    if column not in _gdf.columns:
+        return pd.Series(0, index=_key_index(_gdf), dtype=int)
+    codes, _ = classify_map_values(_gdf, column, category)
+    return pd.Series(np.asarray(codes, dtype=int), index=_key_index(_gdf))
+
+def compute_changes(old_gdf, new_gdf, column, category):
+    """
+    Compare two versions district by district.
+
+    Args:
+        old_gdf (GeoDataFrame): District table of the earlier version
+        new_gdf (GeoDataFrame): District table of the later version
+        column (str): The layer column to compare
+        category (str): The category whose rules classify numeric layers
+
+    Returns:
+        DataFrame: One row per district of the later version with NAME_1,
+        NAME_2, occurrence, the old and new class codes, the class step (new - old),
+        the change of the value (numeric layers) and the change class
+    """
+    get_class_matrix(old_gdf)
+    get_class_matrix(new_gdf)
+    new_codes = get_class_codes(new_gdf, column, category)
+    old_codes = get_class_codes(old_gdf, column, category).reindex(new_codes.index, fill_value=0)
+    old = old_codes.to_numpy()
+    new = new_codes.to_numpy()
+    step = new - old
+    known = (old > 0) & (new > 0)
+
+    labels = np.full(len(new), "No data", dtype=object)
+    labels[known & (step == 0)] = "Unchanged"
+    labels[known & (step < 0)] = "Declined"
+    labels[known & (step > 0)] = "Improved"
+    labels[known & (step >= 2)] = "Improved (2+ classes)"
+
+    result = new_codes.index.to_frame(index=False)
+    result["Old Class"] = old
+    result["New Class"] = new
+    result["Step"] = np.where(known, step, 0)
+
+    if column in new_gdf.columns and pd.api.types.is_numeric_dtype(new_gdf[column]):
+        new_values = pd.Series(new_gdf[column].to_numpy(), index=new_codes.index)
+        old_values = pd.Series(old_gdf[column].to_numpy(), index=_key_index(old_gdf))
+        result["Delta"] = (new_values - old_values.reindex(new_codes.index)).to_numpy()
+
+    result[CHANGE_COLUMN] = labels
+    return result
+
+def transition_matrix(changes):
+    """
+    Count the districts moving from each old class to each new class.
+
+    Args:
+        changes (DataFrame): Result of compute_changes
+
+    Returns:
+        DataFrame: Counts with old classes as rows and new classes as columns
+    """
+    from modules.visualization.maps import CLASS_CODES
+
+    names = {code: name for name, code in CLASS_CODES.items() if code > 0}
+    names[0] = "No data"
+    order = [names[code] for code in sorted(names, reverse=True)]
+    old = pd.Categorical(changes["Old Class"].map(names), categories=order)
+    new = pd.Categorical(changes["New Class"].map(names), categories=order)
+    return pd.crosstab(old, new, rownames=["From"], colnames=["To"], dropna=False)
+
+# Change tables per (old fingerprint, new fingerprint, column, category), oldest first
+CHANGES_CACHE_SIZE = 32
+_changes = BoundedCache(CHANGES_CACHE_SIZE)
+
+def get_changes(old_gdf, new_gdf, column, category):
+    """
+    Cached compute_changes, keyed on the fingerprints of both versions.
+
+    Args:
+        old_gdf (GeoDataFrame): District table of the earlier version
+        new_gdf (GeoDataFrame): District table of the later version
+        column (str): The layer column to compare
+        category (str): The selected category
+
+    Returns:
+        DataFrame: Result of compute_changes
+    """
+    key = (get_dataset_fingerprint(old_gdf), get_dataset_fingerprint(new_gdf), column, category)
+    return _changes.get_or_build(key, lambda: compute_changes(old_gdf, new_gdf, column, category))
+
+@timed()
+def apply_changes(new_gdf, old_gdf, column, category):
+    """
+    Add the change layer of a column to the later version.
+
+    Args:
+        new_gdf (GeoDataFrame): District table of the later version
+        old_gdf (GeoDataFrame): District table of the earlier version
+        column (str): The layer column to compare
+        category (str): The selected category
+
+    Returns:
+        tuple: (GeoDataFrame with the Change column set, change table)
+    """
+    changes = get_changes(old_gdf, new_gdf, column, category)
+    result = new_gdf.copy(deep=False)
+    result[CHANGE_COLUMN] = changes[CHANGE_COLUMN].to_numpy()
+    return result, changes
+
+def main(argv=None):
+    """
+    Command-line entry point for managing the version store.
+
+    Args:
+        argv (list, optional): Command-line arguments (default: sys.argv)
+
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Manage the dataset versions of the dashboard.")
+    parser.add_argument("--store", default=None, help="Store directory (default: data/versions)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Add a vintage from a shapefile")
+    add.add_argument("input", help="Shapefile of the vintage")
+    add.add_argument("--version", required=True, help="Name of the version")
+
+    commands.add_parser("list", help="List the stored versions")
+
+    diff = commands.add_parser("diff", help="Print the class transitions between two versions")
+    diff.add_argument("old", help="Earlier version (or Current)")
+    diff.add_argument("new", help="Later version (or Current)")
+    diff.add_argument("--column", default="GW_dev_sta", help="Layer column to compare")
+    diff.add_argument("--category", default="Mitigation", help="Category whose rules classify the layer")
+    args = parser.parse_args(argv)
+
+    if args.store:
+        os.environ[VERSIONS_DIR_ENV] = args.store
+
+    try:
+        if args.command == "add":
+            entry = add_version(args.input, args.version)
+            print(f"Added version {entry['version']} ({entry['districts']} districts)")
+        elif args.command == "list":
+            for entry in read_manifest()["versions"]:
+                print(f"{entry['version']}: {entry['districts']} districts from {entry['source']}")
+        else:
+            from modules.data.loader import read_dataset
+            load = lambda v: (read_dataset() if v == CURRENT_VERSION else read_version(v)).districts
+            changes = compute_changes(load(args.old), load(args.new), args.column, args.category)
+            print(transition_matrix(changes).to_string())
+            print(changes[CHANGE_COLUMN].value_counts().to_string())
+    except (ValueError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,8 +7,15 @@ This module contains functions for creating the layout components
 of the dashboard, including the header, footer, and control panels.
 """
 
+import pandas as pd
 import streamlit as st
 from modules.utils.constants import layer_explanations, layer_column_mapping
+from modules.utils import profiling
+from modules.utils.profiling import timed
+from modules.data.mcda import MCDA_COLUMN, INDICATORS
+from modules.data.sensitivity import DEFAULT_SAMPLES, DEFAULT_SPREAD
+from modules.data.search import get_search_index, search_districts
+from modules.data.versions import CURRENT_VERSION, list_versions
 
 def create_header():
     """
@@ -39,12 +46,16 @@ def create_footer():
     </div>
     """, unsafe_allow_html=True)
 
+@timed()
 def create_controls(df):
     """
     Create the control panel with state, district, and category selection.
     
     This function creates a row of controls for selecting the state,
-    district, category, and layer to display in the dashboard.
+    district and category. These selections feed both the map and the
+    statistics panel, so changing them reruns the whole dashboard. The
+    layer selection lives with the map (see create_layer_controls) so
+    that changing it only reruns the map fragment.
     
     Args:
         df (GeoDataFrame): The data to populate the selection options
@@ -55,37 +66,168 @@ def create_controls(df):
     # COMPACT CONTROLS - All in one row
     st.markdown('<div class="compact-panel">', unsafe_allow_html=True)
     
-    # Create 5 columns in one row for all controls
-    all_controls = st.columns([1, 1, 1, 1.5, 0.5])
+    # Create 3 columns in one row for the region and category controls
+    all_controls = st.columns([1, 1, 1])
+    
+    # The state and district lists come sorted from the search index
+    districts_by_state = get_search_index(df)["districts_by_state"]
     
     # State selection
     with all_controls[0]:
         st.markdown('<p class="control-label">State</p>', unsafe_allow_html=True)
-        states = df["NAME_1"].unique()
-        states_list = ["National Average"] + sorted([str(s) for s in states if str(s) != "National Average"])
+        states_list = ["National Average"] + list(districts_by_state)
         selected_state = st.selectbox("State", states_list, label_visibility="collapsed", key="state_select")
     
     # District selection
     with all_controls[1]:
         st.markdown('<p class="control-label">District</p>', unsafe_allow_html=True)
-        if selected_state == "National Average":
-            districts_list = ["All Districts"]
-        else:
-            district_df = df[df["NAME_1"].astype(str) == selected_state]
-            districts = district_df["NAME_2"].unique()
-            districts_list = ["All Districts"] + sorted([str(d) for d in districts if str(d) != "All Districts"])
+        districts_list = ["All Districts"] + districts_by_state.get(selected_state, [])
         selected_district = st.selectbox("District", districts_list, label_visibility="collapsed", key="district_select")
     
     # Category selection
     with all_controls[2]:
         st.markdown('<p class="control-label">Category</p>', unsafe_allow_html=True)
-        categories = ["Adaptation", "Mitigation", "Replacment", "General_SI"]
+        categories = ["Adaptation", "Mitigation", "Replacment", "General_SI", MCDA_COLUMN]
         selected_category = st.selectbox("Category", categories, label_visibility="collapsed", key="category_select")
     
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    return selected_state, selected_district, selected_category
+
+def _jump_to_view(state, district):
+    """
+    Select a state and district before the next run draws the dropdowns.
+    
+    Args:
+        state (str): The state to select
+        district (str): The district to select ("All Districts" for the state)
+        
+    Returns:
+        None
+    """
+    st.session_state.state_select = state
+    st.session_state.district_select = district
+
+def _on_search(index):
+    """
+    Jump to the best match of the search box, keeping the other matches.
+    
+    Runs as the search box's callback, before the rerun, so the dropdowns
+    are drawn with the new view right away.
+    
+    Args:
+        index (dict): The search index of the dataset
+        
+    Returns:
+        None
+    """
+    results = search_districts(index, st.session_state.district_search)
+    st.session_state.search_results = results
+    if results:
+        _jump_to_view(*results[0][:2])
+
+@timed()
+def create_district_search(df):
+    """
+    Create the type-ahead search box for states and districts.
+    
+    Entering a name (or its beginning, or a misspelling) jumps straight to
+    the best matching view in a single rerun, instead of picking a state
+    and then a district. Other matches are offered as buttons.
+    
+    Args:
+        df (GeoDataFrame): The data whose names are searched
+        
+    Returns:
+        None
+    """
+    st.text_input("Search", placeholder="Search a state or district...", label_visibility="collapsed",
+                  key="district_search", on_change=_on_search, args=(get_search_index(df),))
+    
+    results = st.session_state.get("search_results")
+    if results is None:
+        return
+    if not results:
+        st.caption(f"No state or district matches \"{st.session_state.district_search}\".")
+        return
+    
+    others = results[1:]
+    if others:
+        buttons = st.columns(len(others))
+        for i, (state, district, label) in enumerate(others):
+            with buttons[i]:
+                st.button(label, key=f"search_result_{i}", on_click=_jump_to_view, args=(state, district),
+                          use_container_width=True)
+
+def create_weight_controls():
+    """
+    Create the indicator weight sliders of the Custom category.
+    
+    Each slider weighs one indicator layer: positive weights favor
+    districts with high values, negative weights favor low values and
+    zero ignores the layer.
+    
+    Returns:
+        dict: Weight per layer name
+    """
+    weights = {}
+    with st.expander("Custom weights", expanded=True):
+        slider_cols = st.columns(2)
+        for i, layer in enumerate(INDICATORS):
+            with slider_cols[i % 2]:
+                weights[layer] = st.slider(layer, -1.0, 1.0, 1.0, step=0.1, key=f"weight_{layer}",
+                                           help=layer_explanations[layer])
+    return weights
+
+def create_sensitivity_controls():
+    """
+    Create the controls of the weight sensitivity analysis.
+    
+    The analysis perturbs the Custom weights and reports how often each
+    district keeps its class. It only runs while the toggle is on.
+    
+    Returns:
+        dict: Settings with "n_samples", "spread", "seed" and "show_on_map",
+        or None when the analysis is switched off
+    """
+    with st.expander("Sensitivity analysis"):
+        if not st.toggle("Analyze weight uncertainty", key="sensitivity_toggle"):
+            return None
+        
+        setting_cols = st.columns(3)
+        with setting_cols[0]:
+            n_samples = st.number_input("Samples", 100, 50000, DEFAULT_SAMPLES, step=500, key="sensitivity_samples")
+        with setting_cols[1]:
+            spread = st.slider("Weight uncertainty (±)", 0.1, 1.0, DEFAULT_SPREAD, step=0.1, key="sensitivity_spread",
+                               help="Each weight is scaled by a random factor within this relative range")
+        with setting_cols[2]:
+            seed = st.number_input("Seed", 0, 2**31 - 1, 0, key="sensitivity_seed")
+        show_on_map = st.toggle("Show stability on the map", value=True, key="stability_map")
+    
+    return {"n_samples": int(n_samples), "spread": float(spread), "seed": int(seed), "show_on_map": show_on_map}
+
+@timed()
+def create_layer_controls(layers=None):
+    """
+    Create the layer selection dropdown and its info popover.
+    
+    This is drawn inside the map fragment, so changing the layer only
+    reruns the map and the layer metric. The info popover opens on the
+    client and does not trigger a rerun at all.
+    
+    Args:
+        layers (list, optional): The layers to offer (default: every layer)
+    
+    Returns:
+        list: The columns of the layer row; the last one is left free
+        for the layer metric
+    """
+    layer_controls = st.columns([1.5, 0.3, 1])
+    
     # Layer selection
-    with all_controls[3]:
+    with layer_controls[0]:
         st.markdown('<p class="control-label">Layer Selection</p>', unsafe_allow_html=True)
-        layers_list = list(layer_explanations.keys())
+        layers_list = list(layers if layers is not None else layer_explanations.keys())
         selected_layer_dropdown = st.selectbox(
             "Layer",
             layers_list,
@@ -97,12 +239,135 @@ def create_controls(df):
         if selected_layer_dropdown:
             st.session_state.selected_layer = selected_layer_dropdown
     
-    # Layer info button (optional)
-    with all_controls[4]:
+    # Layer info popover
+    with layer_controls[1]:
         st.markdown('<p class="control-label">&nbsp;</p>', unsafe_allow_html=True)
-        if st.button("ℹ️", help=layer_explanations.get(st.session_state.selected_layer, ""), key="info_button"):
-            st.info(layer_explanations.get(st.session_state.selected_layer, "No description available"))
+        with st.popover("ℹ️"):
+            st.markdown(layer_explanations.get(st.session_state.selected_layer, "No description available"))
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    return layer_controls
+
+def create_hotspot_toggle():
+    """
+    Create the toggle that maps spatial clusters of the visualized layer.
+    
+    Returns:
+        bool: True if the hotspot layer should be shown
+    """
+    return st.toggle("Hotspots", key="hotspot_toggle",
+                     help="Clusters of high (hot) or low (cold) values of the layer across neighboring "
+                          "districts (Getis-Ord Gi*), and districts unlike their neighbors (local Moran's I)")
+
+@timed()
+def create_version_controls():
+    """
+    Create the dataset version selector and the change comparison.
+    
+    The controls are only shown when the version store holds at least
+    one version besides the current dataset.
+    
+    Returns:
+        tuple: (version to show, version to compare it with or None)
+    """
+    versions = list_versions()
+    if len(versions) < 2:
+        return CURRENT_VERSION, None
+    
+    version_cols = st.columns(2)
+    with version_cols[0]:
+        version = st.selectbox("Dataset Version", versions, key="version_select")
+    with version_cols[1]:
+        base = st.selectbox("Compare With", ["None"] + [v for v in versions if v != version], key="base_select",
+                            help="Map how each district's class changed since the selected version")
+    return version, (None if base == "None" else base)
+
+def create_comparison_controls(vis_column, selected_category, layers=None):
+    """
+    Create the controls of the comparison (small multiples) view.
+    
+    The comparison shows either several layers under the selected
+    category, or the selected layer under each category.
+    
+    Args:
+        vis_column (str): The column currently visualized
+        selected_category (str): The selected category (Adaptation, Mitigation, etc.)
+        layers (list, optional): The layers to offer (default: every layer)
+        
+    Returns:
+        list: List of (vis_column, category, title) panels, empty when
+        the comparison is switched off
+    """
+    if not st.toggle("Compare", key="compare_toggle"):
+        return []
+    
+    mode = st.radio("Compare", ["Layers", "Categories"], horizontal=True,
+                    label_visibility="collapsed", key="compare_mode")
+    
+    if mode == "Layers":
+        layers_list = list(layers if layers is not None else layer_explanations.keys())
+        default = [layer for layer in ["GW Development Stage", "Irrigation Coverage (%)", "Aridity Index"]
+                   if layer in layers_list]
+        layers = st.multiselect("Layers", layers_list, default=default, key="compare_layers")
+        return [(layer_column_mapping[layer], selected_category, layer) for layer in layers]
+    
+    categories = ["Adaptation", "Mitigation", "Replacment", "General_SI"]
+    if selected_category == MCDA_COLUMN:
+        categories.append(MCDA_COLUMN)
+    selected = st.multiselect("Categories", categories, default=categories, key="compare_categories")
+    return [(vis_column, category, category) for category in selected]
+
+def create_warmup_status(status):
+    """
+    Show the progress of the background warm-up.
+    
+    Args:
+        status (dict): Warm-up status from modules.utils.warmup.get_status
+    
+    Returns:
+        None
+    """
+    total = max(status["total"], 1)
+    progress = min(status["done"] / total, 1.0)
+    if not status["ready"]:
+        st.info("The dashboard is getting ready. It will open by itself in a moment.")
+        st.progress(progress, text=status["stage"])
+    else:
+        st.caption(f"Warming up caches ({status['done']}/{status['total']}): {status['stage']}")
+
+def create_performance_panel():
+    """
+    Create the toggleable performance panel with per-stage timings.
     
-    return selected_state, selected_district, selected_category
\ No newline at end of file
+    The toggle switches stage recording on for this session (it takes
+    effect from the next rerun). The panel shows the stages of the latest
+    rerun, a per-stage summary over the recorded reruns and a Chrome trace
+    download for offline analysis.
+    
+    Returns:
+        None
+    """
+    with st.expander("Performance"):
+        st.toggle("Record stage timings", key=profiling.PANEL_KEY)
+        
+        history = profiling.get_history()
+        if not history:
+            st.caption("No reruns recorded yet.")
+            return
+        
+        latest = history[-1]
+        st.markdown(f"**Last {latest['label']}:** {latest['total_ms']:.1f} ms")
+        st.dataframe(pd.DataFrame(latest["stages"]), use_container_width=True, hide_index=True)
+        
+        # Summary of every recorded rerun, one row per stage name
+        stages = pd.DataFrame([entry for rerun in history for entry in rerun["stages"]])
+        if not stages.empty:
+            summary = stages.groupby("name")["ms"].agg(["count", "mean", "median", "max"]).round(2)
+            st.markdown(f"**Over {len(history)} reruns (ms)**")
+            st.dataframe(summary, use_container_width=True)
+        
+        st.download_button(
+            "Download Chrome trace",
+            profiling.to_chrome_trace(history),
+            file_name="solar_dashboard_trace.json",
+            mime="application/json"
+        )
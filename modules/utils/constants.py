@@ -8,6 +8,20 @@ used throughout the application. Centralizing these values makes the application
 more maintainable and ensures consistency across different components.
 """
 
+import os
+
+# Paths to the shapefiles, relative to the project root
+SHAPEFILE_PATH = os.path.join("data", "shapefiles", "Solar_Suitability_layer_optimized.shp")
+ORIGINAL_SHAPEFILE_PATH = os.path.join("data", "shapefiles", "Solar_Suitability_layer.shp")
+
+# Map rendering engine: "vector" (matplotlib), "raster" (cached label grids)
+# or "auto" (raster for the national view, vector where district names are drawn)
+MAP_RENDERER = os.environ.get("SOLAR_DASHBOARD_RENDERER", "auto")
+
+# Map image format: "auto" (palette PNG maps, WebP raster maps, see
+# modules.visualization.encoding), or "png" for full-color PNG maps only
+MAP_FORMAT = os.environ.get("SOLAR_DASHBOARD_MAP_FORMAT", "auto")
+
 # Layer explanations for tooltips
 layer_explanations = {
     "Solar radiance": "Gives solar radiance",
@@ -26,25 +40,62 @@ layer_explanations = {
     "Aridity Index": "Measure of dryness of the climate, higher values indicate more arid conditions."
 }
 
-# Layer to column mapping
-layer_column_mapping = {
-    "Solar radiance": "Rainfall__",
-    "Cropping Intensity (%)": "CI_yield",
-    "Irrigation Coverage (%)": "Irrig_cov_",
-    "Irrigation Water Requirement": "C_Irr_Ex_G",
-    "Cultivated land": "C_Land_Rc",
-    "Pump energy": "C_PHS",
-    "Energy Subsidy": "C_E_FC",
-    "GW Development Stage": "GW_dev_sta",
-    "Aquifer(Shallow) (mbgl)": "Aquifer_ty",
-    "Surface Water Body (ha)": "Sw____",
-    "Small & marginal holdings (%)": "C_S_H",
-    "Farmers average area (ha)": "C_F_L",
-    "Land fragmentation (number)": "C_L_R",
-    "Aridity Index": "aridity",
-    "Others": "Himalayan"
+# Layer registry: column, units, dtype and class breaks of every layer.
+#
+# "breaks" are the three values separating Less / Moderately / Highly /
+# Very Highly Suitable, in the layer's units. Higher values are more
+# suitable, except under the categories of inverted_categories, where the
+# breaks are read the other way round. A layer that needs other breaks
+# under some categories gives a dict instead, e.g.
+#     "breaks": {"default": (50, 70, 100), "Adaptation": (70, 90, 100)}
+# (modules.data.classes.get_breaks). "units" are bare unit symbols; the
+# separator is added where values are formatted. The breaks are the national
+# quartiles of the districts with a value, rounded, except for:
+# - the groundwater development stage, with the 50/70/100% stage classes;
+# - pump energy, which is 0 in a quarter of those districts: its breaks
+#   are the quartiles of the non-zero values;
+# - the shallow aquifer depth, which has no values in the shipped data:
+#   its breaks are the depth to water classes of the groundwater surveys.
+# Layers without at least two distinct values in a dataset are left out
+# of the layer selector (modules.data.classes.get_layer_options). Units
+# that neither the layer name nor the source data document are None.
+layer_registry = {
+    "Solar radiance": {"column": "Rainfall__", "units": None, "dtype": "float64",
+                       "breaks": (750, 1000, 1500)},
+    "Cropping Intensity (%)": {"column": "CI_yield", "units": "%", "dtype": "float64",
+                               "breaks": (10, 25, 40)},
+    "Irrigation Coverage (%)": {"column": "Irrig_cov_", "units": "%", "dtype": "float64",
+                                "breaks": (15, 40, 70)},
+    "Irrigation Water Requirement": {"column": "C_Irr_Ex_G", "units": None, "dtype": "float64",
+                                     "breaks": (150, 850, 3500)},
+    "Cultivated land": {"column": "C_Land_Rc", "units": None, "dtype": "float64",
+                        "breaks": (120, 380, 930)},
+    "Pump energy": {"column": "C_PHS", "units": None, "dtype": "float64",
+                    "breaks": (7, 60, 300)},
+    "Energy Subsidy": {"column": "C_E_FC", "units": None, "dtype": "float64",
+                       "breaks": (300, 1000, 2300)},
+    "GW Development Stage": {"column": "GW_dev_sta", "units": "%", "dtype": "float64",
+                             "breaks": (50, 70, 100)},
+    "Aquifer(Shallow) (mbgl)": {"column": "Aquifer_ty", "units": "mbgl", "dtype": "float64",
+                                "breaks": (5, 10, 20)},
+    "Surface Water Body (ha)": {"column": "Sw____", "units": "ha", "dtype": "float64",
+                                "breaks": (0.2, 0.45, 0.8)},
+    "Small & marginal holdings (%)": {"column": "C_S_H", "units": "%", "dtype": "float64",
+                                      "breaks": (50, 190, 570)},
+    "Farmers average area (ha)": {"column": "C_F_L", "units": "ha", "dtype": "float64",
+                                  "breaks": (750, 2150, 4250)},
+    "Land fragmentation (number)": {"column": "C_L_R", "units": None, "dtype": "float64",
+                                    "breaks": (200, 2150, 6400)},
+    "Aridity Index": {"column": "aridity", "units": None, "dtype": "float64",
+                      "breaks": (0.5, 0.75, 1.0)}
 }
 
+# Categories under which lower layer values are more suitable
+inverted_categories = ["Adaptation"]
+
+# Layer to column mapping
+layer_column_mapping = {layer: spec["column"] for layer, spec in layer_registry.items()}
+
 # Color definitions for consistent use throughout the application
 colors = {
     """
@@ -73,10 +124,8 @@ colors = {
 
 # Suitability category mapping (for consistent numeric values)
 suitability_category_mapping = {
-    """
-    Maps suitability categories to numeric values for visualization.
-    Higher values represent more suitable categories.
-    """
+    # Maps suitability categories to numeric values for visualization.
+    # Higher values represent more suitable categories.
     "Very Highly Suitable": 4,
     "Highly Suitable": 3,
     "Moderately Suitable": 2,
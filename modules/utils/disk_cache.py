@@ -0,0 +1,302 @@
+# modules/utils/disk_cache.py
+
+"""
+Disk cache module for the Solar Suitability Dashboard.
+
+Streamlit's caches live in memory and are lost on every restart. This
+module is a second, persistent tier below them for results that are
+expensive to produce and cheap to store: rendered maps, pie chart figure
+JSON and the aggregate table.
+
+Entries are content-addressed: the key is a hash of a namespace, the
+dataset fingerprint and the parameters that determine the result, so a
+changed dataset or view simply misses and nothing ever needs to expire.
+The total size is capped; when it is exceeded, the least recently used
+entries are deleted (a hit refreshes an entry's modification time).
+
+Several server or worker processes can share the directory. Entries are
+written under a temporary name and renamed into place, so a reader never
+sees a partial file, and eviction runs under an exclusive file lock where
+the platform supports it.
+
+The directory and the size cap are set with SOLAR_DASHBOARD_CACHE_DIR
+(default cache/disk) and SOLAR_DASHBOARD_CACHE_MB (default 512; 0
+switches the tier off).
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction is not locked across processes
+    fcntl = None
+
+from modules.utils.profiling import record_cache_miss
+
+CACHE_DIR_ENV = "SOLAR_DASHBOARD_CACHE_DIR"
+CACHE_SIZE_ENV = "SOLAR_DASHBOARD_CACHE_MB"
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "disk")
+DEFAULT_CACHE_MB = 512
+
+# Eviction trims the cache to this fraction of the cap, so it does not
+# run again on the very next write
+EVICTION_TARGET = 0.9
+
+# Entries smaller than a block still take a block on disk
+BLOCK_SIZE = 4096
+
+ENTRY_SUFFIX = ".pkl"
+
+_lock = threading.Lock()
+_size_estimate = None
+
+def get_cache_dir():
+    """
+    Get the directory of the disk cache.
+
+    Returns:
+        str: The cache directory
+    """
+    return os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+
+def get_max_bytes():
+    """
+    Get the size cap of the disk cache.
+
+    Returns:
+        int: Maximum total size in bytes (0 means the cache is off)
+    """
+    try:
+        return int(float(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_CACHE_MB * 1024 * 1024
+
+def make_key(namespace, fingerprint, *params):
+    """
+    Build the content address of an entry.
+
+    Args:
+        namespace (str): Kind of entry, e.g. "raster_map"
+        fingerprint (str): Fingerprint of the dataset
+        *params: Parameters determining the value (their repr is hashed)
+
+    Returns:
+        str: Hex digest identifying the entry
+    """
+    digest = hashlib.sha256()
+    for part in (namespace, fingerprint) + params:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def hash_array(values):
+    """
+    Hash the content of an array, for use as a key parameter.
+
+    Args:
+        values (array-like): Values (e.g. the class codes of a map)
+
+    Returns:
+        str: Hex digest of the array bytes and dtype
+    """
+    import numpy as np
+
+    array = np.ascontiguousarray(values)
+    return hashlib.sha1(array.tobytes() + str(array.dtype).encode("ascii")).hexdigest()
+
+def _entry_path(namespace, key):
+    # Two levels keep directories small even with many entries
+    return os.path.join(get_cache_dir(), namespace, key[:2], key + ENTRY_SUFFIX)
+
+def cache_get(namespace, key):
+    """
+    Read an entry and mark it as recently used.
+
+    Args:
+        namespace (str): Kind of entry
+        key (str): Content address from make_key
+
+    Returns:
+        object: The stored value, or None on a miss
+    """
+    if get_max_bytes() <= 0:
+        return None
+
+    path = _entry_path(namespace, key)
+    try:
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError):
+        # A damaged entry is a miss; the next put replaces it
+        return None
+
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return value
+
+def cache_put(namespace, key, value):
+    """
+    Store an entry, evicting old entries if the cap is exceeded.
+
+    Args:
+        namespace (str): Kind of entry
+        key (str): Content address from make_key
+        value (object): Picklable value
+
+    Returns:
+        None
+    """
+    global _size_estimate
+    max_bytes = get_max_bytes()
+    if max_bytes <= 0:
+        return
+
+    path = _entry_path(namespace, key)
+    data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        # The disk tier is best effort; a full or read-only disk must not break the app
+        return
+
+    with _lock:
+        if _size_estimate is None:
+            _size_estimate = get_cache_size()
+        else:
+            _size_estimate += _disk_size(len(data))
+        over = _size_estimate > max_bytes
+
+    if over:
+        evict(max_bytes)
+
+def get_or_compute(namespace, key, compute):
+    """
+    Return the stored value of a key, computing and storing it on a miss.
+
+    A miss is reported to the profiler (record_cache_miss), so a stage
+    wrapping this call shows whether the disk tier served it.
+
+    Args:
+        namespace (str): Kind of entry
+        key (str): Content address from make_key
+        compute (callable): Function without arguments producing the value
+
+    Returns:
+        object: The cached or computed value
+    """
+    value = cache_get(namespace, key)
+    if value is None:
+        record_cache_miss()
+        value = compute()
+        cache_put(namespace, key, value)
+    return value
+
+def _disk_size(n):
+    return -(-n // BLOCK_SIZE) * BLOCK_SIZE
+
+def _scan():
+    """
+    List the entries of the cache.
+
+    Returns:
+        list: (last use time, size on disk, path) of every entry
+    """
+    entries = []
+    for root, _, files in os.walk(get_cache_dir()):
+        for name in files:
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, _disk_size(stat.st_size), path))
+    return entries
+
+def get_cache_size():
+    """
+    Get the total size of the cache entries on disk.
+
+    Returns:
+        int: Size in bytes
+    """
+    return sum(size for _, size, _ in _scan())
+
+@contextmanager
+def _eviction_lock():
+    """
+    Hold an exclusive lock on the cache directory, across processes.
+    """
+    os.makedirs(get_cache_dir(), exist_ok=True)
+    with open(os.path.join(get_cache_dir(), ".lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def evict(max_bytes=None):
+    """
+    Delete least recently used entries until the cache fits its cap.
+
+    The directory is rescanned under the lock, so the decision is based
+    on what every process has written, not on this process's estimate.
+    Temporary files left behind by crashed writers are removed as well.
+
+    Args:
+        max_bytes (int, optional): Size cap (default: the configured cap)
+
+    Returns:
+        int: Number of entries deleted
+    """
+    global _size_estimate
+    max_bytes = get_max_bytes() if max_bytes is None else max_bytes
+
+    removed = 0
+    with _eviction_lock():
+        entries = sorted(_scan())
+        total = sum(size for _, size, _ in entries)
+
+        target = max_bytes * EVICTION_TARGET
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        # Temporary files older than an hour belong to writers that died
+        stale = time.time() - 3600
+        for root, _, files in os.walk(get_cache_dir()):
+            for name in files:
+                if name.endswith(".tmp"):
+                    path = os.path.join(root, name)
+                    try:
+                        if os.stat(path).st_mtime < stale:
+                            os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    with _lock:
+        _size_estimate = total
+    return removed
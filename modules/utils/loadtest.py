@@ -0,0 +1,253 @@
+# modules/utils/loadtest.py
+
+"""
+Load-test harness for the Solar Suitability Dashboard.
+
+This module drives app.py headlessly through Streamlit's AppTest with
+several simulated sessions at once, each in its own thread of this
+process, the way one server process serves concurrent users. Every
+session repeats a realistic click sequence:
+
+    state -> district -> layer -> category
+
+picking each value at random (from a seeded stream per session) among
+the options the app currently offers. Every rerun is timed, and the
+harness reports p50/p95/p99 latency overall and per action, throughput
+in reruns per second and the peak resident memory of the process.
+
+It is the acceptance test for performance work on the app: pass
+--p95-budget to fail (exit code 1) when the 95th percentile exceeds
+the budget, or when any rerun raised an exception.
+
+    python -m modules.utils.loadtest --sessions 8 --rounds 5
+    python -m modules.utils.loadtest --sessions 16 --p95-budget 1.5 --json loadtest.json
+
+Run it from the repository root, like the dashboard itself.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from modules.data.pipeline import peak_memory_mb
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "app.py")
+
+# The click sequence of one round, as (action, widget key)
+CLICK_SEQUENCE = [
+    ("state", "state_select"),
+    ("district", "district_select"),
+    ("layer", "layer_select"),
+    ("category", "category_select")
+]
+
+DEFAULT_SESSIONS = 4
+DEFAULT_ROUNDS = 3
+DEFAULT_TIMEOUT = 300
+
+PERCENTILES = [50, 95, 99]
+
+def run_session(session_id, rounds, seed, timeout, results, lock):
+    """
+    Simulate one user: open the app and click through several rounds.
+
+    Args:
+        session_id (int): Number of the session, also seeding its choices
+        rounds (int): Number of state -> district -> layer -> category rounds
+        seed (int): Seed of the run
+        timeout (float): Timeout of a single rerun in seconds
+        results (list): Shared list receiving one record per rerun
+        lock (threading.Lock): Lock guarding the results list
+
+    Returns:
+        None
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = np.random.default_rng([seed, session_id])
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+
+    def timed_run(action, value=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            at.run()
+            if at.exception:
+                error = str(at.exception[0].value)
+        except Exception as e:
+            error = str(e)
+        record = {
+            "session": session_id,
+            "action": action,
+            "value": value,
+            "seconds": time.perf_counter() - start,
+            "error": error
+        }
+        with lock:
+            results.append(record)
+        return error is None
+
+    if not timed_run("open"):
+        return
+
+    for _ in range(rounds):
+        for action, key in CLICK_SEQUENCE:
+            widgets = [w for w in at.selectbox if w.key == key]
+            if not widgets or not widgets[0].options:
+                continue
+            widget = widgets[0]
+            options = list(widget.options)
+            # Prefer a different value, so the click actually changes the view
+            choices = [o for o in options if o != widget.value] or options
+            value = choices[rng.integers(len(choices))]
+            widget.select(value)
+            if not timed_run(action, value):
+                return
+
+def summarize(results, wall_seconds):
+    """
+    Summarize the recorded reruns.
+
+    Args:
+        results (list): Records from run_session
+        wall_seconds (float): Wall time of the whole run
+
+    Returns:
+        dict: Rerun count, error count, throughput, overall and per-action
+        latency percentiles (seconds) and peak memory
+    """
+    def percentiles(records):
+        seconds = np.array([r["seconds"] for r in records])
+        if len(seconds) == 0:
+            return {}
+        stats = {f"p{p}": round(float(np.percentile(seconds, p)), 4) for p in PERCENTILES}
+        stats["mean"] = round(float(seconds.mean()), 4)
+        stats["max"] = round(float(seconds.max()), 4)
+        stats["count"] = len(seconds)
+        return stats
+
+    ok = [r for r in results if r["error"] is None]
+    actions = ["open"] + [action for action, _ in CLICK_SEQUENCE]
+    parent_mb, _ = peak_memory_mb()
+
+    return {
+        "reruns": len(results),
+        "errors": len(results) - len(ok),
+        "error_samples": sorted({r["error"] for r in results if r["error"] is not None})[:5],
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_per_second": round(len(ok) / wall_seconds, 2) if wall_seconds > 0 else None,
+        "latency": percentiles(ok),
+        "by_action": {action: percentiles([r for r in ok if r["action"] == action]) for action in actions},
+        "peak_memory_mb": parent_mb
+    }
+
+def run_load_test(sessions=DEFAULT_SESSIONS, rounds=DEFAULT_ROUNDS, seed=0, timeout=DEFAULT_TIMEOUT,
+                  prime=True, progress=print):
+    """
+    Run concurrent simulated sessions against the app.
+
+    Args:
+        sessions (int): Number of concurrent sessions
+        rounds (int): Click rounds per session
+        seed (int): Seed of the click choices
+        timeout (float): Timeout of a single rerun in seconds
+        prime (bool): Open the app once before the measured run, so the
+            dataset load is not part of the latencies
+        progress (callable): Function receiving progress messages
+
+    Returns:
+        dict: The summary from summarize
+    """
+    # The sessions must render the dashboard, not the warm-up progress
+    os.environ.setdefault("SOLAR_DASHBOARD_WARMUP", "0")
+
+    lock = threading.Lock()
+    if prime:
+        primer = []
+        start = time.perf_counter()
+        run_session(0, 0, seed, timeout, primer, lock)
+        progress(f"Primed caches in {time.perf_counter() - start:.1f}s")
+
+    results = []
+    threads = [threading.Thread(target=run_session, args=(i, rounds, seed, timeout, results, lock),
+                                name=f"loadtest-session-{i}")
+               for i in range(sessions)]
+
+    progress(f"Running {sessions} sessions x {rounds} rounds...")
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(results, time.perf_counter() - start)
+
+def format_summary(summary):
+    """
+    Format a summary as a plain-text report.
+
+    Args:
+        summary (dict): The summary from summarize
+
+    Returns:
+        str: The report
+    """
+    def row(name, stats):
+        if not stats:
+            return f"{name:<10} {'-':>8}"
+        return (f"{name:<10} {stats['count']:>8} " +
+                " ".join(f"{stats[f'p{p}']:>8.3f}" for p in PERCENTILES) + f" {stats['max']:>8.3f}")
+
+    lines = [
+        f"Reruns: {summary['reruns']} ({summary['errors']} errors) in {summary['wall_seconds']}s, "
+        f"{summary['throughput_per_second']} reruns/s",
+        f"{'action':<10} {'count':>8} " + " ".join(f"{'p' + str(p) + ' s':>8}" for p in PERCENTILES) + f" {'max s':>8}",
+        row("all", summary["latency"])
+    ]
+    lines += [row(action, stats) for action, stats in summary["by_action"].items()]
+    if summary["peak_memory_mb"] is not None:
+        lines.append(f"Peak memory: {summary['peak_memory_mb']:.0f} MB")
+    lines += [f"Error: {error}" for error in summary["error_samples"]]
+    return "\n".join(lines)
+
+def main(argv=None):
+    """
+    Command-line entry point for the load test.
+
+    Args:
+        argv (list, optional): Command-line arguments (default: sys.argv)
+
+    Returns:
+        int: Process exit code (1 if a rerun failed or the p95 budget was exceeded)
+    """
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="Concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS,
+                        help="State -> district -> layer -> category rounds per session")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the click choices")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Timeout of one rerun in seconds")
+    parser.add_argument("--no-prime", action="store_true", help="Include the first dataset load in the measurements")
+    parser.add_argument("--p95-budget", type=float, default=None, help="Fail if the p95 rerun latency exceeds this (s)")
+    parser.add_argument("--json", default=None, help="Also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    summary = run_load_test(args.sessions, args.rounds, args.seed, args.timeout, prime=not args.no_prime)
+    print(format_summary(summary))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    if summary["errors"]:
+        return 1
+    if args.p95_budget is not None and summary["latency"].get("p95", 0) > args.p95_budget:
+        print(f"FAIL: p95 {summary['latency']['p95']:.3f}s exceeds the budget of {args.p95_budget:.3f}s")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# modules/utils/memory_cache.py
+
+"""
+Memory cache module for the Solar Suitability Dashboard.
+
+Per-dataset structures (class and indicator matrices, search and row
+indexes, adjacency graphs, view paths, pie charts) are built once and
+kept in small process-wide caches. Session threads, the warm-up thread
+and the prefetch workers all read and fill these caches, so they are
+guarded by a lock: BoundedCache is a dict with a fixed number of entries
+that drops the oldest entry when a new one does not fit.
+
+Values are built outside the lock, so a slow build does not hold up
+lookups of other keys. Two threads missing the same key at once may both
+build it; the first value stored is kept and returned to both.
+"""
+
+import threading
+
+class BoundedCache:
+    """
+    A lock-guarded dict holding at most max_entries entries, oldest evicted first.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Look a key up without building it.
+
+        Args:
+            key (hashable): The key
+            default (object): Value returned on a miss
+
+        Returns:
+            object: The cached value, or default
+        """
+        with self._lock:
+            return self._entries.get(key, default)
+
+    def get_or_build(self, key, build):
+        """
+        Return the cached value of a key, building and storing it on a miss.
+
+        Args:
+            key (hashable): The key
+            build (callable): Function without arguments producing the value
+
+        Returns:
+            object: The cached or built value
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+        value = build()
+        with self._lock:
+            if key not in self._entries:
+                while len(self._entries) >= self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+                self._entries[key] = value
+            return self._entries[key]
+
+    def clear(self):
+        """
+        Drop every entry.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
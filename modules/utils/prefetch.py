@@ -0,0 +1,386 @@
+# modules/utils/prefetch.py
+
+"""
+Prefetch module for the Solar Suitability Dashboard.
+
+Most navigation is one of two steps: from a state to one of its
+districts, or from one layer to the next in the layer dropdown. After a
+view is served, this module renders the views one such step away on a
+small background thread pool, so the render of the next view is already
+in the disk cache (modules.utils.disk_cache) when the user gets there.
+
+- Each session has one set of scheduled views. Scheduling for a new view
+  cancels the views of the previous one that have not started; a view
+  wanted by several sessions is kept until none of them wants it.
+- A session that opens a view while it is being prefetched waits for
+  that render instead of starting a second one; if the view is still
+  queued it is taken out of the queue and rendered in the session.
+- Workers pause after every render so that, together, they use about
+  SOLAR_DASHBOARD_PREFETCH_CPU of one core (default 0.5), and do not
+  start a render while a session is rendering its map (foreground), so
+  prefetching never competes with a user who is waiting. A view whose
+  worker is still waiting for that is handed to a session that opens it.
+- The workers are daemon threads. When the process exits, queued views
+  are cancelled, a worker's pause is cut short and the exit handler only
+  waits for the render in progress (shutdown).
+
+Only plain views of the shipped categories are prefetched: the Custom
+category, hotspots, version changes and comparison grids depend on
+per-session settings and are rarely revisited as they are. Prefetching
+is off when the disk cache is disabled, and with SOLAR_DASHBOARD_PREFETCH=0.
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from modules.data.classes import CATEGORIES, get_layer_options
+from modules.data.search import get_search_index
+from modules.utils.constants import MAP_RENDERER, layer_column_mapping
+from modules.utils.disk_cache import get_max_bytes
+from modules.visualization.maps import render_simple_map
+from modules.visualization.raster import create_raster_map
+
+PREFETCH_ENV = "SOLAR_DASHBOARD_PREFETCH"
+WORKERS_ENV = "SOLAR_DASHBOARD_PREFETCH_WORKERS"
+CPU_SHARE_ENV = "SOLAR_DASHBOARD_PREFETCH_CPU"
+
+DEFAULT_WORKERS = 1
+DEFAULT_CPU_SHARE = 0.5
+
+# Views scheduled per served view (adjacent layers first, then districts)
+MAX_PREFETCH_VIEWS = 40
+
+# Longest pause of a worker after one render, in seconds
+MAX_PAUSE = 2.0
+
+# Longest wait for the render in progress when the process exits, in seconds
+SHUTDOWN_TIMEOUT = 30.0
+
+_lock = threading.Lock()
+
+# Views waiting for a worker, as (future, arguments); None stops a worker
+_queue = queue.SimpleQueue()
+_workers = []
+
+# Set by shutdown; workers stop rendering and pausing
+_stopping = threading.Event()
+
+# Scheduled views: view key -> {"future", "done", "sessions", "started"}, and the keys per session
+_inflight = {}
+_sessions = {}
+
+# Number of map renders running in sessions; workers start when it is 0
+_foreground = 0
+_idle = threading.Condition(_lock)
+
+def is_enabled():
+    """
+    Check whether prefetching is switched on.
+
+    Returns:
+        bool: False if SOLAR_DASHBOARD_PREFETCH is set to 0, false or no,
+        or if the disk cache (where prefetched maps go) is disabled
+    """
+    if os.environ.get(PREFETCH_ENV, "1").lower() in ("0", "false", "no"):
+        return False
+    return get_max_bytes() > 0
+
+def get_workers():
+    """
+    Get the number of prefetch threads.
+
+    Returns:
+        int: SOLAR_DASHBOARD_PREFETCH_WORKERS, or DEFAULT_WORKERS
+    """
+    try:
+        return max(1, int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+def get_cpu_share():
+    """
+    Get the share of one core the prefetch threads may use together.
+
+    Returns:
+        float: SOLAR_DASHBOARD_PREFETCH_CPU (between 0.05 and the number
+        of workers), or DEFAULT_CPU_SHARE
+    """
+    try:
+        share = float(os.environ.get(CPU_SHARE_ENV, DEFAULT_CPU_SHARE))
+    except ValueError:
+        return DEFAULT_CPU_SHARE
+    return min(max(share, 0.05), get_workers())
+
+def _work():
+    while True:
+        item = _queue.get()
+        if item is None:
+            return
+        future, args = item
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            future.set_result(_prefetch(*args))
+        except BaseException as error:
+            future.set_exception(error)
+
+def _submit(*args):
+    """
+    Queue a _prefetch call, starting the workers on first use.
+
+    The workers are daemon threads, so the interpreter does not wait for
+    them before the atexit handlers run; shutdown (registered with
+    atexit) stops them instead. Called with the lock held.
+
+    Returns:
+        concurrent.futures.Future: The future of the call
+    """
+    if not _workers:
+        for i in range(get_workers()):
+            worker = threading.Thread(target=_work, name=f"dashboard-prefetch_{i}", daemon=True)
+            worker.start()
+            _workers.append(worker)
+        atexit.register(shutdown)
+    future = Future()
+    _queue.put((future, args))
+    return future
+
+def _get_session():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+def render_view(_gdf, selected_state, selected_district, vis_column, selected_category):
+    """
+    Render a map with the engine the map panel uses for the view.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column shown on the map
+        selected_category (str): The selected category
+
+    Returns:
+        bytes: The encoded map
+    """
+    if MAP_RENDERER == "raster" or (MAP_RENDERER == "auto" and selected_state == "National Average"):
+        return create_raster_map(_gdf, selected_state, selected_district, vis_column, selected_category)
+    return render_simple_map(_gdf, selected_state, selected_district, vis_column, selected_category)
+
+def get_next_views(_gdf, selected_state, selected_district, vis_column, selected_category, limit=MAX_PREFETCH_VIEWS):
+    """
+    Get the views one navigation step away from a view, most likely first.
+
+    These are the next and previous layer of the layer dropdown, then the
+    districts of the state: in dropdown order for a state view, nearest
+    in the dropdown first for a district view.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column shown on the map
+        selected_category (str): The selected category
+        limit (int): Maximum number of views
+
+    Returns:
+        list: (state, district, column, category) tuples
+    """
+    views = []
+    # Columns of the layers the dropdown offers for this dataset, in its order
+    layer_order = [layer_column_mapping[layer] for layer in get_layer_options(_gdf)]
+    if vis_column in layer_order:
+        i = layer_order.index(vis_column)
+        for j in (i + 1, i - 1):
+            if 0 <= j < len(layer_order) and layer_order[j] in _gdf.columns:
+                views.append((selected_state, selected_district, layer_order[j], selected_category))
+
+    if selected_state != "National Average":
+        districts = get_search_index(_gdf)["districts_by_state"].get(selected_state, [])
+        if selected_district in districts:
+            i = districts.index(selected_district)
+            order = sorted(range(len(districts)), key=lambda j: (abs(j - i), j < i))
+            districts = [districts[j] for j in order[1:]]
+        views += [(selected_state, district, vis_column, selected_category) for district in districts]
+
+    return views[:limit]
+
+def _prefetch(key, _gdf, view, done):
+    """
+    Render one view into the cache, then pause to keep to the CPU share.
+    Runs in a worker thread; done is set as soon as the render is stored.
+    """
+    # Wait until no session is rendering; a session that opens the view
+    # meanwhile takes it over (wait_for), and then it is not rendered here
+    with _lock:
+        _idle.wait_for(lambda: _foreground == 0 or _stopping.is_set())
+        entry = _inflight.get(key)
+        claimed = entry is None or entry["done"] is not done
+        if not claimed:
+            entry["started"] = True
+
+    start = time.thread_time()
+    try:
+        if not _stopping.is_set() and not claimed:
+            render_view(_gdf, *view)
+    except Exception:
+        # A view that cannot be rendered is rendered (and fails) in the session instead
+        pass
+    finally:
+        with _lock:
+            if not claimed and _inflight.get(key) is entry:
+                del _inflight[key]
+        done.set()
+
+    # Worker CPU time / (CPU time + pause) = share / workers
+    used = time.thread_time() - start
+    _stopping.wait(min(max(used * (get_workers() / get_cpu_share() - 1), 0), MAX_PAUSE))
+
+def _cancel(session, keep=()):
+    """
+    Drop a session's claim on its scheduled views, except those in keep,
+    and cancel the ones no session wants any more. Called with the lock held.
+    """
+    for key in _sessions.pop(session, ()):
+        entry = _inflight.get(key)
+        if entry is None or key in keep:
+            continue
+        entry["sessions"].discard(session)
+        if not entry["sessions"] and entry["future"].cancel():
+            del _inflight[key]
+
+def schedule(_gdf, selected_state, selected_district, vis_column, selected_category):
+    """
+    Prefetch the likely next views of the view a session has just served.
+
+    Replaces the session's previously scheduled views; those that are
+    also likely next views of this one stay queued. Calling it again for
+    the same view (a rerun that did not navigate) changes nothing.
+
+    Args:
+        _gdf (GeoDataFrame): The district table the view was rendered from
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column shown on the map
+        selected_category (str): The selected category
+
+    Returns:
+        int: Number of views scheduled
+    """
+    if not is_enabled() or selected_category not in CATEGORIES or _stopping.is_set():
+        cancel()
+        return 0
+
+    fingerprint = _gdf.attrs.get("fingerprint")
+    views = get_next_views(_gdf, selected_state, selected_district, vis_column, selected_category)
+    keys = [(fingerprint,) + view for view in views]
+    session = _get_session()
+
+    with _lock:
+        if _sessions.get(session) == keys:
+            return len(keys)
+        _cancel(session, keep=set(keys))
+
+        # Forget sessions whose views have all been rendered
+        for other in [s for s, claimed in _sessions.items() if not any(k in _inflight for k in claimed)]:
+            del _sessions[other]
+
+        for key, view in zip(keys, views):
+            entry = _inflight.get(key)
+            if entry is None:
+                done = threading.Event()
+                entry = _inflight[key] = {"future": _submit(key, _gdf, view, done),
+                                          "done": done, "sessions": set(), "started": False}
+            entry["sessions"].add(session)
+        _sessions[session] = keys
+    return len(keys)
+
+def cancel():
+    """
+    Cancel the session's scheduled views that have not started, e.g. when
+    it shows a view that is not prefetched.
+
+    Returns:
+        None
+    """
+    with _lock:
+        _cancel(_get_session())
+
+def shutdown(timeout=SHUTDOWN_TIMEOUT):
+    """
+    Stop prefetching: cancel every queued view and wait for the workers to
+    exit after the render in progress. Called when the process exits.
+
+    Args:
+        timeout (float): Longest wait per worker in seconds
+
+    Returns:
+        None
+    """
+    _stopping.set()
+    with _lock:
+        for entry in _inflight.values():
+            entry["future"].cancel()
+            entry["done"].set()
+        _inflight.clear()
+        _sessions.clear()
+        _idle.notify_all()
+        workers = list(_workers)
+    for _ in workers:
+        _queue.put(None)
+    for worker in workers:
+        worker.join(timeout)
+
+@contextmanager
+def foreground():
+    """
+    Mark a render a user is waiting for; workers start no render meanwhile.
+
+    Yields:
+        None
+    """
+    global _foreground
+    with _lock:
+        _foreground += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _foreground -= 1
+            if _foreground == 0:
+                _idle.notify_all()
+
+def wait_for(_gdf, selected_state, selected_district, vis_column, selected_category, timeout=30):
+    """
+    Wait for a view that is being prefetched, before rendering it.
+
+    A view already being rendered by a worker is waited for, so that the
+    session reads it from the cache; a view still queued, or whose worker
+    has not started rendering, is taken back, so that the session renders
+    it at once instead.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column shown on the map
+        selected_category (str): The selected category
+        timeout (float): Longest wait in seconds
+
+    Returns:
+        bool: True if a prefetched render was waited for
+    """
+    key = (_gdf.attrs.get("fingerprint"), selected_state, selected_district, vis_column, selected_category)
+    with _lock:
+        entry = _inflight.get(key)
+        if entry is None or entry["future"].cancel() or not entry["started"]:
+            _inflight.pop(key, None)
+            return False
+    return entry["done"].wait(timeout)
@@ -0,0 +1,309 @@
+# modules/utils/profiling.py
+
+"""
+Profiling module for the Solar Suitability Dashboard.
+
+This module provides a lightweight instrumentation layer for timing the
+stages of a rerun (loading, filtering, map creation, encoding, statistics).
+Each stage records its wall time, whether a cache was hit and, where it
+is known, the payload size sent to the browser. Module-level functions
+that are a stage on their own (filtering, the statistics panel, the
+controls) are decorated with `timed`; stages that record a payload size
+or a cache hit are wrapped with `stage` where they are called.
+
+Recording is switched on per session from the performance panel, or for
+every session with the SOLAR_DASHBOARD_PROFILE environment variable. When
+it is off, `stage` does nothing beyond one thread-local lookup. Finished
+reruns can be exported as a Chrome trace (chrome://tracing, Perfetto) and
+are appended as JSON lines to SOLAR_DASHBOARD_TRACE_FILE when it is set.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+# Environment variables controlling profiling for all sessions
+PROFILE_ENV = "SOLAR_DASHBOARD_PROFILE"
+TRACE_FILE_ENV = "SOLAR_DASHBOARD_TRACE_FILE"
+
+# Session state keys: the panel toggle and the recorded reruns
+PANEL_KEY = "perf_panel"
+HISTORY_KEY = "_perf_history"
+HISTORY_LENGTH = 50
+
+# Each Streamlit session runs its script in its own thread
+_local = threading.local()
+
+class _NullSpan:
+    """
+    Stand-in span used when profiling is off.
+
+    Every method is a no-op so instrumented code never has to check
+    whether profiling is enabled.
+    """
+    enabled = False
+
+    def add_bytes(self, n):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """
+    Timing record for one stage of a rerun.
+    """
+    enabled = True
+
+    def __init__(self, name, cached):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.cache = "hit" if cached else None
+        self.bytes = None
+
+    def add_bytes(self, n):
+        """
+        Add to the number of payload bytes produced by this stage.
+
+        Args:
+            n (int): Number of bytes
+
+        Returns:
+            None
+        """
+        self.bytes = (self.bytes or 0) + int(n)
+
+    def to_dict(self, origin):
+        """
+        Convert the span to a plain dictionary.
+
+        Args:
+            origin (float): perf_counter value at the start of the rerun
+
+        Returns:
+            dict: Stage name, offset and duration in ms, cache status and bytes
+        """
+        return {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "ms": round(self.duration * 1000, 3),
+            "cache": self.cache,
+            "bytes": self.bytes
+        }
+
+def _session_enabled():
+    """
+    Check whether profiling is switched on for the current session.
+
+    Returns:
+        bool: True if the panel toggle or the environment variable is set
+    """
+    if os.environ.get(PROFILE_ENV):
+        return True
+    try:
+        return bool(st.session_state.get(PANEL_KEY, False))
+    except Exception:
+        # No session (bare script or worker thread)
+        return False
+
+def begin_rerun(label="rerun"):
+    """
+    Start recording a rerun if profiling is enabled for this session.
+
+    Call this at the top of the script (or of a fragment). Stages opened
+    before the next `end_rerun` are attached to this rerun.
+
+    Args:
+        label (str): Name of the rerun in the exported trace
+
+    Returns:
+        None
+    """
+    if not _session_enabled():
+        _local.rerun = None
+        return
+
+    _local.rerun = {
+        "label": label,
+        "wall_start": time.time(),
+        "start": time.perf_counter(),
+        "spans": [],
+        "open": []
+    }
+
+def end_rerun():
+    """
+    Finish the current rerun and store it in the session history.
+
+    The rerun is also appended to the JSON-lines trace file when the
+    SOLAR_DASHBOARD_TRACE_FILE environment variable is set.
+
+    Returns:
+        dict: The recorded rerun, or None if profiling is off
+    """
+    rerun = getattr(_local, "rerun", None)
+    _local.rerun = None
+    if rerun is None:
+        return None
+
+    record = {
+        "label": rerun["label"],
+        "started": rerun["wall_start"],
+        "total_ms": round((time.perf_counter() - rerun["start"]) * 1000, 3),
+        "stages": [span.to_dict(rerun["start"]) for span in rerun["spans"]]
+    }
+
+    try:
+        history = st.session_state.setdefault(HISTORY_KEY, deque(maxlen=HISTORY_LENGTH))
+        history.append(record)
+    except Exception:
+        pass
+
+    trace_file = os.environ.get(TRACE_FILE_ENV)
+    if trace_file:
+        with open(trace_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    return record
+
+@contextmanager
+def rerun(label="rerun"):
+    """
+    Record the enclosed code as one rerun.
+
+    Fragments use this so that a fragment-only rerun is recorded on its
+    own, while a fragment executed as part of a full rerun simply adds its
+    stages to the full rerun.
+
+    Args:
+        label (str): Name of the rerun in the exported trace
+
+    Yields:
+        None
+    """
+    if getattr(_local, "rerun", None) is not None:
+        yield
+        return
+
+    begin_rerun(label)
+    try:
+        yield
+    finally:
+        end_rerun()
+
+@contextmanager
+def stage(name, cached=False):
+    """
+    Time a stage of the current rerun.
+
+    Use as a context manager around the code of a stage. The yielded span
+    accepts payload sizes through `add_bytes`. When `cached` is True the
+    stage counts as a cache hit unless `record_cache_miss` is called while
+    it is open (typically from inside the body of a cached function).
+
+    Args:
+        name (str): Name of the stage
+        cached (bool): Whether the stage is served by a cache
+
+    Yields:
+        Span: The span being recorded (a no-op span when profiling is off)
+    """
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        yield _NULL_SPAN
+        return
+
+    span = Span(name, cached)
+    rerun["open"].append(span)
+    try:
+        yield span
+    finally:
+        span.duration = time.perf_counter() - span.start
+        rerun["open"].pop()
+        rerun["spans"].append(span)
+
+def timed(name=None, cached=False):
+    """
+    Decorator form of `stage`.
+
+    Args:
+        name (str, optional): Name of the stage (default: the function name)
+        cached (bool): Whether the function is served by a cache
+
+    Returns:
+        callable: Decorator wrapping the function in a stage
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, cached=cached):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_cache_miss():
+    """
+    Mark the innermost cached stage as a cache miss.
+
+    Call this from the body of a cached function: the body only runs on a
+    miss, so a stage that never sees this call was served from the cache.
+
+    Returns:
+        None
+    """
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return
+
+    for span in reversed(rerun["open"]):
+        if span.cache is not None:
+            span.cache = "miss"
+            break
+
+def get_history():
+    """
+    Get the reruns recorded for the current session.
+
+    Returns:
+        list: Recorded reruns, oldest first
+    """
+    return list(st.session_state.get(HISTORY_KEY, []))
+
+def to_chrome_trace(history):
+    """
+    Convert recorded reruns to the Chrome trace event format.
+
+    Each rerun becomes an enclosing event and each stage a nested complete
+    ("X") event, so the trace loads directly into chrome://tracing or
+    Perfetto.
+
+    Args:
+        history (list): Recorded reruns as returned by `get_history`
+
+    Returns:
+        str: JSON document with a traceEvents list
+    """
+    events = []
+    pid = os.getpid()
+    for index, rerun in enumerate(history):
+        origin_us = rerun["started"] * 1e6
+        events.append({
+            "name": rerun["label"], "cat": "rerun", "ph": "X", "pid": pid, "tid": 0,
+            "ts": origin_us, "dur": rerun["total_ms"] * 1000, "args": {"rerun": index}
+        })
+        for entry in rerun["stages"]:
+            events.append({
+                "name": entry["name"], "cat": "stage", "ph": "X", "pid": pid, "tid": 0,
+                "ts": origin_us + entry["offset_ms"] * 1000, "dur": entry["ms"] * 1000,
+                "args": {"cache": entry["cache"], "bytes": entry["bytes"]}
+            })
+
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
@@ -0,0 +1,281 @@
+# modules/utils/warmup.py
+
+"""
+Warm-up module for the Solar Suitability Dashboard.
+
+After a deploy the first visitor would wait for the dataset to load and
+then for the first render of every view. This module does that work in a
+background thread instead, once per server process:
+
+1. load the dataset (load_shapefile_data) and fingerprint it;
+2. build the class and indicator matrices, the adjacency graph and the
+   aggregate table;
+3. render the most requested views, ordered by how often they were
+   opened (recorded by record_view in cache/view_counts.json).
+
+The dashboard shows the warm-up status until the dataset is ready rather
+than blocking on the load. Start the server through this module to begin
+warming before the first visitor arrives:
+
+    python -m modules.utils.warmup [streamlit run options]
+
+Maps are rendered through the same pyplot-free figure code as the
+sessions (modules.visualization.maps), so the thread can render while
+sessions are served. With a plain `streamlit run app.py` the warm-up
+starts with the first session instead. Set SOLAR_DASHBOARD_WARMUP=0 to switch it off.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+WARMUP_ENV = "SOLAR_DASHBOARD_WARMUP"
+VIEW_COUNTS_FILE = os.path.join("cache", "view_counts.json")
+
+# Number of views rendered by the warm-up, most requested first
+WARM_VIEW_COUNT = 40
+
+# Recorded views are written to disk after this many new records
+FLUSH_EVERY = 20
+
+# View opened when a session starts, warmed even without any history
+DEFAULT_VIEW = ("National Average", "All Districts", "GW_dev_sta", "Adaptation")
+
+_lock = threading.Lock()
+_thread = None
+_status = {
+    "stage": "Not started",
+    "done": 0,
+    "total": 0,
+    "ready": False,
+    "finished": False,
+    "error": None
+}
+
+# Views recorded since the last flush
+_pending_views = Counter()
+
+def _set_status(**changes):
+    with _lock:
+        _status.update(changes)
+
+def get_status():
+    """
+    Get a snapshot of the warm-up progress.
+
+    Returns:
+        dict: "stage" (description), "done"/"total" (warm-up steps),
+        "ready" (the dataset is loaded), "finished" and "error"
+    """
+    with _lock:
+        return dict(_status)
+
+def is_enabled():
+    """
+    Check whether the warm-up is switched on.
+
+    Returns:
+        bool: False if SOLAR_DASHBOARD_WARMUP is set to 0, false or no
+    """
+    return os.environ.get(WARMUP_ENV, "1").lower() not in ("0", "false", "no")
+
+def is_ready():
+    """
+    Check whether the dashboard can render without waiting for the load.
+
+    The dashboard also counts as ready when the warm-up is off or failed,
+    in which case sessions load the data themselves as before.
+
+    Returns:
+        bool: True if sessions should render normally
+    """
+    status = get_status()
+    return not is_enabled() or _thread is None or status["ready"] or status["error"] is not None
+
+def record_view(selected_state, selected_district, vis_column, selected_category):
+    """
+    Count one render of a view, for prioritizing future warm-ups.
+
+    Counts are kept in memory and merged into the counts file every
+    FLUSH_EVERY records, so recording costs nothing on most reruns.
+
+    Args:
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column shown on the map
+        selected_category (str): The selected category
+
+    Returns:
+        None
+    """
+    with _lock:
+        _pending_views["|".join([selected_state, selected_district, vis_column, selected_category])] += 1
+        if sum(_pending_views.values()) < FLUSH_EVERY:
+            return
+        pending = dict(_pending_views)
+        _pending_views.clear()
+
+    try:
+        counts = load_view_counts()
+        counts.update(pending)
+        os.makedirs(os.path.dirname(VIEW_COUNTS_FILE), exist_ok=True)
+        tmp_path = f"{VIEW_COUNTS_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(dict(counts), f)
+        os.replace(tmp_path, VIEW_COUNTS_FILE)
+    except OSError:
+        # Recording is best effort; a read-only disk must not break the app
+        pass
+
+def load_view_counts():
+    """
+    Load the recorded view counts.
+
+    Returns:
+        Counter: Number of renders per "state|district|column|category" key
+    """
+    try:
+        with open(VIEW_COUNTS_FILE) as f:
+            return Counter(json.load(f))
+    except (OSError, ValueError):
+        return Counter()
+
+def get_warm_views(gdf, limit=WARM_VIEW_COUNT):
+    """
+    Get the views to render during warm-up, most requested first.
+
+    Without enough history, the default view of every state fills up
+    the list after the recorded ones.
+
+    Args:
+        gdf (GeoDataFrame): The district table
+        limit (int): Maximum number of views
+
+    Returns:
+        list: (state, district, column, category) tuples
+    """
+    views = [tuple(key.split("|")) for key, _ in load_view_counts().most_common()]
+    views = [view for view in views if len(view) == 4 and view[2] in gdf.columns]
+
+    states = sorted(str(s) for s in gdf["NAME_1"].dropna().unique())
+    defaults = [DEFAULT_VIEW] + [(state,) + DEFAULT_VIEW[1:] for state in states]
+    for view in defaults:
+        if view not in views:
+            views.append(view)
+
+    return views[:limit]
+
+def _wait_for_runtime(timeout=60):
+    """
+    Wait until the Streamlit runtime exists, so cached functions called
+    from this thread share their caches with the sessions.
+    """
+    from streamlit.runtime import Runtime
+
+    deadline = time.monotonic() + timeout
+    while not Runtime.exists() and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+def warm_up(wait_for_runtime=False):
+    """
+    Run the warm-up steps. Called in the background thread.
+
+    Args:
+        wait_for_runtime (bool): Wait for the Streamlit runtime first (when
+            started before the server)
+
+    Returns:
+        None
+    """
+    # Imported here so that importing this module stays cheap
+    from modules.data.loader import load_shapefile_data
+    from modules.data.aggregates import get_aggregates
+    from modules.data.classes import get_class_matrix
+    from modules.data.mcda import get_indicator_matrix
+    from modules.data.spatial import get_adjacency
+    from modules.utils.prefetch import render_view
+
+    try:
+        if wait_for_runtime:
+            _wait_for_runtime()
+
+        _set_status(stage="Loading data", total=3)
+        df = load_shapefile_data().districts
+        fingerprint = df.attrs.get("fingerprint")
+        _set_status(done=1, stage="Building indexes")
+
+        get_class_matrix(df)
+        get_indicator_matrix(df)
+        get_adjacency(df)
+        _set_status(done=2, stage="Computing aggregates")
+
+        # Sessions can start once everything they need on every rerun is cached
+        get_aggregates(df, fingerprint)
+        _set_status(done=3, ready=True)
+
+        views = get_warm_views(df)
+        _set_status(total=3 + len(views))
+        for i, (state, district, vis_column, category) in enumerate(views, start=1):
+            _set_status(stage=f"Rendering {state} / {district} / {vis_column}")
+            try:
+                render_view(df, state, district, vis_column, category)
+            except Exception:
+                # A view that cannot be rendered (e.g. no districts) is skipped
+                pass
+            _set_status(done=3 + i)
+
+        _set_status(stage="Done", finished=True)
+    except Exception as e:
+        _set_status(stage="Failed", error=str(e), finished=True)
+
+def start_warmup(wait_for_runtime=False):
+    """
+    Start the warm-up thread, once per process.
+
+    Safe to call on every rerun: only the first call starts the thread.
+
+    Args:
+        wait_for_runtime (bool): Let the thread wait for the Streamlit
+            runtime before using any cache (when called before the server
+            has started)
+
+    Returns:
+        bool: True if this call started the thread
+    """
+    global _thread
+    if not is_enabled():
+        return False
+
+    with _lock:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=warm_up, args=(wait_for_runtime,), name="dashboard-warmup", daemon=True)
+        _status["stage"] = "Starting"
+    _thread.start()
+    return True
+
+def main(argv=None):
+    """
+    Start the warm-up and the Streamlit server in this process.
+
+    Args:
+        argv (list, optional): Extra options for `streamlit run`
+
+    Returns:
+        int: Process exit code
+    """
+    from streamlit.web import cli
+    # Start the thread through the imported module, which is the one the
+    # app sees, not through this __main__ copy
+    from modules.utils import warmup
+
+    warmup.start_warmup(wait_for_runtime=True)
+    app_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "app.py")
+    sys.argv = ["streamlit", "run", app_path] + list(sys.argv[1:] if argv is None else argv)
+    return cli.main()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,28 +4,123 @@
 Charts visualization module for the Solar Suitability Dashboard.
 
 This module contains functions for creating charts, statistics displays,
-and other non-map visualizations for the dashboard.
+and other non-map visualizations for the dashboard. The numbers behind
+the statistics panel and the pie chart are computed by plain functions
+(get_statistics_metrics, get_suitability_distribution) so that the
+report export can reuse them outside Streamlit.
+
+The pie chart is kept as serialized Plotly JSON, in memory and in the
+disk cache, and sent to the browser as it is (show_plotly_json): building
+the spec from a prebuilt template, validating it into a figure and
+serializing it again would otherwise happen on every rerun. Sending it
+as it is relies on Streamlit internals (requirements.txt pins the
+tested Streamlit versions); when they are missing or have changed, the
+chart goes through st.plotly_chart instead.
 """
 
+import copy
+import inspect
+import json
+import numpy as np
+import pandas as pd
 import streamlit as st
 import plotly.express as px
+try:
+    from streamlit.delta_generator import DeltaGenerator
+    from streamlit.delta_generator_singletons import get_dg_singleton_instance
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.layout_utils import LayoutConfig
+    from streamlit.elements.lib.utils import compute_and_register_element_id
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+except ImportError:  # Streamlit internals moved; charts go through st.plotly_chart
+    PlotlyChartProto = None
 from modules.utils.constants import layer_column_mapping
+from modules.data.sensitivity import STABILITY_COLUMN, CLASS_NAMES
+from modules.data.aggregates import STATISTIC_LABELS, get_aggregate_value
+from modules.data.classes import get_label_classes, LABEL_CODES, CLASS_LABELS, CATEGORIES
+from modules.data.versions import CHANGE_COLUMN, transition_matrix
+from modules.utils.disk_cache import get_or_compute, make_key
+from modules.utils.memory_cache import BoundedCache
+from modules.utils.profiling import stage, record_cache_miss, timed
+
+# Custom colors for the chart - using red, blue, green theme
+SUITABILITY_COLOR_MAP = {
+    'Very Highly Suitable': '#66CC66',  # Dark green
+    'Highly Suitable': '#99FF99',       # Light green
+    'Moderately Suitable': '#FFFF99',   # Yellow
+    'Less Suitable': '#CC0000'          # Red
+}
+
+def get_statistics_metrics(filtered_df, selected_state, selected_district, selected_category):
+    """
+    Get the selection metrics shown at the top of the statistics panel.
+    
+    Args:
+        filtered_df (DataFrame): The filtered data based on selection
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        selected_category (str): The selected category (Adaptation, Mitigation, etc.)
+    
+    Returns:
+        list: List of (label, value) metrics, empty if nothing is selected
+    """
+    if filtered_df.empty:
+        return []
+    
+    district_data = filtered_df.iloc[0]
+    
+    # Display appropriate title based on selection
+    if selected_state == "National Average":
+        metrics = [("Selected Level", "National Average")]
+    elif selected_district == "All Districts":
+        metrics = [("Selected Level", f"{selected_state} State Average")]
+    else:
+        metrics = [("Selected District", selected_district)]
+    
+    if selected_category in district_data:
+        metrics.append((f"{selected_category} Suitability", district_data[selected_category]))
+    
+    # Set when the sensitivity analysis of the Custom weights has run
+    if STABILITY_COLUMN in district_data and district_data[STABILITY_COLUMN] == district_data[STABILITY_COLUMN]:
+        metrics.append((f"{selected_category} Stability", f"{district_data[STABILITY_COLUMN]:.0f}%"))
+    
+    return metrics
+
+def get_chart_level(selected_state, selected_district):
+    """
+    Get the aggregation level of the distribution chart for a selection.
+    
+    Args:
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+    
+    Returns:
+        str: "state", "national", or None when no chart is shown
+    """
+    if selected_state == "National Average":
+        return "national"
+    if selected_district == "All Districts":
+        return "state"
+    return None
 
-def display_statistics(df, filtered_df, selected_state, selected_district, selected_category):
+@timed()
+def display_statistics(data, filtered_df, selected_state, selected_district, selected_category):
     """
     Display statistics panel based on selected data.
     
     This function creates a panel showing statistics and charts based on
     the selected state, district, and category. It displays metrics and
     a pie chart showing distribution of suitability levels when appropriate.
+    The selected layer's value is shown with the map (display_layer_metric)
+    so that changing the layer does not redraw this panel.
     
     Args:
-        df (GeoDataFrame): The complete geodataframe
-        filtered_df (GeoDataFrame): The filtered data based on selection
+        data (Dataset): The processed dataset
+        filtered_df (DataFrame): The filtered data based on selection
         selected_state (str): The selected state or "National Average"
         selected_district (str): The selected district or "All Districts"
         selected_category (str): The selected category (Adaptation, Mitigation, etc.)
-        
+    
     Returns:
         None
     """
@@ -34,117 +129,416 @@ def display_statistics(df, filtered_df, selected_state, selected_district, selec
     
     # Display statistics based on selection
     if not filtered_df.empty:
-        district_data = filtered_df.iloc[0]
+        for label, value in get_statistics_metrics(filtered_df, selected_state, selected_district, selected_category):
+            st.metric(label, value)
         
-        # Display appropriate title based on selection
-        if selected_state == "National Average":
-            st.metric("Selected Level", "National Average")
-        elif selected_district == "All Districts":
-            st.metric("Selected Level", f"{selected_state} State Average")
-        else:
-            st.metric("Selected District", selected_district)
-        
-        if selected_category in district_data:
-            st.metric(f"{selected_category} Suitability", district_data[selected_category])
-        
-        # Show additional metrics if a layer is selected
-        if 'selected_layer' in st.session_state and layer_column_mapping[st.session_state.selected_layer] in district_data:
-            layer_col = layer_column_mapping[st.session_state.selected_layer]
-            layer_value = district_data[layer_col]
-            
-            # Format the numeric value to display nicely
-            if isinstance(layer_value, (int, float)):
-                formatted_value = f"{layer_value:.2f}"  # Format to 2 decimal places
-            else:
-                formatted_value = layer_value
-                
-            st.metric(st.session_state.selected_layer, formatted_value)
-        
-        # For All Districts, add distribution pie chart
-        if selected_state != "National Average" and selected_district == "All Districts" and "NAME_2" in df.columns:
-            create_suitability_chart(df, selected_state, selected_category, "state")
-        
-        # For National Average, show distribution across states
-        elif selected_state == "National Average" and "NAME_1" in df.columns:
-            create_suitability_chart(df, selected_state, selected_category, "national")
+        # For All Districts, add distribution pie chart; for National
+        # Average, show distribution across states
+        level = get_chart_level(selected_state, selected_district)
+        if level is not None:
+            create_suitability_chart(data, selected_state, selected_category, level)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def create_suitability_chart(df, selected_state, selected_category, level="state"):
+@timed()
+def display_sensitivity_table(sensitivity, selected_state, selected_district):
     """
-    Create a pie chart showing distribution of suitability levels.
+    Display the class probabilities of the sensitivity analysis.
     
-    This function creates a pie chart showing the distribution of suitability
-    levels for the selected state or at the national level. It also displays
-    summary metrics.
+    Shows the districts of the selected state (or the selected district),
+    least stable first; at the national level all districts are listed.
     
     Args:
-        df (GeoDataFrame): The complete geodataframe
+        sensitivity (DataFrame): Result of modules.data.sensitivity.run_sensitivity
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+    
+    Returns:
+        None
+    """
+    table = sensitivity
+    if selected_state != "National Average":
+        table = table[table["NAME_1"].astype(str) == selected_state]
+        if selected_district != "All Districts":
+            table = table[table["NAME_2"].astype(str) == selected_district]
+    
+    table = table.sort_values(STABILITY_COLUMN).rename(columns={"NAME_1": "State", "NAME_2": "District"})
+    percent = {col: st.column_config.ProgressColumn(col, format="%.0f%%", min_value=0, max_value=100)
+               for col in CLASS_NAMES + [STABILITY_COLUMN]}
+    table[CLASS_NAMES + [STABILITY_COLUMN]] = table[CLASS_NAMES + [STABILITY_COLUMN]] * 100
+    
+    st.markdown("<h4>Class Probabilities</h4>", unsafe_allow_html=True)
+    st.dataframe(table, column_config=percent, hide_index=True, use_container_width=True)
+
+@timed()
+def display_change_summary(changes, selected_state, selected_district):
+    """
+    Display the class transitions between two dataset versions.
+    
+    Args:
+        changes (DataFrame): Result of modules.data.versions.compute_changes
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+    
+    Returns:
+        None
+    """
+    table = changes
+    if selected_state != "National Average":
+        table = table[table["NAME_1"] == selected_state]
+        if selected_district != "All Districts":
+            table = table[table["NAME_2"] == selected_district]
+    
+    st.markdown("<h4>Changes</h4>", unsafe_allow_html=True)
+    counts = table[CHANGE_COLUMN].value_counts()
+    metric_cols = st.columns(3)
+    metric_cols[0].metric("Improved", int(counts.get("Improved", 0) + counts.get("Improved (2+ classes)", 0)))
+    metric_cols[1].metric("Unchanged", int(counts.get("Unchanged", 0)))
+    metric_cols[2].metric("Declined", int(counts.get("Declined", 0)))
+    st.dataframe(transition_matrix(table), use_container_width=True)
+
+def display_layer_metric(filtered_df, aggregates=None, selected_state=None, selected_district=None):
+    """
+    Display the value of the selected layer for the current selection.
+    
+    For a state or the whole country, the value can be any statistic of
+    the aggregate table (see modules.data.aggregates); switching between
+    them is a lookup. For a district, its own value is shown.
+    
+    Args:
+        filtered_df (DataFrame): The filtered data based on selection
+        aggregates (DataFrame, optional): The aggregate table
+        selected_state (str, optional): The selected state or "National Average"
+        selected_district (str, optional): The selected district or "All Districts"
+    
+    Returns:
+        None
+    """
+    if filtered_df.empty or 'selected_layer' not in st.session_state:
+        return
+    
+    district_data = filtered_df.iloc[0]
+    layer_col = layer_column_mapping[st.session_state.selected_layer]
+    label = st.session_state.selected_layer
+    
+    if aggregates is not None and selected_district == "All Districts" and layer_col in aggregates.columns:
+        statistics = [stat for stat in STATISTIC_LABELS if stat in aggregates.index.get_level_values("statistic")]
+        statistic = st.selectbox("Statistic", statistics, format_func=STATISTIC_LABELS.get,
+                                 label_visibility="collapsed", key="aggregate_statistic")
+        layer_value = get_aggregate_value(aggregates, selected_state, statistic, layer_col)
+        label = f"{label} ({STATISTIC_LABELS[statistic].lower()})"
+    elif layer_col in district_data:
+        layer_value = district_data[layer_col]
+    else:
+        return
+    
+    # Format the numeric value to display nicely
+    if isinstance(layer_value, (int, float)):
+        formatted_value = f"{layer_value:.2f}"  # Format to 2 decimal places
+    else:
+        formatted_value = layer_value
+    
+    st.metric(label, formatted_value)
+
+def get_suitability_distribution(data, selected_state, selected_category, level="state"):
+    """
+    Count the suitability levels behind the distribution chart.
+    
+    Args:
+        data (Dataset): The processed dataset
         selected_state (str): The selected state or "National Average"
         selected_category (str): The selected category (Adaptation, Mitigation, etc.)
         level (str): The level of aggregation ("state" or "national")
-        
+    
     Returns:
-        None
+        tuple: (DataFrame with 'Suitability Level', 'Count' and 'Percentage'
+        columns or None if there is nothing to count, chart title,
+        list of (label, value) summary metrics)
     """
     if level == "state":
-        # Get all districts in the state (excluding the average row)
-        filtered_data = df[(df["NAME_1"].astype(str) == selected_state) & 
-                          (df["NAME_2"] != "All Districts")]
+        # Get all districts in the state
+        filtered_data = data.select(selected_state, "All Districts")
         title = f'Distribution of {selected_category} in {selected_state}'
     else:  # national level
-        # Get all state averages (excluding the national average)
-        filtered_data = df[(df["NAME_2"] == "All Districts") & 
-                          (df["NAME_1"] != "National Average")]
+        # Get all state averages
+        filtered_data = data.state_averages
         title = f'Distribution of {selected_category} Across States'
     
-    if not filtered_data.empty and selected_category in filtered_data.columns:
-        # Count occurrences of each suitability level
+    if filtered_data.empty or selected_category not in filtered_data.columns:
+        return None, title, []
+    
+    # Count occurrences of each suitability level, from the class matrix
+    # where the category is in it
+    codes = get_label_classes(filtered_data, selected_category)
+    if codes is not None:
+        counts = np.bincount(codes[codes >= 0], minlength=len(CLASS_LABELS))
+        order = [code for code in np.argsort(-counts, kind="stable") if counts[code] > 0]
+        suitability_counts = pd.DataFrame({'Suitability Level': [CLASS_LABELS[code] for code in order],
+                                           'Count': counts[order]})
+    else:
         suitability_counts = filtered_data[selected_category].value_counts().reset_index()
         suitability_counts.columns = ['Suitability Level', 'Count']
-        
-        # Calculate percentage
-        total = suitability_counts['Count'].sum()
-        suitability_counts['Percentage'] = (suitability_counts['Count'] / total * 100).round(2)
-        
-        # Create custom colors for the chart - using red, blue, green theme
-        color_map = {
-            'Very Highly Suitable': '#66CC66',  # Dark green
-            'Highly Suitable': '#99FF99',       # Light green
-            'Moderately Suitable': '#FFFF99',   # Yellow
-            'Less Suitable': '#CC0000'          # Red
-        }
-        
-        colors = [color_map.get(level, '#333333') for level in suitability_counts['Suitability Level']]
-        
-        # Create pie chart with optimized settings
-        fig = px.pie(
-            suitability_counts, 
-            values='Count', 
-            names='Suitability Level',
-            title=title,
-            color_discrete_sequence=colors
-        )
-        
-        fig.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            textfont=dict(size=14, color="white", family="Arial, sans-serif")
-        )
-        
-        fig.update_layout(
-            paper_bgcolor='white',
-            plot_bgcolor='white',
-            margin=dict(l=10, r=10, t=40, b=10),
-            title_font=dict(size=16, color='#1976d2', family="Arial, sans-serif")
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+    
+    # Calculate percentage
+    total = suitability_counts['Count'].sum()
+    suitability_counts['Percentage'] = (suitability_counts['Count'] / total * 100).round(2)
+    
+    # Summary metrics: the number of units and the share of highly suitable ones
+    unit = "Districts" if level == "state" else "States"
+    if codes is not None:
+        highly_suitable = int((codes == LABEL_CODES["Highly Suitable"]).sum())
+    else:
+        highly_suitable = int((filtered_data[selected_category] == "Highly Suitable").sum())
+    highly_suitable_pct = highly_suitable / len(filtered_data) * 100 if len(filtered_data) > 0 else 0
+    metrics = [
+        ("Total " + unit, len(filtered_data)),
+        ("Highly Suitable " + unit, f"{highly_suitable_pct:.1f}%")
+    ]
+    
+    return suitability_counts, title, metrics
+
+def build_pie_chart(suitability_counts, title):
+    """
+    Build the pie chart of a suitability distribution.
+    
+    Args:
+        suitability_counts (DataFrame): Counts from get_suitability_distribution
+        title (str): The chart title
+    
+    Returns:
+        plotly.graph_objects.Figure: The pie chart
+    """
+    colors = [SUITABILITY_COLOR_MAP.get(level, '#333333') for level in suitability_counts['Suitability Level']]
+    
+    # Create pie chart with optimized settings
+    fig = px.pie(
+        suitability_counts,
+        values='Count',
+        names='Suitability Level',
+        title=title,
+        color_discrete_sequence=colors
+    )
+    
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        textfont=dict(size=14, color="white", family="Arial, sans-serif")
+    )
+    
+    fig.update_layout(
+        paper_bgcolor='white',
+        plot_bgcolor='white',
+        margin=dict(l=10, r=10, t=40, b=10),
+        title_font=dict(size=16, color='#1976d2', family="Arial, sans-serif")
+    )
+    
+    return fig
+
+# Spec of an empty pie chart (layout, trace styling, fonts), built once
+_pie_template = None
+
+# Height st.plotly_chart gives a figure without a layout height
+PLOTLY_DEFAULT_HEIGHT = 450
+
+def get_pie_template():
+    """
+    Get the spec of the pie chart without data, building it on first use.
+    
+    The spec is a build_pie_chart figure without Plotly's default theme
+    template, which Streamlit replaces with its own theme in the browser
+    anyway; this keeps the JSON small (under 1 KB instead of 4 KB).
+    
+    Returns:
+        dict: The figure spec, to be copied before filling in data
+    """
+    global _pie_template
+    if _pie_template is None:
+        fig = build_pie_chart(pd.DataFrame({'Suitability Level': [], 'Count': []}), "")
+        fig.layout.template = None
+        _pie_template = json.loads(fig.to_json())
+    return _pie_template
+
+def build_pie_json(suitability_counts, title):
+    """
+    Serialize a pie chart filled into the template, without Plotly Express
+    or a Plotly figure object.
+    
+    Args:
+        suitability_counts (DataFrame): Counts from get_suitability_distribution
+        title (str): The chart title
+    
+    Returns:
+        str: The figure as Plotly JSON, as build_pie_chart draws it
+    """
+    spec = copy.deepcopy(get_pie_template())
+    levels = [str(level) for level in suitability_counts['Suitability Level']]
+    trace = spec['data'][0]
+    trace['labels'] = levels
+    trace['values'] = [int(count) for count in suitability_counts['Count']]
+    spec['layout']['piecolorway'] = [SUITABILITY_COLOR_MAP.get(level, '#333333') for level in levels]
+    spec['layout']['title']['text'] = title
+    return json.dumps(spec, separators=(',', ':'))
+
+def get_pie_chart_json(data, suitability_counts, title):
+    """
+    Get the figure JSON of a pie chart, through the disk cache.
+    
+    The key is the dataset fingerprint plus the counts and the title, so
+    a distribution that changes (e.g. with the Custom weights) gets its
+    own entry.
+    
+    Args:
+        data (Dataset): The processed dataset
+        suitability_counts (DataFrame): Counts from get_suitability_distribution
+        title (str): The chart title
+    
+    Returns:
+        str: The figure as Plotly JSON
+    """
+    counts = tuple(zip(suitability_counts['Suitability Level'], suitability_counts['Count']))
+    key = make_key("pie_chart", data.fingerprint, counts, title)
+    return get_or_compute("pie_chart", key, lambda: build_pie_json(suitability_counts, title))
+
+def build_pie_chart_entry(data, suitability_counts, title, metrics):
+    """
+    Build the memory cache entry of a pie chart.
+
+    Args:
+        data (Dataset): The processed dataset
+        suitability_counts (DataFrame): Result of get_suitability_distribution, or None
+        title (str): Chart title
+        metrics (dict): Metrics of the view
+
+    Returns:
+        dict: "json" and "metrics"
+    """
+    record_cache_miss()
+    return {
+        "json": get_pie_chart_json(data, suitability_counts, title) if suitability_counts is not None else None,
+        "metrics": metrics
+    }
+
+# Pie charts per view, oldest first
+PIE_CHART_CACHE_SIZE = 256
+_pie_charts = BoundedCache(PIE_CHART_CACHE_SIZE)
+
+def get_pie_chart(data, selected_state, selected_category, level="state"):
+    """
+    Get the figure JSON and metrics of a pie chart, through a memory cache.
+    
+    Entries of the shipped categories are keyed on the dataset fingerprint
+    and the view, since their labels are fixed per dataset: a hit skips
+    counting and the JSON lookup. The labels of other categories (e.g. the
+    Custom suitability) change with the weights, so their entries are
+    keyed on the counts as well. On a miss the JSON comes from the disk
+    cache (get_pie_chart_json).
+    
+    Args:
+        data (Dataset): The processed dataset
+        selected_state (str): The selected state or "National Average"
+        selected_category (str): The selected category (Adaptation, Mitigation, etc.)
+        level (str): The level of aggregation ("state" or "national")
+    
+    Returns:
+        dict: "json" (the figure as Plotly JSON, None if there is nothing
+        to count) and "metrics"
+    """
+    key = (data.fingerprint, selected_state, selected_category, level)
+    if selected_category in CATEGORIES:
+        cached = _pie_charts.get(key)
+        if cached is not None:
+            return cached
+    
+    suitability_counts, title, metrics = get_suitability_distribution(data, selected_state, selected_category, level)
+    if selected_category not in CATEGORIES:
+        counts = () if suitability_counts is None else tuple(zip(suitability_counts['Suitability Level'],
+                                                                 suitability_counts['Count']))
+        key += (counts,)
+    return _pie_charts.get_or_build(key, lambda: build_pie_chart_entry(data, suitability_counts, title, metrics))
+
+# Whether the Streamlit internals of show_plotly_json are usable, checked once
+_sends_json = None
+
+def can_send_plotly_json():
+    """
+    Check that the Streamlit internals show_plotly_json relies on exist
+    and take the arguments it passes.
+    
+    Returns:
+        bool: True if serialized figures can be sent as they are
+    """
+    global _sends_json
+    if _sends_json is None:
+        try:
+            register = set(inspect.signature(compute_and_register_element_id).parameters)
+            enqueue = set(inspect.signature(DeltaGenerator._enqueue).parameters)
+            fields = set(PlotlyChartProto.DESCRIPTOR.fields_by_name)
+            _sends_json = ({"user_key", "dg", "key_as_main_identity"} <= register
+                           and "layout_config" in enqueue
+                           and {"spec", "config", "theme", "form_id", "id"} <= fields)
+        except (NameError, AttributeError, TypeError, ValueError):
+            _sends_json = False
+    return _sends_json
+
+def show_plotly_json(spec):
+    """
+    Send a serialized Plotly figure to the browser as it is.
+    
+    This is what st.plotly_chart sends for a static chart (full width,
+    Streamlit theme, no selections), minus the step st.plotly_chart cannot
+    skip: validating its argument into a figure and serializing it again,
+    which is most of its time for a cached spec. Without the internals
+    this needs (can_send_plotly_json), the figure goes through
+    st.plotly_chart.
+    
+    Args:
+        spec (str): The figure as Plotly JSON
+    
+    Returns:
+        None
+    """
+    if not can_send_plotly_json():
+        st.plotly_chart(json.loads(spec), width="stretch")
+        return
+    
+    dg = get_dg_singleton_instance().main_dg
+    proto = PlotlyChartProto()
+    proto.theme = "streamlit"
+    proto.form_id = current_form_id(dg)
+    proto.spec = spec
+    proto.config = json.dumps({})
+    proto.id = compute_and_register_element_id(
+        "plotly_chart", user_key=None, key_as_main_identity=False, dg=dg,
+        plotly_spec=proto.spec, plotly_config=proto.config, is_selection_activated=False,
+        theme="streamlit", width="stretch", height="content", alt=None
+    )
+    dg._enqueue("plotly_chart", proto, layout_config=LayoutConfig(width="stretch", height=PLOTLY_DEFAULT_HEIGHT))
+
+def create_suitability_chart(data, selected_state, selected_category, level="state"):
+    """
+    Create a pie chart showing distribution of suitability levels.
+    
+    This function creates a pie chart showing the distribution of suitability
+    levels for the selected state or at the national level. It also displays
+    summary metrics.
+    
+    Args:
+        data (Dataset): The processed dataset
+        selected_state (str): The selected state or "National Average"
+        selected_category (str): The selected category (Adaptation, Mitigation, etc.)
+        level (str): The level of aggregation ("state" or "national")
+    
+    Returns:
+        None
+    """
+    with stage("create_pie_chart", cached=True):
+        chart = get_pie_chart(data, selected_state, selected_category, level)
+    
+    if chart["json"] is not None:
+        with stage("show_plotly_json") as span:
+            span.add_bytes(len(chart["json"]))
+            show_plotly_json(chart["json"])
         
         # Display summary metrics
-        st.metric("Total " + ("Districts" if level == "state" else "States"), len(filtered_data))
-        
-        # Calculate the percentage of highly suitable areas
-        highly_suitable = filtered_data[filtered_data[selected_category] == "Highly Suitable"]
-        highly_suitable_pct = len(highly_suitable) / len(filtered_data) * 100 if len(filtered_data) > 0 else 0
-        st.metric("Highly Suitable " + ("Districts" if level == "state" else "States"), f"{highly_suitable_pct:.1f}%")
\ No newline at end of file
+        for label, value in chart["metrics"]:
+            st.metric(label, value)
@@ -0,0 +1,236 @@
+# modules/visualization/encoding.py
+
+"""
+Map output encoding for the Solar Suitability Dashboard.
+
+Maps are encoded once, at a format and resolution chosen per kind of
+view, and the encoded bytes are what the disk cache stores and the
+browser receives:
+
+- matplotlib maps are quantized to a palette PNG of at most 256 colors
+  (flat class fills, black edges and text need few), less than half the
+  size of a full-color PNG;
+- comparison grids are encoded the same way at a lower resolution, since
+  every panel is a thumbnail;
+- raster-engine maps (the national view) are palette images already and
+  are written as lossless WebP, about a third smaller than the PNG.
+
+SOLAR_DASHBOARD_MAP_FORMAT=png keeps every map a PNG, and matplotlib maps
+in full color.
+
+Images are never wider than MAX_IMAGE_WIDTH: st.image decodes, resizes
+and re-encodes anything wider, and anything that is not PNG, JPEG or GIF.
+PNG maps are handed to st.image with output_format="PNG", which gives the
+bytes to Streamlit's media file manager as they are. WebP maps are
+written under static/maps (served by Streamlit's static file serving,
+server.enableStaticServing) and st.image gets their URL; without static
+serving, raster maps stay PNG. Either way the browser loads a map by URL,
+so it is neither re-encoded nor inlined in the page on a rerun. Figures
+come from the object-oriented API (no pyplot), so they can be encoded on
+any thread. Every encode is recorded as an "encode_map" stage with its
+size, so the performance panel shows the encode time and payload of each
+view, and logged with its format, size and time.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import time
+
+import streamlit as st
+from PIL import Image
+
+from modules.utils.constants import MAP_FORMAT
+from modules.utils.profiling import stage
+
+logger = logging.getLogger(__name__)
+
+# Widest image st.image sends without resizing (and so re-encoding) it
+MAX_IMAGE_WIDTH = 1460
+
+# Encoding settings per kind of output; dpi is lowered to fit MAX_IMAGE_WIDTH,
+# and figures with "colors" are quantized to a palette of that many colors
+OUTPUT_PROFILES = {
+    "map": {"format": "png", "dpi": 150, "colors": 256},
+    "thumbnail": {"format": "png", "dpi": 100, "colors": 256},
+    "raster": {"format": "webp"}
+}
+
+# Directory of the WebP maps served by URL (static/ next to app.py, which
+# Streamlit serves under /app/static when server.enableStaticServing is
+# set), and the number of maps kept there, least recently shown dropped first
+STATIC_MAP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                              "static", "maps")
+STATIC_MAP_URL = "/app/static/maps"
+STATIC_MAP_LIMIT = 256
+
+# Pillow settings of the final PNG, and of the intermediate one of a
+# quantized figure (decoded right away, so not worth compressing)
+PNG_SETTINGS = {"compress_level": 6}
+RAW_PNG_SETTINGS = {"compress_level": 0}
+
+# Pillow settings of WebP maps
+WEBP_SETTINGS = {"lossless": True, "method": 4}
+
+def get_output_profile(kind):
+    """
+    Get the encoding settings of a map.
+
+    Args:
+        kind (str): "map", "thumbnail" or "raster"
+
+    Returns:
+        dict: "format" and, for figures, "dpi" and (unless
+        SOLAR_DASHBOARD_MAP_FORMAT is "png") "colors"
+    """
+    profile = dict(OUTPUT_PROFILES[kind])
+    if MAP_FORMAT == "png":
+        profile.pop("colors", None)
+    if profile["format"] == "webp" and (MAP_FORMAT == "png" or not st.get_option("server.enableStaticServing")):
+        profile["format"] = "png"
+    return profile
+
+def _log_encode(kind, data, started):
+    """
+    Log the format, size and encode time of a map.
+
+    Args:
+        kind (str): "figure" or "image"
+        data (bytes): The encoded map
+        started (float): time.perf_counter() at the start of the encode
+
+    Returns:
+        None
+    """
+    logger.info("Encoded %s map as %s: %d bytes in %.1f ms", kind, get_image_format(data), len(data),
+                (time.perf_counter() - started) * 1000)
+
+def encode_figure(fig, profile):
+    """
+    Encode a matplotlib figure as PNG.
+
+    Args:
+        fig (matplotlib.figure.Figure): The figure, built without pyplot
+        profile (dict): Settings from get_output_profile
+
+    Returns:
+        bytes: The encoded image
+    """
+    started = time.perf_counter()
+    with stage("encode_map") as span:
+        dpi = min(profile["dpi"], MAX_IMAGE_WIDTH / fig.get_figwidth())
+        buffer = io.BytesIO()
+        colors = profile.get("colors")
+        fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight",
+                    pil_kwargs=RAW_PNG_SETTINGS if colors else PNG_SETTINGS)
+        if colors:
+            image = Image.open(buffer).convert("RGB").quantize(colors, method=Image.Quantize.MEDIANCUT)
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG", **PNG_SETTINGS)
+        data = buffer.getvalue()
+        span.add_bytes(len(data))
+    _log_encode("figure", data, started)
+    return data
+
+def encode_image(image, profile):
+    """
+    Encode a Pillow image (the raster engine's palette images).
+
+    Args:
+        image (PIL.Image.Image): The image
+        profile (dict): Settings from get_output_profile("raster")
+
+    Returns:
+        bytes: The encoded image
+    """
+    started = time.perf_counter()
+    with stage("encode_map") as span:
+        buffer = io.BytesIO()
+        settings = WEBP_SETTINGS if profile["format"] == "webp" else PNG_SETTINGS
+        image.save(buffer, format=profile["format"].upper(), **settings)
+        data = buffer.getvalue()
+        span.add_bytes(len(data))
+    _log_encode("image", data, started)
+    return data
+
+def get_image_format(data):
+    """
+    Recognize the format of encoded map bytes.
+
+    Args:
+        data (bytes): Output of encode_figure or encode_image
+
+    Returns:
+        str: "webp" or "png"
+    """
+    return "webp" if data[:4] == b"RIFF" and data[8:12] == b"WEBP" else "png"
+
+def publish_static_map(data):
+    """
+    Write a WebP map under STATIC_MAP_DIR, named by its content hash.
+
+    A map that is already there is only touched, so the directory keeps
+    the STATIC_MAP_LIMIT most recently shown maps.
+
+    Args:
+        data (bytes): The encoded map
+
+    Returns:
+        str: URL of the map
+    """
+    name = hashlib.sha1(data).hexdigest() + ".webp"
+    path = os.path.join(STATIC_MAP_DIR, name)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        os.makedirs(STATIC_MAP_DIR, exist_ok=True)
+        # Write under a temporary name so the server never sends a partial file
+        tmp_path = f"{path}.{os.getpid()}.{os.urandom(4).hex()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        _trim_static_maps()
+    return f"{STATIC_MAP_URL}/{name}"
+
+def _trim_static_maps():
+    """
+    Remove the least recently shown maps beyond STATIC_MAP_LIMIT.
+
+    Returns:
+        None
+    """
+    entries = []
+    with os.scandir(STATIC_MAP_DIR) as it:
+        for entry in it:
+            if entry.name.endswith(".webp"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - STATIC_MAP_LIMIT)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def show_map_image(data):
+    """
+    Send an encoded map to the browser as is.
+
+    A PNG is within MAX_IMAGE_WIDTH and PNG is the requested output
+    format, so st.image neither resizes nor re-encodes it: the bytes are
+    served by URL from Streamlit's media file manager. A WebP map is
+    served by URL from STATIC_MAP_DIR, which st.image passes through.
+
+    Args:
+        data (bytes): Output of encode_figure or encode_image
+
+    Returns:
+        None
+    """
+    if get_image_format(data) == "webp":
+        st.image(publish_static_map(data), width="stretch")
+    else:
+        st.image(data, output_format="PNG", width="stretch")
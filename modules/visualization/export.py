@@ -0,0 +1,310 @@
+# modules/visualization/export.py
+
+"""
+Report export module for the Solar Suitability Dashboard.
+
+This module generates a report pack per state without the UI: the
+suitability distribution (the pie chart and metrics of the statistics
+panel) for every category, and the state map for every category and
+every layer. Each pack is written to its own directory as one PDF plus
+a PNG per page and a CSV with the district values.
+
+States are exported in parallel by a process pool. Every worker receives
+the loaded dataset once, when it starts, with the geometry of the district
+table in the compact integer encoding of modules.data.geometry, and reuses the shared view paths
+of modules.visualization.maps for all pages of a state. Pages are written
+and closed one at a time, so memory does not grow with the size of a pack.
+
+Run from the project root with:
+
+    python -m modules.visualization.export [--states <name> ...] [--workers N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+from modules.data.loader import read_dataset
+from modules.data.dataset import Dataset
+from modules.data.classes import CLASS_LABELS, get_class_matrix, get_layer_classes
+from modules.data.geometry import encode_dataset, decode_dataset
+from modules.data.processor import filter_data_with_shapefile
+from modules.data.pipeline import peak_memory_mb
+from modules.utils.constants import layer_column_mapping
+from modules.visualization.maps import CATEGORICAL_COLUMNS, create_comparison_map, select_map_data
+from modules.visualization.charts import (
+    SUITABILITY_COLOR_MAP, get_statistics_metrics, get_suitability_distribution
+)
+
+DEFAULT_OUTPUT_DIR = "exports"
+DEFAULT_CATEGORY = "Mitigation"
+EXPORT_DPI = 150
+
+# Dataset of a worker process, set once by _init_worker
+_dataset = None
+
+def _init_worker(payload):
+    """
+    Keep the dataset in the worker process for all its tasks.
+
+    Args:
+        payload (tuple): The district table, from encode_dataset, and the averages table
+
+    Returns:
+        None
+    """
+    global _dataset
+    districts, averages = payload
+    _dataset = Dataset(decode_dataset(districts), averages)
+    get_class_matrix(_dataset.districts)
+
+def get_export_states(data, states=None):
+    """
+    Get the states to export, in alphabetical order.
+
+    Args:
+        data (Dataset): The processed dataset
+        states (list, optional): Requested state names (default: all states)
+
+    Returns:
+        list: State names
+
+    Raises:
+        ValueError: If a requested state is not in the data
+    """
+    available = sorted(data.state_averages.index)
+    if not states:
+        return available
+
+    unknown = [s for s in states if s not in available]
+    if unknown:
+        raise ValueError(f"Unknown state(s): {', '.join(unknown)}")
+    return [s for s in available if s in states]
+
+def safe_filename(name):
+    """
+    Turn a state or layer name into a portable file name.
+
+    Args:
+        name (str): The name to convert
+
+    Returns:
+        str: The name with anything but letters, digits, dots and dashes replaced by underscores
+    """
+    return re.sub(r"[^A-Za-z0-9.-]+", "_", name).strip("_")
+
+def create_summary_page(data, state):
+    """
+    Create the summary page of a state: metrics and pie chart per category.
+
+    The numbers come from the same functions as the statistics panel
+    (get_statistics_metrics and get_suitability_distribution).
+
+    Args:
+        data (Dataset): The processed dataset
+        state (str): The state to summarize
+
+    Returns:
+        matplotlib.figure.Figure: The summary figure
+    """
+    state_row = filter_data_with_shapefile(data, state, "All Districts")
+
+    fig, axes = plt.subplots(2, 2, figsize=(11, 11))
+    fig.suptitle(f"{state} - Solar Suitability Summary", fontsize=16, color="#1976d2")
+
+    for ax, category in zip(axes.flat, CATEGORICAL_COLUMNS):
+        counts, title, metrics = get_suitability_distribution(data, state, category, "state")
+        metrics = get_statistics_metrics(state_row, state, "All Districts", category)[1:] + metrics
+
+        if counts is None or counts['Count'].sum() == 0:
+            ax.text(0.5, 0.5, "No data", ha="center", va="center")
+        else:
+            colors = [SUITABILITY_COLOR_MAP.get(level, '#333333') for level in counts['Suitability Level']]
+            ax.pie(counts['Count'], labels=counts['Suitability Level'], colors=colors,
+                   autopct='%1.1f%%', textprops={'fontsize': 8})
+        ax.set_title(title, fontsize=11, color="#1976d2")
+        ax.text(0.5, -0.08, "\n".join(f"{label}: {value}" for label, value in metrics),
+                transform=ax.transAxes, ha="center", va="top", fontsize=9)
+
+    fig.tight_layout(rect=(0, 0.03, 1, 0.96))
+    return fig
+
+def get_district_table(gdf, state, category=DEFAULT_CATEGORY):
+    """
+    Get the category classes, layer values and layer classes of every district of a state.
+
+    Args:
+        gdf (GeoDataFrame): The district table
+        state (str): The state to tabulate
+        category (str): Category whose breaks classify the layers
+
+    Returns:
+        DataFrame: One row per district, columns named as in the dashboard
+    """
+    districts = select_map_data(gdf, state, "All Districts")
+    columns = {"NAME_2": "District"}
+    columns.update({col: col for col in CATEGORICAL_COLUMNS if col in districts.columns})
+    columns.update({col: layer for layer, col in layer_column_mapping.items() if col in districts.columns})
+    table = districts[list(columns)].rename(columns=columns)
+
+    # Layer classes, read from the class matrix (code 0: no value)
+    names = np.array([None] + CLASS_LABELS[1:], dtype=object)
+    for layer, col in layer_column_mapping.items():
+        codes = get_layer_classes(districts, col, category)
+        if codes is not None:
+            table[f"{layer} ({category} class)"] = names[codes.to_numpy()]
+    return table.sort_values("District")
+
+def save_page(fig, pdf, png_path):
+    """
+    Write a figure to the PDF and to a PNG, then release it.
+
+    Args:
+        fig (matplotlib.figure.Figure): The page to write
+        pdf (PdfPages): The open report PDF
+        png_path (str): Path of the PNG copy
+
+    Returns:
+        None
+    """
+    pdf.savefig(fig)
+    fig.savefig(png_path, dpi=EXPORT_DPI)
+    plt.close(fig)
+
+def export_state(state, output_dir, category=DEFAULT_CATEGORY):
+    """
+    Write the report pack of one state.
+
+    This function runs inside a worker process, on the dataset passed to
+    the worker when it started. The pack is written to a temporary
+    directory that replaces the previous pack only once it is complete.
+
+    Args:
+        state (str): The state to export
+        output_dir (str): Directory holding one subdirectory per state
+        category (str): Category whose thresholds classify the numeric layers
+
+    Returns:
+        dict: State name, number of pages and seconds spent
+    """
+    started = time.perf_counter()
+    data = _dataset
+    gdf = data.districts
+
+    pack_dir = os.path.join(output_dir, safe_filename(state))
+    work_dir = pack_dir + ".tmp"
+    os.makedirs(work_dir, exist_ok=True)
+
+    pages = 0
+    with PdfPages(os.path.join(work_dir, f"{safe_filename(state)}.pdf")) as pdf:
+        save_page(create_summary_page(data, state), pdf, os.path.join(work_dir, "00_summary.png"))
+        pages += 1
+
+        # All categories side by side on one page
+        panels = [(col, col, col) for col in CATEGORICAL_COLUMNS]
+        fig = create_comparison_map(gdf, state, "All Districts", panels, ncols=2)
+        save_page(fig, pdf, os.path.join(work_dir, "01_categories.png"))
+        pages += 1
+
+        # One page per layer; the view paths are shared by all of them
+        for index, (layer, vis_column) in enumerate(layer_column_mapping.items(), start=2):
+            title = f"{state} - {layer} ({category})"
+            fig = create_comparison_map(gdf, state, "All Districts", [(vis_column, category, title)])
+            save_page(fig, pdf, os.path.join(work_dir, f"{index:02d}_{safe_filename(layer)}.png"))
+            pages += 1
+
+    get_district_table(gdf, state, category).to_csv(os.path.join(work_dir, "districts.csv"), index=False)
+
+    if os.path.exists(pack_dir):
+        for name in os.listdir(pack_dir):
+            os.remove(os.path.join(pack_dir, name))
+        os.rmdir(pack_dir)
+    os.replace(work_dir, pack_dir)
+
+    return {"state": state, "pages": pages, "seconds": round(time.perf_counter() - started, 2)}
+
+def run_export(states=None, output_dir=DEFAULT_OUTPUT_DIR, category=DEFAULT_CATEGORY,
+               workers=None, dataset_path=None, progress=print):
+    """
+    Export the report packs of the given states in parallel.
+
+    Args:
+        states (list, optional): States to export (default: all states)
+        output_dir (str): Directory holding one subdirectory per state
+        category (str): Category whose thresholds classify the numeric layers
+        workers (int, optional): Number of worker processes (default: CPU count)
+        dataset_path (str, optional): Shapefile to read (default: the dashboard's)
+        progress (callable): Function receiving progress messages
+
+    Returns:
+        dict: Run summary with the exported states, wall time and peak memory
+    """
+    started = time.perf_counter()
+    data = read_dataset(dataset_path)
+    states = get_export_states(data, states)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(states)))
+    progress(f"Exporting {len(states)} states with {workers} workers to {output_dir}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=((encode_dataset(data.districts), data.averages),)) as executor:
+        futures = {executor.submit(export_state, state, output_dir, category): state for state in states}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                raise RuntimeError(f"Export of {futures[future]} failed: {e}") from e
+            results.append(result)
+            progress(f"[{len(results)}/{len(states)}] {result['state']}: "
+                     f"{result['pages']} pages in {result['seconds']:.1f}s")
+
+    elapsed = time.perf_counter() - started
+    parent_mb, worker_mb = peak_memory_mb()
+    progress(f"Exported {len(results)} state packs in {elapsed:.1f}s")
+
+    return {
+        "states": sorted(r["state"] for r in results),
+        "pages": sum(r["pages"] for r in results),
+        "seconds": round(elapsed, 2),
+        "peak_memory_mb": parent_mb,
+        "peak_worker_memory_mb": worker_mb
+    }
+
+def main(argv=None):
+    """
+    Command-line entry point for the report export.
+
+    Args:
+        argv (list, optional): Command-line arguments (default: sys.argv)
+
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Export per-state report packs of the dashboard.")
+    parser.add_argument("--states", nargs="+", default=None, help="States to export (default: all)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Output directory")
+    parser.add_argument("--category", default=DEFAULT_CATEGORY, choices=CATEGORICAL_COLUMNS,
+                        help="Category whose thresholds classify the layer maps")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--input", default=None, help="Shapefile to read (default: the dashboard's)")
+    args = parser.parse_args(argv)
+
+    try:
+        run_export(args.states, args.output, args.category, args.workers, args.input)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
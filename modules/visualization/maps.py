@@ -4,15 +4,166 @@
 Maps visualization module for the Solar Suitability Dashboard.
 
 This module contains functions for creating and styling maps
-based on the geodata and user selections.
+based on the geodata and user selections. The selection and
+classification helpers are shared with the raster renderer in
+modules.visualization.raster so that both engines color and
+label districts identically.
+
+Figures are built with the object-oriented API (Figure and an Agg
+canvas) rather than pyplot, whose global figure manager is not
+thread-safe: maps are also rendered by the warm-up and prefetch threads
+of modules.utils while sessions render their own.
 """
 
-import matplotlib.pyplot as plt
-from matplotlib.colors import ListedColormap
+import math
+import numpy as np
+import pandas as pd
+import shapely
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import ListedColormap, to_rgba_array
+from matplotlib.collections import PathCollection
+from matplotlib.path import Path
 from matplotlib.patches import Patch
-import streamlit as st
+from modules.data.loader import get_geometry_fingerprint
+from modules.data.dataset import select_districts
+from modules.data.classes import get_layer_classes, get_label_classes, get_breaks, get_legend_labels, classify_values
+from modules.data.mcda import MCDA_COLUMN
+from modules.data.sensitivity import STABILITY_COLUMN
+from modules.data.spatial import HOTSPOT_COLUMN, HOTSPOT_CODES
+from modules.data.versions import CHANGE_COLUMN, CHANGE_CODES
+from modules.utils.constants import inverted_categories
+from modules.utils.disk_cache import get_or_compute, make_key, hash_array
+from modules.utils.memory_cache import BoundedCache
+from modules.visualization.encoding import encode_figure, get_output_profile
+
+# Categorical suitability columns
+CATEGORICAL_COLUMNS = ["Adaptation", "Mitigation", "Replacment", "General_SI"]
+
+# Numeric class codes used for plotting (0 means no class)
+CLASS_CODES = {
+    "Very Highly Suitable": 4,
+    "Highly Suitable": 3,
+    "Moderately Suitable": 2,
+    "Less Suitable": 1,
+    "Mixed": 0,
+    "Unknown": 0
+}
+
+# Colors indexed by class code: gray, red, yellow, light green, dark green
+CLASS_COLORS = ['#CCCCCC', '#CC0000', '#FFFF99', '#99FF99', '#66CC66']
+
+def select_map_data(_gdf, selected_state, selected_district):
+    """
+    Select the district rows drawn for the current view.
+    
+    The rows are taken by position (modules.data.dataset.select_districts),
+    and the national view is the district table itself, so callers must
+    not modify the result in place.
+    
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        
+    Returns:
+        GeoDataFrame: The districts to draw
+    """
+    return select_districts(_gdf, selected_state, selected_district)
+
+def classify_map_values(map_data, vis_column, selected_category):
+    """
+    Classify the visualized column into suitability class codes.
+    
+    Categorical columns (including the re-weighted Custom suitability
+    from modules.data.mcda) are mapped through their labels, and the
+    stability, hotspot and change layers of modules.data.sensitivity,
+    modules.data.spatial and modules.data.versions through their own
+    classes. Numeric layers use the fixed breaks of the layer registry
+    instead of relative data ranges, so the coloring is consistent
+    regardless of the selected view; the scale is inverted for Adaptation.
+    The classes of the category labels and numeric layers are read from
+    the class matrix of modules.data.classes when it has been built.
+    
+    Args:
+        map_data (GeoDataFrame): The districts to draw
+        vis_column (str): The column to visualize
+        selected_category (str): The selected category (Adaptation, Mitigation, etc.)
+        
+    Returns:
+        tuple: (Series of class codes 0-4, list of (label, color) legend entries)
+    """
+    if vis_column in CATEGORICAL_COLUMNS or vis_column == MCDA_COLUMN:
+        codes = get_label_classes(map_data, vis_column)
+        if codes is None:
+            codes = map_data[vis_column].map(CLASS_CODES).fillna(0)
+        codes = codes.clip(lower=0).astype(int)
+        legend = [
+            ('Very Highly Suitable', CLASS_COLORS[4]),
+            ('Highly Suitable', CLASS_COLORS[3]),
+            ('Moderately Suitable', CLASS_COLORS[2]),
+            ('Less Suitable', CLASS_COLORS[1])
+        ]
+        return codes, legend
+    
+    if vis_column == HOTSPOT_COLUMN:
+        # Cluster classes from modules.data.spatial
+        codes = map_data[vis_column].map(HOTSPOT_CODES).fillna(0).astype(int)
+        legend = [(label, CLASS_COLORS[code]) for label, code in HOTSPOT_CODES.items()]
+        return codes, legend
+    
+    if vis_column == CHANGE_COLUMN:
+        # Class transitions between two dataset versions
+        codes = map_data[vis_column].map(CHANGE_CODES).fillna(0).astype(int)
+        legend = [(label, CLASS_COLORS[code]) for label, code in CHANGE_CODES.items() if code > 0]
+        return codes, legend
+    
+    if vis_column == STABILITY_COLUMN:
+        # Probability (%) of the most likely Custom class, from the
+        # sensitivity analysis
+        values = map_data[vis_column]
+        codes = pd.Series(0, index=values.index, dtype=int)
+        codes[values < 50] = 1
+        codes[(values >= 50) & (values < 70)] = 2
+        codes[(values >= 70) & (values < 90)] = 3
+        codes[values >= 90] = 4
+        legend = [
+            ('Stable (>=90%)', CLASS_COLORS[4]),
+            ('Mostly stable (70-90%)', CLASS_COLORS[3]),
+            ('Uncertain (50-70%)', CLASS_COLORS[2]),
+            ('Unstable (<50%)', CLASS_COLORS[1])
+        ]
+        return codes, legend
+    
+    # Numeric layers: classes from the class matrix, breaks from the layer registry
+    codes = get_layer_classes(map_data, vis_column, selected_category)
+    if codes is None:
+        # Views of a dataset whose matrix is not built are classified here
+        values = pd.to_numeric(map_data[vis_column], errors="coerce")
+        codes = pd.Series(classify_values(values, get_breaks(vis_column, selected_category),
+                                          selected_category in inverted_categories), index=map_data.index)
+    labels = get_legend_labels(vis_column, selected_category)
+    legend = [(label, CLASS_COLORS[code]) for label, code in zip(labels, [4, 3, 2, 1])]
+    
+    return codes.astype(int), legend
 
-def create_simple_map(_gdf, selected_state, selected_district, vis_column, selected_category=None):
+def get_map_title(selected_state, selected_district, vis_column):
+    """
+    Build the map title for the current view.
+    
+    Args:
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column to visualize
+        
+    Returns:
+        str: The map title
+    """
+    if selected_district == "All Districts":
+        return f"{selected_state} - {vis_column}"
+    return f"{selected_state} - {selected_district} - {vis_column}"
+
+def create_simple_map(_gdf, selected_state, selected_district, vis_column, selected_category=None, classified=None):
     """
     Create a simplified map using matplotlib with custom legend based on category.
     
@@ -21,197 +172,199 @@ def create_simple_map(_gdf, selected_state, selected_district, vis_column, selec
     appropriate legends and styling.
     
     Args:
-        _gdf (GeoDataFrame): The geodataframe containing all data
+        _gdf (GeoDataFrame): The district table
         selected_state (str): The selected state or "National Average"
         selected_district (str): The selected district or "All Districts" 
         vis_column (str): The column to visualize
         selected_category (str, optional): The selected category (Adaptation, Mitigation, etc.)
+        classified (tuple, optional): (codes, legend) of the view from classify_map_values,
+            when the caller has already classified it
         
     Returns:
         matplotlib.figure.Figure: The created map figure
     """
-    try:
-        # If selected_category is not provided, try to determine it from vis_column
-        if selected_category is None:
-            if vis_column in ["Adaptation", "Mitigation", "Replacment"]:
-                selected_category = vis_column
-            else:
-                selected_category = "Mitigation"  # Default if we can't determine
-        
-        # Filter data
-        if selected_state == "National Average":
-            map_data = _gdf[(_gdf["NAME_2"] != "All Districts") & (_gdf["NAME_1"] != "National Average")]
-        elif selected_district == "All Districts":
-            map_data = _gdf[(_gdf["NAME_1"].astype(str) == selected_state) & (_gdf["NAME_2"] != "All Districts")]
+    # If selected_category is not provided, try to determine it from vis_column
+    if selected_category is None:
+        if vis_column in ["Adaptation", "Mitigation", "Replacment"]:
+            selected_category = vis_column
         else:
-            map_data = _gdf[(_gdf["NAME_1"].astype(str) == selected_state) & (_gdf["NAME_2"].astype(str) == selected_district)]
+            selected_category = "Mitigation"  # Default if we can't determine
+    
+    # Filter data
+    map_data = select_map_data(_gdf, selected_state, selected_district)
+    
+    # Create plot
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    
+    if vis_column in map_data.columns:
+        # Classify into codes 0-4 and color through a fixed colormap,
+        # with vmin=0 and vmax=4 to ensure consistent coloring
+        map_data = map_data.copy(deep=False)  # Add the codes without copying the data
+        if classified is None:
+            classified = classify_map_values(map_data, vis_column, selected_category)
+        map_data['value_numeric'], legend = classified
         
-        # Create plot
-        fig, ax = plt.subplots(1, 1, figsize=(10, 8))
+        # Plot with the custom colormap - ADD BLACK BOUNDARIES
+        map_data.plot(column='value_numeric', cmap=ListedColormap(CLASS_COLORS), ax=ax, legend=False,
+                      edgecolor='black', linewidth=0.5, vmin=0, vmax=4)
         
-        # Check if we're dealing with a categorical column
-        is_categorical = (vis_column in ["Adaptation", "Mitigation", "Replacment", "General_SI"])
+        # Add a custom legend
+        legend_elements = [Patch(facecolor=color, label=label) for label, color in legend]
+        ax.legend(handles=legend_elements, loc='lower right')
+    else:
+        # If column doesn't exist, show outline only
+        map_data.plot(ax=ax, color='lightgrey', edgecolor='black', linewidth=0.5)
+        ax.set_title(f"Column '{vis_column}' not found in data")
+    
+    # Set title
+    ax.set_title(get_map_title(selected_state, selected_district, vis_column))
         
-        if is_categorical:
-            # For categorical data, we use the predefined categories
-            category_mapping = {
-                "Very Highly Suitable": 4,
-                "Highly Suitable": 3,
-                "Moderately Suitable": 2,
-                "Less Suitable": 1,
-                "Mixed": 0
-            }
-            
-            # Custom colors based on your legend image
-            custom_colors = {
-                "Very Highly Suitable": '#66CC66',  # Dark green
-                "Highly Suitable": '#99FF99',       # Light green
-                "Moderately Suitable": '#FFFF99',   # Yellow
-                "Less Suitable": '#CC0000',         # Red
-                "Mixed": '#CCCCCC'                  # Gray
-            }
-            
-            # Create a numeric column based on the categorical values
-            if vis_column in map_data.columns:
-                map_data['value_numeric'] = map_data[vis_column].map(category_mapping).fillna(0)
-                
-                # Create a custom colormap
-                cmap = ListedColormap([
-                    custom_colors["Less Suitable"],
-                    custom_colors["Moderately Suitable"], 
-                    custom_colors["Highly Suitable"],
-                    custom_colors["Very Highly Suitable"]
-                ])
-                
-                # Plot with custom colormap - ADD BLACK BOUNDARIES
-                map_data.plot(column='value_numeric', cmap=cmap, ax=ax, legend=False, 
-                              edgecolor='black', linewidth=0.5)  # Add black boundaries
-                
-                # Add a custom legend
-                legend_elements = [
-                    Patch(facecolor=custom_colors["Very Highly Suitable"], label='Very Highly Suitable'),
-                    Patch(facecolor=custom_colors["Highly Suitable"], label='Highly Suitable'),
-                    Patch(facecolor=custom_colors["Moderately Suitable"], label='Moderately Suitable'),
-                    Patch(facecolor=custom_colors["Less Suitable"], label='Less Suitable')
-                ]
-                
-                ax.legend(handles=legend_elements, loc='lower right')
-            else:
-                # If column doesn't exist, show outline only
-                map_data.plot(ax=ax, color='lightgrey', edgecolor='black', linewidth=0.5)
-                ax.set_title(f"Column '{vis_column}' not found in data")
-        else:
-            # For numeric data like GW Development Stage, use custom color mapping based on category
-            if vis_column in map_data.columns:
-                # First, create a new column with the classification
-                map_data = map_data.copy()  # Create a copy to avoid SettingWithCopyWarning
-                map_data['classification'] = 'Unknown'
-                
-                # CRITICAL FIX: Use fixed value boundaries instead of relative data ranges
-                # This ensures consistent coloring regardless of the selected view
-                
-                if selected_category == "Adaptation":
-                    # Inverted scale for adaptation
-                    # Very Highly Suitable: <50%
-                    # Highly Suitable: 50-70%
-                    # Moderately Suitable: 70-100%
-                    # Less Suitable: >100%
-                    map_data.loc[map_data[vis_column] > 100, 'classification'] = 'Less Suitable'
-                    map_data.loc[(map_data[vis_column] <= 100) & (map_data[vis_column] > 70), 'classification'] = 'Moderately Suitable'
-                    map_data.loc[(map_data[vis_column] <= 70) & (map_data[vis_column] > 50), 'classification'] = 'Highly Suitable'
-                    map_data.loc[map_data[vis_column] <= 50, 'classification'] = 'Very Highly Suitable'
-                else:
-                    # Standard scale for mitigation and replacement
-                    # Very Highly Suitable: >100%
-                    # Highly Suitable: 70-100%
-                    # Moderately Suitable: 50-70%
-                    # Less Suitable: <50%
-                    map_data.loc[map_data[vis_column] < 50, 'classification'] = 'Less Suitable'
-                    map_data.loc[(map_data[vis_column] >= 50) & (map_data[vis_column] < 70), 'classification'] = 'Moderately Suitable'
-                    map_data.loc[(map_data[vis_column] >= 70) & (map_data[vis_column] <= 100), 'classification'] = 'Highly Suitable'
-                    map_data.loc[map_data[vis_column] > 100, 'classification'] = 'Very Highly Suitable'
-                
-                # Map classification to numeric values for plotting
-                category_mapping = {
-                    "Very Highly Suitable": 4,
-                    "Highly Suitable": 3,
-                    "Moderately Suitable": 2,
-                    "Less Suitable": 1,
-                    "Unknown": 0
-                }
-                
-                # Create numeric values for colors
-                map_data['value_numeric'] = map_data['classification'].map(category_mapping)
-                
-                # Custom colors based on your legend image
-                colors = {
-                    "Very Highly Suitable": '#66CC66',  # Dark green
-                    "Highly Suitable": '#99FF99',       # Light green
-                    "Moderately Suitable": '#FFFF99',   # Yellow
-                    "Less Suitable": '#CC0000',         # Red
-                    "Unknown": '#CCCCCC'                # Gray
-                }
-                
-                # Create a custom colormap
-                cmap = ListedColormap([
-                    colors["Less Suitable"],
-                    colors["Moderately Suitable"], 
-                    colors["Highly Suitable"],
-                    colors["Very Highly Suitable"]
-                ])
-                
-                # Plot with the custom colormap - ADD BLACK BOUNDARIES
-                # Use vmin=1 and vmax=4 to ensure consistent coloring
-                map_data.plot(column='value_numeric', cmap=cmap, ax=ax, legend=False,
-                              edgecolor='black', linewidth=0.5, vmin=1, vmax=4)
-                
-                # Add a custom legend with percentage ranges
-                if selected_category == "Adaptation":
-                    # Inverted legend for adaptation
-                    legend_elements = [
-                        Patch(facecolor=colors["Very Highly Suitable"], label='Very Highly Suitable (<50%)'),
-                        Patch(facecolor=colors["Highly Suitable"], label='Highly Suitable (50-70%)'),
-                        Patch(facecolor=colors["Moderately Suitable"], label='Moderately Suitable (70-100%)'),
-                        Patch(facecolor=colors["Less Suitable"], label='Less Suitable (>100%)')
-                    ]
-                else:
-                    # Standard legend for mitigation and replacement
-                    legend_elements = [
-                        Patch(facecolor=colors["Very Highly Suitable"], label='Very Highly Suitable (>100%)'),
-                        Patch(facecolor=colors["Highly Suitable"], label='Highly Suitable (70-100%)'),
-                        Patch(facecolor=colors["Moderately Suitable"], label='Moderately Suitable (50-70%)'),
-                        Patch(facecolor=colors["Less Suitable"], label='Less Suitable (<50%)')
-                    ]
-                
-                ax.legend(handles=legend_elements, loc='lower right')
-            else:
-                # If column doesn't exist, show outline only
-                map_data.plot(ax=ax, color='lightgrey', edgecolor='black', linewidth=0.5)
-                ax.set_title(f"Column '{vis_column}' not found in data")
+    # Remove axes
+    ax.set_axis_off()
+    
+    # Add district labels for state view (validated data has no empty geometries)
+    if selected_state != "National Average" and selected_district == "All Districts":
+        centroids = shapely.get_coordinates(shapely.centroid(map_data.geometry.values))
+        for (x, y), name in zip(centroids, map_data['NAME_2']):
+            ax.text(x, y, name, fontsize=8, ha='center', va='center')
+    
+    return fig
+
+def render_simple_map(_gdf, selected_state, selected_district, vis_column, selected_category=None):
+    """
+    Render create_simple_map as encoded image bytes, through the disk cache.
+    
+    The figure is encoded once, as a palette PNG (see
+    modules.visualization.encoding), and released right away. The cache key
+    holds the class code of every district rather than the column name, so
+    a re-weighted or re-analyzed layer never reuses a stale image.
+    
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column to visualize
+        selected_category (str, optional): The selected category (Adaptation, Mitigation, etc.)
         
-        # Set title
-        if selected_district == "All Districts":
-            ax.set_title(f"{selected_state} - {vis_column}")
-        else:
-            ax.set_title(f"{selected_state} - {selected_district} - {vis_column}")
-            
-        # Remove axes
-        ax.set_axis_off()
+    Returns:
+        bytes: The encoded map, for show_map_image
+    """
+    if selected_category is None:
+        selected_category = vis_column if vis_column in ["Adaptation", "Mitigation", "Replacment"] else "Mitigation"
+    
+    map_data = select_map_data(_gdf, selected_state, selected_district)
+    classified = codes = None
+    if vis_column in map_data.columns:
+        classified = classify_map_values(map_data, vis_column, selected_category)
+        codes = hash_array(classified[0])
+    profile = get_output_profile("map")
+    
+    def render():
+        # Classified once above, for the cache key and the drawing
+        fig = create_simple_map(_gdf, selected_state, selected_district, vis_column, selected_category, classified)
+        return encode_figure(fig, profile)
+    
+    key = make_key("vector_map", get_geometry_fingerprint(_gdf), selected_state, selected_district,
+                   vis_column, selected_category, codes, sorted(profile.items()))
+    return get_or_compute("vector_map", key, render)
+
+def build_view_paths(geometries):
+    """
+    Convert polygons to matplotlib paths, one compound path per district.
+    
+    Exterior rings and holes of every part go into the same path, so each
+    district is a single entry of a PathCollection and even-odd filling
+    leaves the holes empty.
+    
+    Args:
+        geometries (array-like): Shapely polygons of the view, in draw order
         
-        # Add district labels for state view
-        if selected_state != "National Average" and selected_district == "All Districts":
-            for idx, row in map_data.iterrows():
-                if 'geometry' in row and row['geometry'] and hasattr(row['geometry'], 'centroid'):
-                    x, y = row['geometry'].centroid.x, row['geometry'].centroid.y
-                    if 'NAME_2' in row and row['NAME_2'] != "All Districts":
-                        ax.text(x, y, row['NAME_2'], fontsize=8, ha='center', va='center')
+    Returns:
+        tuple: (list of matplotlib Paths, extent as (minx, miny, maxx, maxy))
+    """
+    paths = []
+    for geometry in geometries:
+        rings = [] if geometry is None else shapely.get_rings(shapely.get_parts(geometry))
+        if len(rings) == 0:
+            paths.append(Path(np.zeros((1, 2))))
+            continue
+        paths.append(Path.make_compound_path(*[Path(np.asarray(ring.coords), closed=True) for ring in rings]))
+    
+    return paths, tuple(shapely.total_bounds(np.asarray(geometries, dtype=object)))
+
+# Path data per (geometry fingerprint, state, district), oldest first
+VIEW_PATHS_CACHE_SIZE = 64
+_view_paths = BoundedCache(VIEW_PATHS_CACHE_SIZE)
+
+def get_view_paths(_gdf, selected_state, selected_district):
+    """
+    Get the shared path data of a view, building it on first use.
+    
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        
+    Returns:
+        tuple: (list of matplotlib Paths, extent)
+    """
+    key = (get_geometry_fingerprint(_gdf), selected_state, selected_district)
+    return _view_paths.get_or_build(
+        key, lambda: build_view_paths(select_map_data(_gdf, selected_state, selected_district).geometry.values))
+
+def create_comparison_map(_gdf, selected_state, selected_district, panels, ncols=3):
+    """
+    Create a grid of maps of the same view, one per layer or category.
+    
+    The path data of the view is built once and shared by every panel;
+    each panel only gets its own face colors. This makes N panels much
+    cheaper than N calls to create_simple_map.
+    
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        panels (list): List of (vis_column, selected_category, title) tuples
+        ncols (int): Maximum number of panels per row
         
-        return fig
-    except Exception as e:
-        st.error(f"Error creating simple map: {str(e)}")
-        # Create empty figure with error message
-        fig, ax = plt.subplots(1, 1, figsize=(10, 8))
-        ax.text(0.5, 0.5, f"Error creating map: {str(e)}", 
-                horizontalalignment='center', verticalalignment='center')
+    Returns:
+        matplotlib.figure.Figure: The created comparison figure
+    """
+    map_data = select_map_data(_gdf, selected_state, selected_district)
+    paths, (minx, miny, maxx, maxy) = get_view_paths(_gdf, selected_state, selected_district)
+    class_rgba = to_rgba_array(CLASS_COLORS)
+    
+    ncols = max(1, min(ncols, len(panels)))
+    nrows = math.ceil(len(panels) / ncols)
+    fig = Figure(figsize=(5 * ncols, 4.5 * nrows))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(nrows, ncols, squeeze=False)
+    
+    for ax, (vis_column, category, title) in zip(axes.flat, panels):
+        if vis_column in map_data.columns:
+            codes, legend = classify_map_values(map_data, vis_column, category)
+            facecolors = class_rgba[np.asarray(codes)]
+        else:
+            legend = []
+            facecolors = 'lightgrey'
+            title = f"Column '{vis_column}' not found in data"
+        
+        ax.add_collection(PathCollection(paths, facecolors=facecolors, edgecolors='black', linewidths=0.3))
+        ax.set_xlim(minx, maxx)
+        ax.set_ylim(miny, maxy)
+        # Same latitude correction geopandas applies to geographic data
+        ax.set_aspect(1 / math.cos(math.radians((miny + maxy) / 2)))
+        ax.set_title(title, fontsize=10)
         ax.set_axis_off()
-        return fig
\ No newline at end of file
+        if legend:
+            ax.legend(handles=[Patch(facecolor=color, label=label) for label, color in legend],
+                      loc='lower right', fontsize=6)
+    
+    # Hide unused cells of the last row
+    for ax in axes.flat[len(panels):]:
+        ax.set_axis_off()
+    
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,387 @@
+# modules/visualization/raster.py
+
+"""
+Raster map renderer for the Solar Suitability Dashboard.
+
+This module is an alternative to the vector renderer in maps.py for
+repainting the same view with a different layer or category. The district
+polygons of a view are rasterized once into an integer label grid (the
+index of the district covering each pixel, 0 for background) plus a
+boundary mask. A render is then a palette lookup, colors[label_grid],
+followed by image encoding, with no vector drawing at all.
+
+Label grids and finished images are stored in the disk cache
+(modules.utils.disk_cache), so they survive restarts and share its size
+cap. Grids are keyed by the geometry fingerprint, the view and the
+resolution; images by the view and the class code of every district, so
+a repeated render is a single file read.
+Classification and legends come from maps.py, so both renderers color
+districts the same.
+"""
+
+import io
+import math
+from functools import lru_cache
+
+import numpy as np
+import shapely
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgb
+from matplotlib.patches import Patch
+from PIL import Image
+
+from modules.data.loader import get_geometry_fingerprint
+from modules.utils.disk_cache import get_or_compute, make_key, hash_array
+from modules.utils.memory_cache import BoundedCache
+from modules.visualization.encoding import MAX_IMAGE_WIDTH, encode_image, get_output_profile
+from modules.visualization.maps import (select_map_data, classify_map_values,
+                                        get_map_title, CLASS_COLORS)
+
+# Width of the label grid in pixels; the height follows the view's aspect
+RASTER_WIDTH = 1400
+
+BACKGROUND_RGB = (255, 255, 255)
+BOUNDARY_RGB = (0, 0, 0)
+
+def build_label_grid(geometries, width=RASTER_WIDTH):
+    """
+    Rasterize polygons into a label grid and a boundary mask.
+
+    Pixels are sampled at their centers. Each polygon only tests the pixels
+    inside its own bounding box, so the cost grows with the covered area
+    rather than with the number of polygons times the grid size. As with
+    the vector maps of geographic coordinates, the y axis is stretched by
+    1/cos(latitude) at the center of the view.
+
+    Args:
+        geometries (array-like): Shapely polygons of the view, in draw order
+        width (int): Width of the grid in pixels
+
+    Returns:
+        tuple: (label grid of int16 with 0 for background and i + 1 for
+        polygon i, boolean boundary mask, extent as (minx, miny, maxx, maxy))
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    minx, miny, maxx, maxy = shapely.total_bounds(geometries)
+
+    # Pad by one percent so outlines are not cut at the image edge
+    pad = max(maxx - minx, maxy - miny) * 0.01
+    minx, miny, maxx, maxy = minx - pad, miny - pad, maxx + pad, maxy + pad
+
+    aspect = 1 / math.cos(math.radians((miny + maxy) / 2))
+    height = max(1, int(round(width * (maxy - miny) / (maxx - minx) * aspect)))
+    dx = (maxx - minx) / width
+    dy = (maxy - miny) / height
+
+    labels = np.zeros((height, width), dtype=np.int16)
+    shapely.prepare(geometries)
+
+    for i, (gminx, gminy, gmaxx, gmaxy) in enumerate(shapely.bounds(geometries)):
+        if np.isnan(gminx):
+            continue
+
+        # Pixel window covering the polygon's bounding box (row 0 is the top)
+        col0 = max(0, int((gminx - minx) / dx))
+        col1 = min(width, int(math.ceil((gmaxx - minx) / dx)) + 1)
+        row0 = max(0, int((maxy - gmaxy) / dy))
+        row1 = min(height, int(math.ceil((maxy - gminy) / dy)) + 1)
+
+        xs = minx + (np.arange(col0, col1) + 0.5) * dx
+        ys = maxy - (np.arange(row0, row1) + 0.5) * dy
+        inside = shapely.contains_xy(geometries[i], xs[np.newaxis, :], ys[:, np.newaxis])
+        labels[row0:row1, col0:col1][inside] = i + 1
+
+    # A pixel is on a boundary when its right or lower neighbour differs
+    boundary = np.zeros(labels.shape, dtype=bool)
+    horizontal = labels[:, 1:] != labels[:, :-1]
+    vertical = labels[1:, :] != labels[:-1, :]
+    boundary[:, :-1] |= horizontal
+    boundary[:-1, :] |= vertical
+
+    return labels, boundary, (minx, miny, maxx, maxy)
+
+def _pack_label_grid(labels, boundary, extent):
+    """
+    Compress a label grid for the disk cache.
+
+    Args:
+        labels (numpy.ndarray): Label grid
+        boundary (numpy.ndarray): Boundary mask
+        extent (tuple): (minx, miny, maxx, maxy)
+
+    Returns:
+        bytes: The arrays as a compressed .npz file
+    """
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, labels=labels, boundary=boundary, extent=np.array(extent))
+    return buffer.getvalue()
+
+def _unpack_label_grid(data):
+    """
+    Read a label grid packed by _pack_label_grid.
+
+    Args:
+        data (bytes): The compressed .npz file
+
+    Returns:
+        tuple: (label grid, boundary mask)
+    """
+    with np.load(io.BytesIO(data)) as arrays:
+        return arrays["labels"], arrays["boundary"]
+
+# Unpacked label grids per disk cache key, oldest first
+LABEL_GRID_CACHE_SIZE = 16
+_label_grids = BoundedCache(LABEL_GRID_CACHE_SIZE)
+
+def get_label_grid(_gdf, selected_state, selected_district, width=RASTER_WIDTH):
+    """
+    Get the label grid of a view, building and storing it on first use.
+
+    Grids are stored compressed in the disk cache, so they count against
+    its size cap and are evicted with its other entries; recent grids are
+    also kept unpacked in memory.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        width (int): Width of the grid in pixels
+
+    Returns:
+        tuple: (label grid, boundary mask)
+    """
+    def build():
+        map_data = select_map_data(_gdf, selected_state, selected_district)
+        return _pack_label_grid(*build_label_grid(map_data.geometry.values, width))
+
+    key = make_key("label_grid", get_geometry_fingerprint(_gdf), selected_state, selected_district, width)
+    return _label_grids.get_or_build(key, lambda: _unpack_label_grid(get_or_compute("label_grid", key, build)))
+
+def _build_palette():
+    """
+    Build the fixed 256-color palette of raster maps.
+
+    Indexes 0-4 are the class colors (by class code), then come the
+    background and boundary colors, and the rest is a gray ramp used for
+    the anti-aliased text of titles and legends. With a fixed palette a
+    map is a single byte per pixel, which keeps both the lookup and the
+    encoding cheap.
+
+    Returns:
+        numpy.ndarray: Palette of shape (256, 3), uint8
+    """
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    palette[:len(CLASS_COLORS)] = [[round(c * 255) for c in to_rgb(color)] for color in CLASS_COLORS]
+    palette[BACKGROUND_INDEX] = BACKGROUND_RGB
+    palette[BOUNDARY_INDEX] = BOUNDARY_RGB
+    ramp = np.linspace(0, 255, 256 - GRAY_START).round().astype(np.uint8)
+    palette[GRAY_START:] = ramp[:, np.newaxis]
+    return palette
+
+BACKGROUND_INDEX = len(CLASS_COLORS)
+BOUNDARY_INDEX = BACKGROUND_INDEX + 1
+GRAY_START = BOUNDARY_INDEX + 1
+PALETTE = _build_palette()
+
+def _quantize(rgb):
+    """
+    Map RGB pixels to the nearest color of the raster palette.
+
+    Only used for the legend and title images, which are cached, so the
+    search over unique colors is not on the render path.
+
+    Args:
+        rgb (numpy.ndarray): RGB image (uint8)
+
+    Returns:
+        numpy.ndarray: Palette indexes of the image (uint8)
+    """
+    colors, inverse = np.unique(rgb.reshape(-1, 3), axis=0, return_inverse=True)
+    distances = ((colors[:, np.newaxis, :].astype(int) - PALETTE[np.newaxis, :, :].astype(int)) ** 2).sum(axis=2)
+    return distances.argmin(axis=1).astype(np.uint8)[inverse.ravel()].reshape(rgb.shape[:2])
+
+@lru_cache(maxsize=64)
+def _legend_image(legend):
+    """
+    Render a legend box once with matplotlib and keep it as palette indexes.
+
+    Args:
+        legend (tuple): Tuple of (label, color) entries
+
+    Returns:
+        numpy.ndarray: Palette indexes of the legend image (uint8)
+    """
+    fig = Figure(figsize=(3.2, 0.3 + 0.28 * len(legend)), dpi=100)
+    FigureCanvasAgg(fig)
+    handles = [Patch(facecolor=color, label=label) for label, color in legend]
+    fig.legend(handles=handles, loc="center", fontsize=10)
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+
+    # Crop the figure margin around the legend box
+    rows = np.where(rgba[:, :, 3].max(axis=1) > 0)[0]
+    cols = np.where(rgba[:, :, 3].max(axis=0) > 0)[0]
+    rgba = rgba[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    # Flatten onto the white background before quantizing
+    alpha = rgba[:, :, 3:4] / 255.0
+    rgb = (rgba[:, :, :3] * alpha + 255 * (1 - alpha)).astype(np.uint8)
+    return _quantize(rgb)
+
+@lru_cache(maxsize=256)
+def _title_image(title, width):
+    """
+    Render a title strip once with matplotlib and keep it as palette indexes.
+
+    Args:
+        title (str): The map title
+        width (int): Width of the strip in pixels
+
+    Returns:
+        numpy.ndarray: Palette indexes of the title strip (uint8)
+    """
+    fig = Figure(figsize=(width / 100, 0.5), dpi=100, facecolor="white")
+    FigureCanvasAgg(fig)
+    fig.text(0.5, 0.5, title, ha="center", va="center", fontsize=14)
+    fig.canvas.draw()
+    return _quantize(np.asarray(fig.canvas.buffer_rgba())[:, :, :3])
+
+def compose_raster_map(labels, boundary, codes, legend, title=None):
+    """
+    Color a label grid and add the legend and title.
+
+    The colors of a render are a lookup table from district label to
+    palette index (background first, then each district's class code),
+    applied to the whole grid in one gather.
+
+    Args:
+        labels (numpy.ndarray): Label grid of the view
+        boundary (numpy.ndarray): Boundary mask of the view
+        codes (array-like): Class code (0-4) of each district, in draw order
+        legend (list): List of (label, color) legend entries
+        title (str, optional): Title drawn above the map
+
+    Returns:
+        numpy.ndarray: Palette indexes of the map image (uint8)
+    """
+    colors = np.empty(len(codes) + 1, dtype=np.uint8)
+    colors[0] = BACKGROUND_INDEX
+    colors[1:] = codes
+    image = colors[labels]
+    image[boundary] = BOUNDARY_INDEX
+
+    if legend:
+        # Paste the legend into the lower right corner, if it fits
+        legend_image = _legend_image(tuple(legend))
+        h, w = legend_image.shape
+        margin = 10
+        if image.shape[0] >= h + margin and image.shape[1] >= w + margin:
+            image[-h - margin:-margin, -w - margin:-margin] = legend_image
+
+    if title:
+        image = np.vstack([_title_image(title, image.shape[1]), image])
+
+    return image
+
+def encode_raster(image):
+    """
+    Encode a palette-indexed image with the raster output profile.
+
+    Args:
+        image (numpy.ndarray): Palette indexes (uint8)
+
+    Returns:
+        bytes: The encoded image (WebP, or PNG without static serving)
+    """
+    height, width = image.shape
+    picture = Image.frombytes("P", (width, height), np.ascontiguousarray(image).tobytes())
+    picture.putpalette(PALETTE.tobytes())
+    return encode_image(picture, get_output_profile("raster"))
+
+def create_raster_map(_gdf, selected_state, selected_district, vis_column, selected_category=None,
+                      width=RASTER_WIDTH):
+    """
+    Render a map as image bytes from the view's cached label grid.
+
+    This is the raster counterpart of create_simple_map: it selects and
+    classifies the districts the same way and draws the same legend, but
+    the drawing itself is a palette lookup. District name labels of the
+    state view are not drawn.
+
+    The image is looked up in the disk cache first. Its key holds the class
+    codes themselves rather than the column name, so re-weighted or
+    re-analyzed layers never reuse a stale image.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        vis_column (str): The column to visualize
+        selected_category (str, optional): The selected category (Adaptation, Mitigation, etc.)
+        width (int): Width of the map in pixels
+
+    Returns:
+        bytes: The encoded map (see encode_raster), for show_map_image
+    """
+    if selected_category is None:
+        selected_category = vis_column if vis_column in ["Adaptation", "Mitigation", "Replacment"] else "Mitigation"
+
+    map_data = select_map_data(_gdf, selected_state, selected_district)
+
+    if vis_column in map_data.columns:
+        codes, legend = classify_map_values(map_data, vis_column, selected_category)
+        title = get_map_title(selected_state, selected_district, vis_column)
+    else:
+        # If column doesn't exist, show outline only
+        codes, legend = np.zeros(len(map_data), dtype=int), None
+        title = f"Column '{vis_column}' not found in data"
+    codes = np.asarray(codes)
+
+    def render():
+        labels, boundary = get_label_grid(_gdf, selected_state, selected_district, width)
+        return encode_raster(compose_raster_map(labels, boundary, codes, legend, title))
+
+    key = make_key("raster_map", get_geometry_fingerprint(_gdf), selected_state, selected_district, width,
+                   hash_array(codes), legend and tuple(legend), title, get_output_profile("raster")["format"])
+    return get_or_compute("raster_map", key, render)
+
+def create_raster_comparison(_gdf, selected_state, selected_district, panels, ncols=3, width=None):
+    """
+    Render a grid of maps of the same view as one image.
+
+    The view's label grid is loaded once and every panel is only a
+    palette lookup, so N panels cost about one encode of the tiled image.
+
+    Args:
+        _gdf (GeoDataFrame): The district table
+        selected_state (str): The selected state or "National Average"
+        selected_district (str): The selected district or "All Districts"
+        panels (list): List of (vis_column, selected_category, title) tuples
+        ncols (int): Maximum number of panels per row
+        width (int, optional): Width of each panel in pixels (default: half
+            of RASTER_WIDTH, narrower if the grid would exceed MAX_IMAGE_WIDTH)
+
+    Returns:
+        bytes: The encoded grid (see encode_raster)
+    """
+    ncols = max(1, min(ncols, len(panels)))
+    width = width or min(RASTER_WIDTH // 2, MAX_IMAGE_WIDTH // ncols)
+    map_data = select_map_data(_gdf, selected_state, selected_district)
+    labels, boundary = get_label_grid(_gdf, selected_state, selected_district, width)
+
+    tiles = []
+    for vis_column, category, title in panels:
+        if vis_column in map_data.columns:
+            codes, legend = classify_map_values(map_data, vis_column, category)
+        else:
+            codes, legend = np.zeros(len(map_data), dtype=int), None
+            title = f"Column '{vis_column}' not found in data"
+        tiles.append(compose_raster_map(labels, boundary, np.asarray(codes), legend, title))
+
+    # Pad the last row with blank tiles and stitch the grid together
+    blank = np.full(tiles[0].shape, BACKGROUND_INDEX, dtype=np.uint8)
+    tiles += [blank] * (-len(tiles) % ncols)
+    rows = [np.hstack(tiles[i:i + ncols]) for i in range(0, len(tiles), ncols)]
+    return encode_raster(np.vstack(rows))
+
@@ -0,0 +1,592 @@
+# modules/visualization/tiles.py
+
+"""
+Vector tile module for the Solar Suitability Dashboard.
+
+Other web tools embed the suitability map with a slippy-map client
+(MapLibre, OpenLayers, Leaflet plugins), which only downloads the tiles
+in view at the detail of the current zoom. This module prepares those
+tiles once and serves them:
+
+- build_tiles cuts the district geometry and the key attributes (the
+  suitability categories and every layer_column_mapping column) into
+  Mapbox Vector Tiles (MVT 2.1) in Web Mercator over a zoom range. Each
+  zoom simplifies the boundaries to its pixel size first, and each tile
+  clips the districts it intersects in one vectorized call. The tiles are
+  written gzip-compressed to a single MBTiles (SQLite) archive;
+- serve_tiles is a small threaded HTTP server for the archive, with
+  ETag/Last-Modified validation (304 responses), Cache-Control and CORS
+  headers and a TileJSON document describing the layer.
+
+The MVT protobuf messages are written by the few functions below, so no
+tile library is needed. Run from the project root:
+
+    python -m modules.visualization.tiles build --max-zoom 10
+    python -m modules.visualization.tiles serve --port 8081
+
+and point a client at http://localhost:8081/tiles.json.
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from modules.utils.constants import layer_column_mapping
+
+DEFAULT_TILES_PATH = os.path.join("data", "tiles", "districts.mbtiles")
+
+LAYER_NAME = "districts"
+
+# Tile attributes besides the layer columns
+BASE_COLUMNS = ["NAME_1", "NAME_2", "Adaptation", "Mitigation", "Replacment", "General_SI"]
+
+DEFAULT_MIN_ZOOM = 3
+DEFAULT_MAX_ZOOM = 10
+
+# Tile coordinate resolution and the margin drawn around each tile, so
+# that strokes do not end at tile edges
+EXTENT = 4096
+BUFFER = 64
+
+# Half the width of the Web Mercator square, in meters
+MERCATOR_HALF = 20037508.342789244
+
+DEFAULT_PORT = 8081
+DEFAULT_MAX_AGE = 86400
+
+# MVT geometry types and commands
+GEOM_POLYGON = 3
+CMD_MOVE_TO = 1
+CMD_LINE_TO = 2
+CMD_CLOSE_PATH = 7
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+def _bytes_field(field, data):
+    return _key(field, 2) + _varint(len(data)) + data
+
+def _packed_field(field, values):
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+def encode_value(value):
+    """
+    Encode an attribute value as an MVT Value message.
+
+    Args:
+        value (str, bool, int or float): The attribute value
+
+    Returns:
+        bytes: The encoded message
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        return _key(6, 0) + _varint(_zigzag(int(value)))
+    if isinstance(value, (float, np.floating)):
+        return _key(3, 1) + struct.pack("<d", float(value))
+    return _bytes_field(1, str(value).encode("utf-8"))
+
+def encode_polygon_commands(rings):
+    """
+    Encode the rings of a (multi)polygon as MVT geometry commands.
+
+    Coordinates are rounded to the tile grid; rings that collapse to fewer
+    than three distinct points are dropped (with the holes of a dropped
+    exterior). Exterior rings are oriented to a positive area in tile
+    coordinates (y down) and holes to a negative one, as MVT requires.
+
+    Args:
+        rings (list): (coordinates array, is_exterior) per ring, in tile
+            coordinates, each ring closed (last point equals first)
+
+    Returns:
+        list: Command and parameter integers (empty if nothing is left)
+    """
+    commands = []
+    cursor = np.zeros(2, dtype=np.int64)
+    keep_holes = False
+    for coords, exterior in rings:
+        points = np.rint(coords[:-1]).astype(np.int64)
+        if len(points) > 1:
+            # Rounding merges near vertices
+            points = points[np.any(np.diff(points, axis=0, prepend=points[-1:]) != 0, axis=1)]
+        if len(points) < 3:
+            if exterior:
+                keep_holes = False
+            continue
+        if not exterior and not keep_holes:
+            continue
+
+        x, y = points[:, 0], points[:, 1]
+        area = np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y)
+        if area == 0:
+            if exterior:
+                keep_holes = False
+            continue
+        if (area > 0) != exterior:
+            points = points[::-1]
+        if exterior:
+            keep_holes = True
+
+        deltas = np.diff(points, axis=0, prepend=cursor[None, :])
+        cursor = points[-1]
+        zigzag = ((deltas << 1) ^ (deltas >> 63)).ravel().tolist()
+        commands.append(CMD_MOVE_TO | (1 << 3))
+        commands += zigzag[:2]
+        commands.append(CMD_LINE_TO | ((len(points) - 1) << 3))
+        commands += zigzag[2:]
+        commands.append(CMD_CLOSE_PATH | (1 << 3))
+    return commands
+
+def _polygon_rings(geometry):
+    rings = []
+    for polygon in shapely.get_parts(geometry):
+        if polygon.geom_type != "Polygon" or polygon.is_empty:
+            continue
+        rings.append((shapely.get_coordinates(polygon.exterior), True))
+        rings += [(shapely.get_coordinates(ring), False) for ring in polygon.interiors]
+    return rings
+
+def encode_tile(features, columns):
+    """
+    Encode one tile with a single layer of polygon features.
+
+    Args:
+        features (list): (feature id, geometry in tile coordinates, row of
+            attribute values) per feature
+        columns (list): Attribute names, in the order of the row values
+
+    Returns:
+        bytes: The MVT tile (uncompressed), or b"" if no feature has a
+        geometry left at this zoom
+    """
+    keys = {}
+    values = {}
+    encoded = []
+    for feature_id, geometry, row in features:
+        commands = encode_polygon_commands(_polygon_rings(geometry))
+        if not commands:
+            continue
+        tags = []
+        for column, value in zip(columns, row):
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            key = keys.setdefault(column, len(keys))
+            value_key = (type(value).__name__, value)
+            tags += [key, values.setdefault(value_key, len(values))]
+        encoded.append(_bytes_field(2, _key(1, 0) + _varint(feature_id) + _packed_field(2, tags) +
+                                    _key(3, 0) + _varint(GEOM_POLYGON) + _packed_field(4, commands)))
+    if not encoded:
+        return b""
+
+    layer = (_key(15, 0) + _varint(2) + _bytes_field(1, LAYER_NAME.encode("utf-8")) + b"".join(encoded) +
+             b"".join(_bytes_field(3, key.encode("utf-8")) for key in keys) +
+             b"".join(_bytes_field(4, encode_value(value)) for _, value in values) +
+             _key(5, 0) + _varint(EXTENT))
+    return _bytes_field(3, layer)
+
+def tile_bounds(z, x, y):
+    """
+    Get the Web Mercator bounds of an XYZ tile.
+
+    Args:
+        z (int): Zoom level
+        x (int): Column, from the west
+        y (int): Row, from the north
+
+    Returns:
+        tuple: (minx, miny, maxx, maxy) in meters
+    """
+    size = 2 * MERCATOR_HALF / (1 << z)
+    minx = -MERCATOR_HALF + x * size
+    maxy = MERCATOR_HALF - y * size
+    return minx, maxy - size, minx + size, maxy
+
+def tile_range(bounds, z):
+    """
+    Get the tiles of a zoom level covering Web Mercator bounds.
+
+    Args:
+        bounds (tuple): (minx, miny, maxx, maxy) in meters
+        z (int): Zoom level
+
+    Returns:
+        tuple: (range of columns, range of rows)
+    """
+    n = 1 << z
+    size = 2 * MERCATOR_HALF / n
+    clamp = lambda v: min(max(v, 0), n - 1)
+    x0 = clamp(int((bounds[0] + MERCATOR_HALF) // size))
+    x1 = clamp(int((bounds[2] + MERCATOR_HALF) // size))
+    y0 = clamp(int((MERCATOR_HALF - bounds[3]) // size))
+    y1 = clamp(int((MERCATOR_HALF - bounds[1]) // size))
+    return range(x0, x1 + 1), range(y0, y1 + 1)
+
+def get_tile_columns(gdf):
+    """
+    Get the attribute columns written to the tiles.
+
+    Args:
+        gdf (GeoDataFrame): The processed geodataframe
+
+    Returns:
+        list: BASE_COLUMNS and layer columns present in the dataset
+    """
+    columns = BASE_COLUMNS + [col for col in layer_column_mapping.values() if col not in BASE_COLUMNS]
+    return [col for col in columns if col in gdf.columns]
+
+def _attribute_rows(districts, columns):
+    """
+    Convert the tile attributes to plain Python values, once per build.
+    """
+    rows = []
+    table = {}
+    for col in columns:
+        values = districts[col]
+        if pd.api.types.is_numeric_dtype(values):
+            table[col] = values.astype(float).tolist()
+        else:
+            table[col] = [None if pd.isna(v) else str(v) for v in values]
+    for i in range(len(districts)):
+        rows.append(tuple(table[col][i] for col in columns))
+    return rows
+
+def _create_archive(path):
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+    return connection
+
+def build_tiles(gdf, output_path=DEFAULT_TILES_PATH, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM,
+                progress=print):
+    """
+    Cut the district layer into vector tiles and write an MBTiles archive.
+
+    Args:
+        gdf (GeoDataFrame): The district table
+        output_path (str): Path of the .mbtiles archive to write
+        min_zoom (int): Lowest zoom level
+        max_zoom (int): Highest zoom level; clients overzoom beyond it
+        progress (callable): Function receiving progress messages
+
+    Returns:
+        dict: Tile count, archive size in bytes and wall time per zoom level
+    """
+    start = time.perf_counter()
+    districts = gdf[~(shapely.is_missing(gdf.geometry.values) | gdf.geometry.is_empty)]
+    columns = get_tile_columns(districts)
+    rows = _attribute_rows(districts, columns)
+
+    geographic = districts.to_crs("EPSG:4326") if districts.crs is not None else districts
+    mercator = geographic.to_crs("EPSG:3857").geometry.values
+    tree = shapely.STRtree(mercator)
+    bounds = shapely.total_bounds(mercator)
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = _create_archive(tmp_path)
+
+    stats = {"zooms": {}, "tiles": 0}
+    for z in range(min_zoom, max_zoom + 1):
+        zoom_start = time.perf_counter()
+        tile_size = 2 * MERCATOR_HALF / (1 << z)
+        # One pixel of this zoom; finer detail cannot be drawn
+        simplified = shapely.simplify(mercator, tile_size / EXTENT, preserve_topology=True)
+        margin = tile_size * BUFFER / EXTENT
+
+        tiles = []
+        columns_range, rows_range = tile_range(bounds, z)
+        for x in columns_range:
+            for y in rows_range:
+                minx, miny, maxx, maxy = tile_bounds(z, x, y)
+                candidates = tree.query(shapely.box(minx - margin, miny - margin, maxx + margin, maxy + margin))
+                if len(candidates) == 0:
+                    continue
+                candidates.sort()
+                clipped = shapely.clip_by_rect(simplified[candidates], minx - margin, miny - margin,
+                                               maxx + margin, maxy + margin)
+                keep = ~shapely.is_empty(clipped)
+                if not keep.any():
+                    continue
+                scale = EXTENT / tile_size
+                local = shapely.transform(clipped[keep],
+                                          lambda c: np.column_stack([(c[:, 0] - minx) * scale, (maxy - c[:, 1]) * scale]))
+                features = [(int(i) + 1, geometry, rows[i]) for i, geometry in zip(candidates[keep], local)]
+                data = encode_tile(features, columns)
+                if data:
+                    # MBTiles rows count from the south (TMS)
+                    tiles.append((z, x, (1 << z) - 1 - y, gzip.compress(data, mtime=0)))
+
+        connection.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?)", tiles)
+        connection.commit()
+        elapsed = time.perf_counter() - zoom_start
+        size = sum(len(t[3]) for t in tiles)
+        stats["zooms"][z] = {"tiles": len(tiles), "bytes": size, "seconds": round(elapsed, 2)}
+        stats["tiles"] += len(tiles)
+        progress(f"Zoom {z}: {len(tiles)} tiles, {size / 1024:.0f} KB in {elapsed:.1f}s")
+
+    lon_lat = shapely.total_bounds(geographic.geometry.values)
+    fields = {col: "Number" if pd.api.types.is_numeric_dtype(districts[col]) else "String" for col in columns}
+    metadata = {
+        "name": "Solar Suitability Districts",
+        "format": "pbf",
+        "type": "overlay",
+        "version": "1",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": ",".join(f"{v:.5f}" for v in lon_lat),
+        "center": f"{(lon_lat[0] + lon_lat[2]) / 2:.5f},{(lon_lat[1] + lon_lat[3]) / 2:.5f},{min_zoom}",
+        "json": json.dumps({"vector_layers": [{"id": LAYER_NAME, "fields": fields,
+                                               "minzoom": min_zoom, "maxzoom": max_zoom}]})
+    }
+    connection.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+    connection.commit()
+    connection.close()
+    os.replace(tmp_path, output_path)
+
+    stats["bytes"] = os.path.getsize(output_path)
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    progress(f"Wrote {stats['tiles']} tiles ({stats['bytes'] / 1024:.0f} KB) to {output_path} "
+             f"in {stats['seconds']:.1f}s")
+    return stats
+
+class TileArchive:
+    """
+    Read access to an MBTiles archive, with one SQLite connection per thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        stat = os.stat(path)
+        self.last_modified = stat.st_mtime
+        # The archive is replaced as a whole, so its stamp versions every tile
+        self.stamp = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+        self.metadata = dict(self._connection().execute("SELECT name, value FROM metadata").fetchall())
+
+    def _connection(self):
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return self._local.connection
+
+    def get_tile(self, z, x, y):
+        """
+        Read a tile by its XYZ address.
+
+        Args:
+            z (int): Zoom level
+            x (int): Column, from the west
+            y (int): Row, from the north
+
+        Returns:
+            bytes: The gzip-compressed tile, or None if it holds no feature
+        """
+        row = self._connection().execute(
+            "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+            (z, x, (1 << z) - 1 - y)).fetchone()
+        return row[0] if row else None
+
+    def tilejson(self, base_url):
+        """
+        Describe the archive as a TileJSON 3.0 document.
+
+        Args:
+            base_url (str): URL of the server, e.g. "http://localhost:8081"
+
+        Returns:
+            dict: The TileJSON document
+        """
+        center = self.metadata["center"].split(",")
+        document = {
+            "tilejson": "3.0.0",
+            "name": self.metadata.get("name"),
+            "tiles": [f"{base_url}/{{z}}/{{x}}/{{y}}.pbf"],
+            "minzoom": int(self.metadata.get("minzoom", 0)),
+            "maxzoom": int(self.metadata.get("maxzoom", 22)),
+            "bounds": [float(v) for v in self.metadata["bounds"].split(",")],
+            "center": [float(center[0]), float(center[1]), int(center[2])]
+        }
+        document.update(json.loads(self.metadata.get("json", "{}")))
+        return document
+
+def make_handler(archive, max_age=DEFAULT_MAX_AGE):
+    """
+    Create the request handler class serving an archive.
+
+    Args:
+        archive (TileArchive): The tile archive
+        max_age (int): Seconds clients and proxies may reuse a response
+
+    Returns:
+        type: BaseHTTPRequestHandler subclass
+    """
+    last_modified = formatdate(archive.last_modified, usegmt=True)
+
+    class TileHandler(BaseHTTPRequestHandler):
+        server_version = "SolarTiles/1.0"
+
+        def do_HEAD(self):
+            self.do_GET(head=True)
+
+        def do_GET(self, head=False):
+            path = self.path.split("?", 1)[0].strip("/")
+            if path == "tiles.json":
+                host = self.headers.get("Host", f"localhost:{self.server.server_address[1]}")
+                body = json.dumps(archive.tilejson(f"http://{host}")).encode("utf-8")
+                etag = f'"{archive.stamp}-json"'
+                return self._respond(200, body, etag, {"Content-Type": "application/json"}, head)
+
+            parts = path.rsplit(".", 1)[0].split("/")
+            if len(parts) != 3 or not all(p.isdigit() for p in parts) or not path.endswith((".pbf", ".mvt")):
+                return self._respond(404, b"Not found", None, {"Content-Type": "text/plain"}, head)
+            z, x, y = map(int, parts)
+            if x >= (1 << z) or y >= (1 << z):
+                return self._respond(404, b"Not found", None, {"Content-Type": "text/plain"}, head)
+
+            data = archive.get_tile(z, x, y)
+            etag = f'"{archive.stamp}-{z}-{x}-{y}"'
+            if data is None:
+                # Empty tiles are cacheable too, so clients stop asking
+                return self._respond(204, b"", etag, {}, head)
+            headers = {"Content-Type": "application/vnd.mapbox-vector-tile"}
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                headers["Content-Encoding"] = "gzip"
+            else:
+                data = gzip.decompress(data)
+            self._respond(200, data, etag, headers, head)
+
+        def _not_modified(self, etag):
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                return etag is not None and etag in [t.strip() for t in if_none_match.split(",")]
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    return int(archive.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+                except (TypeError, ValueError):
+                    return False
+            return False
+
+        def _respond(self, status, body, etag, headers, head):
+            cacheable = status in (200, 204)
+            if cacheable and self._not_modified(etag):
+                status, body = 304, b""
+            self.send_response(status)
+            for name, value in headers.items():
+                if status != 304 or name != "Content-Type":
+                    self.send_header(name, value)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if cacheable:
+                self.send_header("Cache-Control", f"public, max-age={max_age}")
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.send_header("Vary", "Accept-Encoding")
+            if status not in (204, 304):
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head and status not in (204, 304):
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if self.server.verbose:
+                super().log_message(format, *args)
+
+    return TileHandler
+
+def serve_tiles(path=DEFAULT_TILES_PATH, host="127.0.0.1", port=DEFAULT_PORT, max_age=DEFAULT_MAX_AGE,
+                verbose=False):
+    """
+    Serve an MBTiles archive over HTTP until interrupted.
+
+    Args:
+        path (str): Path of the .mbtiles archive
+        host (str): Interface to listen on
+        port (int): Port to listen on
+        max_age (int): Cache-Control max-age of tile responses in seconds
+        verbose (bool): Log every request
+
+    Returns:
+        None
+    """
+    archive = TileArchive(path)
+    server = ThreadingHTTPServer((host, port), make_handler(archive, max_age))
+    server.verbose = verbose
+    print(f"Serving {path} at http://{host}:{server.server_address[1]}/tiles.json")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    """
+    Command-line entry point for building and serving vector tiles.
+
+    Args:
+        argv (list, optional): Command-line arguments (default: sys.argv)
+
+    Returns:
+        int: Process exit code
+    """
+    parser = argparse.ArgumentParser(description="Build and serve vector tiles of the district layer.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Cut the district layer into an MBTiles archive")
+    build.add_argument("--input", default=None, help="Shapefile to tile (default: the dashboard's shapefile)")
+    build.add_argument("--output", default=DEFAULT_TILES_PATH, help="MBTiles archive to write")
+    build.add_argument("--min-zoom", type=int, default=DEFAULT_MIN_ZOOM, help="Lowest zoom level")
+    build.add_argument("--max-zoom", type=int, default=DEFAULT_MAX_ZOOM, help="Highest zoom level")
+
+    serve = commands.add_parser("serve", help="Serve an MBTiles archive over HTTP")
+    serve.add_argument("--tiles", default=DEFAULT_TILES_PATH, help="MBTiles archive to serve")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+    serve.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE, help="Cache-Control max-age in seconds")
+    serve.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        if not 0 <= args.min_zoom <= args.max_zoom <= 22:
+            parser.error("zoom levels must satisfy 0 <= --min-zoom <= --max-zoom <= 22")
+        from modules.data.loader import read_dataset
+        build_tiles(read_dataset(args.input).districts, args.output, args.min_zoom, args.max_zoom)
+    else:
+        if not os.path.exists(args.tiles):
+            print(f"No tile archive at {args.tiles}; run the build command first", file=sys.stderr)
+            return 2
+        serve_tiles(args.tiles, args.host, args.port, args.max_age, args.verbose)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# tests/test_charts.py
+
+"""
+Tests for sending the cached pie chart JSON to the browser.
+"""
+
+import json
+
+from streamlit.testing.v1 import AppTest
+
+from modules.visualization import charts
+
+SPEC = json.dumps({"data": [{"type": "pie", "labels": ["A", "B"], "values": [1, 2]}], "layout": {}})
+
+def show_chart(spec):
+    from modules.visualization.charts import show_plotly_json
+    show_plotly_json(spec)
+
+def show_chart_without_internals(spec):
+    from modules.visualization import charts
+    charts._sends_json = False
+    try:
+        charts.show_plotly_json(spec)
+    finally:
+        charts._sends_json = None
+
+def run(script, spec):
+    at = AppTest.from_function(script, args=(spec,))
+    at.run()
+    assert not at.exception
+    return at.get("plotly_chart")
+
+def test_installed_streamlit_supports_sending_json():
+    assert charts.can_send_plotly_json()
+
+def test_json_is_sent_as_it_is():
+    (chart,) = run(show_chart, SPEC)
+    assert chart.proto.spec == SPEC
+    assert chart.proto.theme == "streamlit"
+
+def test_without_internals_the_chart_goes_through_plotly_chart():
+    (chart,) = run(show_chart_without_internals, SPEC)
+    spec = json.loads(chart.proto.spec)
+    assert spec["data"][0]["labels"] == ["A", "B"]
+    assert spec["data"][0]["values"] == [1, 2]
@@ -0,0 +1,71 @@
+# tests/test_classes.py
+
+"""
+Tests for the class boundaries of the layer classification and the layers
+offered for a dataset.
+"""
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from modules.data.classes import (
+    CATEGORIES, LAYERS, DEFAULT_BREAKS, build_class_matrix, classify_values, get_breaks, get_layer_options,
+    get_legend_labels
+)
+from modules.utils.constants import layer_registry
+
+VALUES = [49.9, 50, 69.9, 70, 100, 100.1, np.nan]
+
+def test_standard_scale_puts_the_first_two_breaks_in_the_upper_class():
+    # <50, 50-70, 70-100, >100
+    assert classify_values(VALUES, DEFAULT_BREAKS).tolist() == [1, 2, 2, 3, 3, 4, 0]
+
+def test_inverted_scale_mirrors_the_boundaries():
+    # <=50 is Very Highly Suitable (4), >100 Less Suitable (1)
+    assert classify_values(VALUES, DEFAULT_BREAKS, inverted=True).tolist() == [4, 4, 3, 3, 2, 1, 0]
+
+def test_codes_are_int8():
+    codes = classify_values(np.array([1.0, np.nan]), (0, 1, 2))
+    assert codes.dtype == np.int8
+
+def test_registry_breaks_ascend():
+    for layer, spec in layer_registry.items():
+        low, mid, high = get_breaks(spec["column"])
+        assert low < mid < high, layer
+
+def test_unknown_column_uses_the_default_breaks():
+    assert get_breaks("not a layer") == DEFAULT_BREAKS
+
+def test_empty_and_constant_layers_are_not_offered():
+    columns = {spec["column"]: [10.0, 60.0, 90.0] for spec in layer_registry.values()}
+    empty, constant = (layer_registry[layer]["column"] for layer in LAYERS[:2])
+    columns[empty] = [np.nan] * 3
+    columns[constant] = [5.0, 5.0, np.nan]
+    gdf = gpd.GeoDataFrame(dict(columns, NAME_1=["A"] * 3, NAME_2=["a", "b", "c"]),
+                           geometry=[box(i, 0, i + 1, 1) for i in range(3)])
+
+    assert get_layer_options(gdf) == LAYERS[2:]
+
+def test_category_breaks_override_the_default(monkeypatch):
+    layer = LAYERS[0]
+    spec = dict(layer_registry[layer], breaks={"default": (1, 2, 3), "Adaptation": (10, 20, 30)})
+    monkeypatch.setitem(layer_registry, layer, spec)
+
+    assert get_breaks(spec["column"], "Mitigation") == (1, 2, 3)
+    assert get_breaks(spec["column"], "Adaptation") == (10, 20, 30)
+    assert get_breaks(spec["column"]) == (1, 2, 3)
+
+    columns = {s["column"]: [0.5, 15.0, 25.0] for s in layer_registry.values()}
+    gdf = gpd.GeoDataFrame(dict(columns, NAME_1=["A"] * 3, NAME_2=["a", "b", "c"], Adaptation=["x"] * 3),
+                           geometry=[box(i, 0, i + 1, 1) for i in range(3)])
+    classes = build_class_matrix(gdf)["classes"][:, 0, :]
+    # Adaptation is inverted: <=10 is Very Highly Suitable
+    assert classes[:, CATEGORIES.index("Adaptation")].tolist() == [4, 3, 2]
+    assert classes[:, CATEGORIES.index("Mitigation")].tolist() == [1, 4, 4]
+
+def test_legend_labels_format_bare_units():
+    columns = {spec["units"]: spec["column"] for spec in layer_registry.values() if spec["units"]}
+    assert get_legend_labels(columns["%"], "Mitigation")[0].endswith("%)")
+    assert get_legend_labels(columns["ha"], "Mitigation")[-1] == "Less Suitable (<750 ha)"
+    assert all(not spec["units"] or spec["units"] == spec["units"].strip() for spec in layer_registry.values())
@@ -0,0 +1,54 @@
+# tests/test_disk_cache.py
+
+"""
+Tests for the least recently used eviction of the disk cache.
+"""
+
+import os
+
+import pytest
+
+from modules.utils import disk_cache
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(disk_cache.CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setenv(disk_cache.CACHE_SIZE_ENV, "1")
+    monkeypatch.setattr(disk_cache, "_size_estimate", None)
+    return tmp_path
+
+def put(name, last_used):
+    key = disk_cache.make_key("test", "fingerprint", name)
+    disk_cache.cache_put("test", key, name)
+    path = disk_cache._entry_path("test", key)
+    os.utime(path, (last_used, last_used))
+    return key
+
+def test_eviction_removes_the_least_recently_used_entries(cache_dir):
+    keys = {name: put(name, last_used) for name, last_used in [("a", 1000), ("b", 2000), ("c", 3000)]}
+    # Reading a refreshes it, so b is now the oldest
+    assert disk_cache.cache_get("test", keys["a"]) == "a"
+
+    # Three one-block entries against a cap of three blocks: trimming to
+    # 90% of the cap removes exactly one
+    assert disk_cache.evict(3 * disk_cache.BLOCK_SIZE) == 1
+    assert disk_cache.cache_get("test", keys["b"]) is None
+    assert disk_cache.cache_get("test", keys["a"]) == "a"
+    assert disk_cache.cache_get("test", keys["c"]) == "c"
+    assert disk_cache.get_cache_size() == 2 * disk_cache.BLOCK_SIZE
+
+def test_put_over_the_cap_evicts(cache_dir, monkeypatch):
+    monkeypatch.setenv(disk_cache.CACHE_SIZE_ENV, str(3 * disk_cache.BLOCK_SIZE / (1024 * 1024)))
+    first = put("first", 1000)
+    for i in range(3):
+        put(f"entry {i}", 2000 + i)
+
+    assert disk_cache.cache_get("test", first) is None
+    assert disk_cache.get_cache_size() <= 3 * disk_cache.BLOCK_SIZE * disk_cache.EVICTION_TARGET
+
+def test_size_zero_switches_the_cache_off(cache_dir, monkeypatch):
+    monkeypatch.setenv(disk_cache.CACHE_SIZE_ENV, "0")
+    key = disk_cache.make_key("test", "fingerprint", "off")
+    disk_cache.cache_put("test", key, "value")
+    assert disk_cache.cache_get("test", key) is None
+    assert disk_cache.get_cache_size() == 0
@@ -0,0 +1,57 @@
+# tests/test_encoding.py
+
+"""
+Tests for the map output formats and the WebP maps served by URL.
+"""
+
+import logging
+import os
+
+import numpy as np
+import pytest
+import streamlit as st
+from PIL import Image
+
+from modules.visualization import encoding
+
+@pytest.fixture
+def static_maps(tmp_path, monkeypatch):
+    monkeypatch.setattr(encoding, "STATIC_MAP_DIR", str(tmp_path))
+    monkeypatch.setattr(encoding, "STATIC_MAP_LIMIT", 2)
+    return tmp_path
+
+def palette_image():
+    image = Image.frombytes("P", (64, 64), (np.arange(64 * 64) % 4).astype(np.uint8).tobytes())
+    image.putpalette([0, 0, 0, 255, 0, 0, 0, 255, 0, 0, 0, 255] + [0] * 756)
+    return image
+
+def test_raster_maps_are_webp_only_with_static_serving(monkeypatch):
+    options = {"server.enableStaticServing": True}
+    monkeypatch.setattr(st, "get_option", options.get)
+    assert encoding.get_output_profile("raster")["format"] == "webp"
+    assert encoding.get_output_profile("map")["format"] == "png"
+
+    options["server.enableStaticServing"] = False
+    assert encoding.get_output_profile("raster")["format"] == "png"
+
+def test_encode_is_logged_with_format_and_size(caplog):
+    with caplog.at_level(logging.INFO, logger=encoding.__name__):
+        data = encoding.encode_image(palette_image(), {"format": "webp"})
+
+    assert encoding.get_image_format(data) == "webp"
+    assert f"as webp: {len(data)} bytes" in caplog.text
+
+def test_static_maps_keep_the_most_recently_shown(static_maps):
+    maps = [encoding.encode_image(palette_image().rotate(angle), {"format": "webp"}) for angle in (0, 90, 180)]
+    urls = [encoding.publish_static_map(data) for data in maps[:2]]
+    os.utime(static_maps / urls[0].rsplit("/", 1)[1], (1000, 1000))
+    os.utime(static_maps / urls[1].rsplit("/", 1)[1], (2000, 2000))
+
+    # Showing the first map again makes the second the oldest
+    assert encoding.publish_static_map(maps[0]) == urls[0]
+    encoding.publish_static_map(maps[2])
+
+    names = sorted(os.listdir(static_maps))
+    assert len(names) == 2
+    assert urls[1].rsplit("/", 1)[1] not in names
+    assert all(url.startswith(encoding.STATIC_MAP_URL + "/") for url in urls)
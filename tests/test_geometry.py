@@ -0,0 +1,52 @@
+# tests/test_geometry.py
+
+"""
+Tests for the compact integer geometry encoding.
+"""
+
+import pickle
+
+import geopandas as gpd
+import numpy as np
+import shapely
+from shapely.geometry import MultiPolygon, Point, Polygon, box
+
+from modules.data.geometry import DEFAULT_PRECISION, decode_dataset, encode_dataset, quantize_geometries
+
+def make_dataset():
+    with_hole = Polygon([(70, 20), (71, 20), (71, 21), (70, 21)], [[(70.25, 20.25), (70.5, 20.25), (70.5, 20.5)]])
+    islands = MultiPolygon([box(72, 20, 72.5, 20.5), box(73.12345678, 20, 73.5, 20.87654321)])
+    gdf = gpd.GeoDataFrame(
+        {"NAME_1": ["A", "A", "B", "B"], "value": [1.5, 2.0, None, 4.0]},
+        geometry=[with_hole, islands, Point(77.2, 28.6), None],
+        index=[10, 11, 12, 13],
+        crs="EPSG:4326"
+    )
+    gdf.attrs["source"] = "test"
+    return gdf
+
+def test_roundtrip_restores_attributes_and_grid_geometry():
+    gdf = make_dataset()
+    decoded = decode_dataset(pickle.loads(pickle.dumps(encode_dataset(gdf))))
+
+    assert list(decoded.index) == [10, 11, 12, 13]
+    assert decoded.crs == gdf.crs
+    assert decoded.attrs == {"source": "test"}
+    assert decoded["NAME_1"].tolist() == gdf["NAME_1"].tolist()
+    assert decoded["value"].equals(gdf["value"])
+
+    # Coordinates come back on the grid, within half a cell of the source
+    # on each axis (snapping may change the ring orientation)
+    decoded_coords = shapely.get_coordinates(shapely.normalize(decoded.geometry.values[:3]))
+    source_coords = shapely.get_coordinates(shapely.normalize(gdf.geometry.values[:3]))
+    assert np.abs(decoded_coords - source_coords).max() <= DEFAULT_PRECISION / 2
+    assert decoded.geometry.values[3] is None
+    assert decoded.geometry.values[1].geom_type == "MultiPolygon"
+    assert len(decoded.geometry.values[0].interiors) == 1
+
+def test_grid_geometry_roundtrips_exactly():
+    gdf = make_dataset()
+    gdf["geometry"] = quantize_geometries(gdf.geometry.values, DEFAULT_PRECISION)
+    decoded = decode_dataset(encode_dataset(gdf))
+    assert shapely.equals_exact(decoded.geometry.values[:3], gdf.geometry.values[:3],
+                                tolerance=DEFAULT_PRECISION * 1e-3).all()
@@ -0,0 +1,41 @@
+# tests/test_mcda.py
+
+"""
+Tests for the weighted scoring and quartile classes of the Custom category.
+"""
+
+import numpy as np
+
+from modules.data.mcda import SCORE_LABELS, compute_scores, classify_scores
+
+MATRIX = np.array([
+    [0.0, 1.0],
+    [0.5, 0.5],
+    [1.0, 0.0],
+    [1.0, 1.0]
+], dtype=np.float32)
+
+def test_positive_weights_give_the_weighted_mean():
+    scores = compute_scores(MATRIX, np.array([1.0, 0.5], dtype=np.float32))
+    np.testing.assert_allclose(scores, [0.5 / 1.5, 0.75 / 1.5, 1 / 1.5, 1.0], rtol=1e-6)
+
+def test_negative_weight_rewards_low_values():
+    scores = compute_scores(MATRIX, np.array([1.0, -1.0], dtype=np.float32))
+    # |w| * (1 - x) for the second indicator
+    np.testing.assert_allclose(scores, [0.0, 0.5, 1.0, 0.5], rtol=1e-6)
+
+def test_zero_weights_give_no_scores():
+    scores = compute_scores(MATRIX, np.zeros(2, dtype=np.float32))
+    assert np.isnan(scores).all()
+    assert list(classify_scores(scores)) == [len(SCORE_LABELS) - 1] * 4
+
+def test_scores_are_binned_at_their_quartiles():
+    scores = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, np.nan])
+    codes = classify_scores(scores)
+    # Quartiles 0.275, 0.45, 0.625; a score on a quartile goes up
+    assert list(codes) == [0, 0, 1, 1, 2, 2, 3, 3, 4]
+
+def test_score_on_a_quartile_belongs_to_the_upper_class():
+    codes = classify_scores(np.array([1.0, 2.0, 3.0, 4.0, 5.0]))
+    # Quartiles 2, 3, 4
+    assert list(codes) == [0, 1, 2, 3, 3]
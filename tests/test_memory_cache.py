@@ -0,0 +1,46 @@
+# tests/test_memory_cache.py
+
+"""
+Tests for the bounded in-memory cache shared by the per-dataset structures.
+"""
+
+import threading
+
+from modules.utils.memory_cache import BoundedCache
+
+def test_oldest_entry_is_evicted_first():
+    cache = BoundedCache(2)
+    for key in "abc":
+        cache.get_or_build(key, lambda key=key: key.upper())
+
+    assert "a" not in cache
+    assert cache.get("b") == "B" and cache.get("c") == "C"
+    assert len(cache) == 2
+
+def test_hit_does_not_build():
+    cache = BoundedCache(2)
+    cache.get_or_build("a", lambda: 1)
+    assert cache.get_or_build("a", lambda: 2) == 1
+
+def test_concurrent_builds_keep_the_cache_bounded_and_consistent():
+    cache = BoundedCache(8)
+    errors = []
+    start = threading.Barrier(16)
+
+    def fill(offset):
+        start.wait()
+        try:
+            for i in range(2000):
+                key = (offset + i) % 40
+                assert cache.get_or_build(key, lambda: key * 2) == key * 2
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=fill, args=(offset,)) for offset in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(cache) == 8
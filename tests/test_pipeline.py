@@ -0,0 +1,75 @@
+# tests/test_pipeline.py
+
+"""
+Tests for the checkpointing of the preprocessing pipeline.
+"""
+
+import os
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+from modules.data import pipeline
+
+def write_source(path, count=6):
+    gdf = gpd.GeoDataFrame(
+        {"NAME_1": ["State"] * count, "NAME_2": [f"District {i}" for i in range(count)],
+         "Adaptation": ["Highly Suitable"] * count},
+        geometry=[box(i, 0, i + 1, 1) for i in range(count)],
+        crs="EPSG:4326"
+    )
+    gdf.to_file(path)
+
+def run(input_path, output_path, **kwargs):
+    return pipeline.run_pipeline(input_path, output_path, chunk_size=2, workers=1, progress=lambda message: None,
+                                 **kwargs)
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path, monkeypatch):
+    source = str(tmp_path / "source.shp")
+    output = str(tmp_path / "out" / "optimized.shp")
+    write_source(source)
+
+    # Every chunk finishes, then the run dies before the merge
+    def interrupt(*args):
+        raise KeyboardInterrupt
+    with monkeypatch.context() as patch:
+        patch.setattr(pipeline, "write_output", interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            run(source, output)
+
+    checkpoint_path = os.path.join(output + ".work", pipeline.CHECKPOINT_NAME)
+    assert os.path.exists(checkpoint_path)
+
+    summary = run(source, output)
+    assert summary["processed_this_run"] == 0
+    assert summary["written"] == 6
+    assert not os.path.exists(output + ".work")
+    assert list(gpd.read_file(output)["NAME_2"]) == [f"District {i}" for i in range(6)]
+
+def test_partial_checkpoint_processes_the_remaining_chunks(tmp_path, monkeypatch):
+    source = str(tmp_path / "source.shp")
+    output = str(tmp_path / "optimized.shp")
+    write_source(source)
+
+    # The first chunk is checkpointed, then the run dies
+    save_checkpoint = pipeline.save_checkpoint
+    def save_and_interrupt(checkpoint_path, settings, completed):
+        save_checkpoint(checkpoint_path, settings, completed)
+        raise KeyboardInterrupt
+    with monkeypatch.context() as patch:
+        patch.setattr(pipeline, "save_checkpoint", save_and_interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            run(source, output)
+
+    summary = run(source, output)
+    assert summary["processed_this_run"] == 4
+    assert summary["written"] == 6
+
+def test_checkpoint_with_other_settings_is_ignored(tmp_path):
+    checkpoint_path = str(tmp_path / pipeline.CHECKPOINT_NAME)
+    pipeline.save_checkpoint(checkpoint_path, {"chunk_size": 2}, {0, 1})
+
+    assert pipeline.load_checkpoint(checkpoint_path, {"chunk_size": 2}) == {0, 1}
+    assert pipeline.load_checkpoint(checkpoint_path, {"chunk_size": 3}) == set()
+    assert pipeline.load_checkpoint(str(tmp_path / "missing.json"), {"chunk_size": 2}) == set()
@@ -0,0 +1,68 @@
+# tests/test_prefetch.py
+
+"""
+Tests for the scheduling of background renders: the foreground gate, the
+hand-over of a view to a session and shutdown.
+"""
+
+import queue
+import threading
+import time
+
+import geopandas as gpd
+import pytest
+
+from modules.utils import prefetch
+
+VIEW = ("State", "District", "Column", "Adaptation")
+
+@pytest.fixture
+def renders(monkeypatch):
+    rendered = []
+    monkeypatch.setattr(prefetch, "_stopping", threading.Event())
+    monkeypatch.setattr(prefetch, "_queue", queue.SimpleQueue())
+    monkeypatch.setattr(prefetch, "_workers", [])
+    monkeypatch.setattr(prefetch, "_inflight", {})
+    monkeypatch.setattr(prefetch, "_sessions", {})
+    monkeypatch.setattr(prefetch, "MAX_PAUSE", 0.05)
+    monkeypatch.setattr(prefetch, "get_next_views", lambda *args: [VIEW])
+    monkeypatch.setattr(prefetch, "render_view", lambda _gdf, *view: rendered.append(view))
+    yield rendered
+    prefetch.shutdown(timeout=5)
+    assert not any(worker.is_alive() for worker in prefetch._workers)
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_scheduled_view_is_rendered(renders):
+    assert prefetch.schedule(gpd.GeoDataFrame(), *VIEW) == 1
+    assert wait_until(lambda: renders == [VIEW])
+    assert wait_until(lambda: not prefetch._inflight)
+
+def test_no_render_starts_while_a_session_renders(renders):
+    with prefetch.foreground():
+        prefetch.schedule(gpd.GeoDataFrame(), *VIEW)
+        # Longer than any pause of a worker
+        time.sleep(0.3)
+        assert renders == []
+    assert wait_until(lambda: renders == [VIEW])
+
+def test_session_takes_over_a_view_whose_worker_waits(renders):
+    with prefetch.foreground():
+        prefetch.schedule(gpd.GeoDataFrame(), *VIEW)
+        # The worker has picked the view up but not started it
+        assert wait_until(lambda: prefetch._inflight[(None,) + VIEW]["future"].running())
+        assert prefetch.wait_for(gpd.GeoDataFrame(), *VIEW) is False
+    time.sleep(0.2)
+    assert renders == []
+    assert not prefetch._inflight
+
+def test_shutdown_cancels_queued_views(renders):
+    with prefetch.foreground():
+        prefetch.schedule(gpd.GeoDataFrame(), *VIEW)
+        prefetch.shutdown(timeout=5)
+    assert renders == []
+    assert prefetch.schedule(gpd.GeoDataFrame(), *VIEW) == 0
@@ -0,0 +1,38 @@
+# tests/test_raster.py
+
+"""
+Tests for the label grids of the raster renderer.
+"""
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+from modules.utils import disk_cache
+from modules.visualization import raster
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(disk_cache.CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(disk_cache, "_size_estimate", None)
+    monkeypatch.setattr(raster, "_label_grids", raster.BoundedCache(raster.LABEL_GRID_CACHE_SIZE))
+    return tmp_path
+
+def make_districts():
+    return gpd.GeoDataFrame({"NAME_1": ["A", "A"], "NAME_2": ["a", "b"]},
+                            geometry=[box(70, 20, 71, 21), box(72, 20, 73, 21)])
+
+def test_label_grids_are_stored_in_the_disk_cache(cache_dir, monkeypatch):
+    labels, boundary = raster.get_label_grid(make_districts(), "National Average", "All Districts", width=40)
+    assert set(np.unique(labels)) == {0, 1, 2}
+    assert boundary.shape == labels.shape
+
+    assert len(list((cache_dir / "label_grid").rglob("*" + disk_cache.ENTRY_SUFFIX))) == 1
+    assert disk_cache.get_cache_size() > 0
+
+    # A new process reads the grid back instead of rasterizing again
+    monkeypatch.setattr(raster, "_label_grids", raster.BoundedCache(raster.LABEL_GRID_CACHE_SIZE))
+    monkeypatch.setattr(raster, "build_label_grid", None)
+    cached, _ = raster.get_label_grid(make_districts(), "National Average", "All Districts", width=40)
+    assert np.array_equal(cached, labels)
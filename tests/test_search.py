@@ -0,0 +1,45 @@
+# tests/test_search.py
+
+"""
+Tests for the district search: word prefixes, alternate names, fuzzy
+matches, ranking and the result limit.
+"""
+
+import pandas as pd
+import pytest
+
+from modules.data.search import build_search_index, search_districts
+
+@pytest.fixture(scope="module")
+def index():
+    districts = pd.DataFrame({
+        "NAME_1": ["Goa", "Goa", "Gujarat", "Gujarat", "Maharashtra", "Maharashtra"],
+        "NAME_2": ["North Goa", "South Goa", "Ahmadabad", "Gandhinagar", "Mumbai City", "Pune"],
+        "VARNAME_2": [None, None, None, None, "Bombay|Bombay City", "Poona"]
+    })
+    return build_search_index(districts)
+
+def districts(results):
+    return [district for _, district, _ in results]
+
+def test_query_matches_any_word_of_a_name(index):
+    assert "North Goa" in districts(search_districts(index, "goa"))
+    assert "North Goa" in districts(search_districts(index, "NORTH g"))
+
+def test_alternate_names_find_their_district(index):
+    assert search_districts(index, "bombay") == [("Maharashtra", "Mumbai City", "Mumbai City, Maharashtra")]
+    assert districts(search_districts(index, "Poona")) == ["Pune"]
+
+def test_misspelled_names_are_found_by_trigrams(index):
+    assert districts(search_districts(index, "Ahmedabad"))[0] == "Ahmadabad"
+
+def test_states_rank_before_districts(index):
+    assert search_districts(index, "goa") == [("Goa", "All Districts", "Goa"),
+                                              ("Goa", "North Goa", "North Goa, Goa"),
+                                              ("Goa", "South Goa", "South Goa, Goa")]
+    assert districts(search_districts(index, "g"))[:2] == ["All Districts", "All Districts"]
+
+def test_limit_is_respected(index):
+    assert len(search_districts(index, "g")) == 5
+    assert len(search_districts(index, "g", limit=2)) == 2
+    assert search_districts(index, "") == []
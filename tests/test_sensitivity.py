@@ -0,0 +1,54 @@
+# tests/test_sensitivity.py
+
+"""
+Tests for the weight sensitivity analysis: reproducibility from the seed,
+the same result in and out of process, and the stability of the shown class.
+"""
+
+import sys
+import types
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from modules.data.mcda import INDICATORS, classify_scores, compute_scores, get_indicator_matrix, get_weight_vector
+from modules.data.sensitivity import CLASS_NAMES, CURRENT_COLUMN, STABILITY_COLUMN, run_sensitivity
+from modules.utils.constants import layer_column_mapping
+
+WEIGHTS = {INDICATORS[0]: 1.0, INDICATORS[1]: -0.5, INDICATORS[2]: 0.25}
+
+def make_districts(count=40):
+    rng = np.random.default_rng(1)
+    columns = {layer_column_mapping[layer]: rng.uniform(0, 100, count) for layer in INDICATORS}
+    return gpd.GeoDataFrame(dict(columns, NAME_1=[f"State {i % 4}" for i in range(count)],
+                                 NAME_2=[f"District {i}" for i in range(count)]),
+                            geometry=[box(i, 0, i + 1, 1) for i in range(count)])
+
+def test_run_reproduces_from_its_seed():
+    districts = make_districts()
+    first = run_sensitivity(districts, WEIGHTS, n_samples=1200, seed=7, workers=1)
+    assert first.equals(run_sensitivity(districts, WEIGHTS, n_samples=1200, seed=7, workers=1))
+    assert not first[CLASS_NAMES].equals(run_sensitivity(districts, WEIGHTS, n_samples=1200, seed=8,
+                                                         workers=1)[CLASS_NAMES])
+
+def test_pool_and_in_process_runs_agree(monkeypatch):
+    # Spawned workers import the main module first; Streamlit test apps
+    # of other tests may have left theirs in its place
+    monkeypatch.setitem(sys.modules, "__main__", types.ModuleType("__main__"))
+    districts = make_districts()
+    in_process = run_sensitivity(districts, WEIGHTS, n_samples=1200, seed=7, workers=1)
+    pooled = run_sensitivity(districts, WEIGHTS, n_samples=1200, seed=7, workers=2)
+    assert in_process.equals(pooled)
+
+def test_stability_is_the_probability_of_the_shown_class():
+    districts = make_districts()
+    result = run_sensitivity(districts, WEIGHTS, n_samples=1000, spread=0.8, seed=3, workers=1)
+
+    matrix = get_indicator_matrix(districts)["matrix"]
+    current = classify_scores(compute_scores(matrix, get_weight_vector(WEIGHTS)))
+    assert result[CURRENT_COLUMN].tolist() == [CLASS_NAMES[code] for code in current]
+    probabilities = result[CLASS_NAMES].to_numpy()
+    np.testing.assert_allclose(result[STABILITY_COLUMN], probabilities[np.arange(len(current)), current])
+    # With this much spread some districts are most likely in another class
+    assert (result[STABILITY_COLUMN] < probabilities.max(axis=1)).any()
@@ -0,0 +1,61 @@
+# tests/test_spatial.py
+
+"""
+Tests for the adjacency graph and the local statistics, against values
+computed by hand.
+"""
+
+import geopandas as gpd
+import numpy as np
+from shapely.geometry import box
+
+from modules.data import spatial
+from modules.data.spatial import build_adjacency, get_adjacency, getis_ord_g_star, local_morans_i
+from modules.utils import disk_cache
+
+# Three unit squares in a row: 0 - 1 - 2
+ROW = build_adjacency([box(0, 0, 1, 1), box(1, 0, 2, 1), box(2, 0, 3, 1)])
+VALUES = np.array([0.0, 0.0, 3.0])
+
+def test_squares_in_a_row_are_a_path():
+    assert ROW.toarray().tolist() == [[0, 1, 0], [1, 0, 1], [0, 1, 0]]
+
+def test_corners_make_neighbors():
+    # 2 x 2 grid: the diagonal squares only share a corner
+    grid = build_adjacency([box(0, 0, 1, 1), box(1, 0, 2, 1), box(0, 1, 1, 2), box(1, 1, 2, 2)])
+    assert grid.toarray().tolist() == [[0, 1, 1, 1], [1, 0, 1, 1], [1, 1, 0, 1], [1, 1, 1, 0]]
+
+def test_g_star():
+    # Mean 1 and standard deviation sqrt(2). District 0 sums 0 over two
+    # districts where 2 is expected: -2 / (sqrt(2) * sqrt((3*2 - 2^2) / 2));
+    # district 1 covers every district, so its sum carries no information
+    np.testing.assert_allclose(getis_ord_g_star(VALUES, ROW), [-np.sqrt(2), 0.0, 1 / np.sqrt(2)], rtol=1e-6)
+
+def test_local_morans_i():
+    # Deviations z = (-1, -1, 2), m2 = 2, b2 = 6 / 2^2 = 1.5; row-standardized
+    # lags are (-1, 0.5, -1), so I = z / m2 * lag, with E[I] = -1/2
+    local_i, z_scores = local_morans_i(VALUES, ROW)
+    np.testing.assert_allclose(local_i, [0.5, -0.25, -1.0], rtol=1e-6)
+    # Var = w2 * (n - b2) / (n - 1) + w_ikh * (2 b2 - n) / ((n - 1)(n - 2)) - E[I]^2
+    # = 0.5, 0.125 and 0.5
+    np.testing.assert_allclose(z_scores, [np.sqrt(2), 1 / np.sqrt(2), -1 / np.sqrt(2)], rtol=1e-6)
+
+def test_constant_values_are_not_significant():
+    values = np.ones(3)
+    assert not getis_ord_g_star(values, ROW).any()
+    local_i, z_scores = local_morans_i(values, ROW)
+    assert not local_i.any() and not z_scores.any()
+
+def test_adjacency_is_stored_in_the_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv(disk_cache.CACHE_DIR_ENV, str(tmp_path))
+    monkeypatch.setattr(disk_cache, "_size_estimate", None)
+    monkeypatch.setattr(spatial, "_adjacency", spatial.BoundedCache(spatial.ADJACENCY_CACHE_SIZE))
+    gdf = gpd.GeoDataFrame({"NAME_1": ["A"] * 3, "NAME_2": ["a", "b", "c"]},
+                           geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1), box(2, 0, 3, 1)])
+    assert (get_adjacency(gdf) != ROW).nnz == 0
+    assert len(list((tmp_path / "adjacency").rglob("*" + disk_cache.ENTRY_SUFFIX))) == 1
+
+    # A new process reads the matrix back instead of querying the geometry
+    monkeypatch.setattr(spatial, "_adjacency", spatial.BoundedCache(spatial.ADJACENCY_CACHE_SIZE))
+    monkeypatch.setattr(spatial, "build_adjacency", None)
+    assert (get_adjacency(gdf) != ROW).nnz == 0
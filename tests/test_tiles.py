@@ -0,0 +1,64 @@
+# tests/test_tiles.py
+
+"""
+Tests for the MVT polygon commands: ring winding and dropped rings.
+"""
+
+import numpy as np
+
+from modules.visualization.tiles import CMD_CLOSE_PATH, CMD_MOVE_TO, encode_polygon_commands
+
+def decode_rings(commands):
+    """
+    Decode MVT polygon commands into rings of absolute tile coordinates.
+    """
+    rings = []
+    cursor = np.zeros(2, dtype=np.int64)
+    i = 0
+    while i < len(commands):
+        command, count = commands[i] & 0x7, commands[i] >> 3
+        i += 1
+        if command == CMD_CLOSE_PATH:
+            continue
+        if command == CMD_MOVE_TO:
+            rings.append([])
+        for _ in range(count):
+            delta = np.array([(value >> 1) ^ -(value & 1) for value in commands[i:i + 2]])
+            cursor = cursor + delta
+            rings[-1].append(cursor)
+            i += 2
+    return [np.array(ring) for ring in rings]
+
+def signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) / 2
+
+def ring(points):
+    points = np.array(points, dtype=float)
+    return np.vstack([points, points[:1]])
+
+SQUARE = [(0, 0), (100, 0), (100, 100), (0, 100)]
+HOLE = [(25, 25), (75, 25), (75, 75), (25, 75)]
+
+def test_exterior_is_positive_and_hole_negative_in_either_input_winding():
+    for exterior in (SQUARE, SQUARE[::-1]):
+        for hole in (HOLE, HOLE[::-1]):
+            rings = decode_rings(encode_polygon_commands([(ring(exterior), True), (ring(hole), False)]))
+            assert len(rings) == 2
+            assert signed_area(rings[0]) == 100 * 100
+            assert signed_area(rings[1]) == -50 * 50
+
+def test_coordinates_are_rounded_and_repeated_points_merged():
+    exterior = ring([(0.2, 0.1), (0.4, -0.2), (9.6, 0.3), (10.2, 9.8), (-0.1, 10.4)])
+    rings = decode_rings(encode_polygon_commands([(exterior, True)]))
+    assert sorted(map(tuple, rings[0].tolist())) == [(0, 0), (0, 10), (10, 0), (10, 10)]
+
+def test_collapsed_exterior_drops_its_holes():
+    tiny = ring([(0.1, 0.1), (0.2, 0.1), (0.2, 0.2)])
+    commands = encode_polygon_commands([(ring(SQUARE), True), (ring(HOLE), False),
+                                        (tiny, True), (ring(HOLE), False)])
+    rings = decode_rings(commands)
+    assert [signed_area(r) for r in rings] == [100 * 100, -50 * 50]
+
+def test_nothing_left_gives_no_commands():
+    assert encode_polygon_commands([(ring([(0, 0), (0.2, 0.2), (0.4, 0)]), True)]) == []